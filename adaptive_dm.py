@@ -1,9 +1,13 @@
-import json
+import asyncio
 import os
 import re
+import threading
 import time
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Set, Tuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from utils.state_store import JsonDocumentFile, open_store
 
 # Minimal base instructions when adaptive DM assistant is on (replaces global persona for that DM).
 ADAPTIVE_DM_BASE_PERSONA = (
@@ -32,6 +36,8 @@ TUNE_MIN_MESSAGES = 3
 TUNE_MIN_INTERVAL_SECONDS = 120
 TUNE_QUEUE_ENTRY_MAX = 400
 TUNE_QUEUE_MAX_ITEMS = 60
+# Guild-channel tuning samples are applied in batches: one pass and one save per flush.
+GUILD_TUNE_FLUSH_SECONDS = 5.0
 
 _MANUAL_CONTEXT_MAX_LEN = 12000
 _CONTEXT_OVERRIDE_MAX_LEN = 48000
@@ -55,6 +61,13 @@ _TUNING_URL_RE = re.compile(
     r"<https?://[^>\s]+>|https?://[^\s>]+|discord(?:app)?\.com/channels/\d+/\d+(?:/\d+)?",
     re.IGNORECASE,
 )
+_WHITESPACE_RE = re.compile(r"\s+")
+_LINE_SPACES_RE = re.compile(r"[ \t]+")
+_CALL_ME_RE = re.compile(r"\bcall me ([a-zA-Z0-9_\- ]{2,30})", re.IGNORECASE)
+_LIKES_RE = re.compile(r"\b(?:i like|i love|my favorite is)\s+([^\n\.\!\?]{2,60})")
+_DISLIKES_RE = re.compile(r"\b(?:i dislike|i hate|i don't like|i dont like)\s+([^\n\.\!\?]{2,60})")
+_SENTENCE_END_RE = re.compile(r"[.!?]")
+_MULTI_DOT_RE = re.compile(r"\.{2,}")
 
 
 def text_for_adaptive_tuning(raw: Optional[str]) -> Optional[str]:
@@ -63,7 +76,7 @@ def text_for_adaptive_tuning(raw: Optional[str]) -> Optional[str]:
         return None
     t = str(raw).strip()
     t = _TUNING_URL_RE.sub("", t)
-    t = re.sub(r"\s+", " ", t).strip()
+    t = _WHITESPACE_RE.sub(" ", t).strip()
     if len(t) < 3:
         return None
     return t
@@ -78,7 +91,7 @@ def text_for_adaptive_tuning_batch(raw: Optional[str]) -> Optional[str]:
     t = t.replace("\r\n", "\n").replace("\r", "\n")
     lines_out: List[str] = []
     for line in t.split("\n"):
-        line = re.sub(r"[ \t]+", " ", line).strip()
+        line = _LINE_SPACES_RE.sub(" ", line).strip()
         lines_out.append(line)
     t = "\n".join(lines_out).strip()
     while "\n\n\n" in t:
@@ -100,6 +113,14 @@ class AdaptiveDmManager:
                 pass
         self.save_file = save_file
         self.state: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self._store = open_store("adaptive_dm", ("state",), JsonDocumentFile(save_file, ("state",)))
+        # channel id -> user ids whose guild-channel tuning points there (adaptive on, tuning on).
+        self._guild_tune_index: Dict[int, Set[int]] = {}
+        self._guild_tune_lock = threading.Lock()
+        self._guild_tune_pending: Dict[int, List[str]] = {}
+        self._guild_tune_handle: Optional[asyncio.TimerHandle] = None
+        # Per thread, so a batch in a worker thread never swallows another thread's save().
+        self._save_local = threading.local()
         self._load()
 
     @staticmethod
@@ -168,6 +189,7 @@ class AdaptiveDmManager:
     def set_enabled(self, user_id: int, enabled: bool) -> None:
         user_state = self._get_user_state(user_id)
         user_state["enabled"] = bool(enabled)
+        self._index_guild_tune(user_id)
         self.save()
 
     def get_profile(self, user_id: int) -> Dict[str, Any]:
@@ -442,6 +464,7 @@ class AdaptiveDmManager:
             st["tune_guild_channel_id"] = None
         elif channel_id is not None:
             st["tune_guild_channel_id"] = int(channel_id)
+        self._index_guild_tune(user_id)
         self.save()
 
     def get_guild_tune_channel_config(self, user_id: int) -> Dict[str, Any]:
@@ -451,6 +474,75 @@ class AdaptiveDmManager:
             "enabled": bool(st.get("tune_guild_channel_enabled", False)),
         }
 
+    def _index_guild_tune(self, user_id: int) -> None:
+        """Re-derive this user's entry in the channel -> tuning users index from their state."""
+        uid = int(user_id)
+        st = self.state.get(self._key(uid)) or {}
+        channel_id = None
+        if st.get("enabled") and st.get("tune_guild_channel_enabled"):
+            try:
+                channel_id = int(st.get("tune_guild_channel_id"))
+            except (TypeError, ValueError):
+                channel_id = None
+        with self._guild_tune_lock:
+            for cid, users in list(self._guild_tune_index.items()):
+                if cid != channel_id and uid in users:
+                    users.discard(uid)
+                    if not users:
+                        del self._guild_tune_index[cid]
+            if channel_id is not None:
+                self._guild_tune_index.setdefault(channel_id, set()).add(uid)
+
+    def _rebuild_guild_tune_index(self) -> None:
+        with self._guild_tune_lock:
+            self._guild_tune_index = {}
+        for key in list(self.state.keys()):
+            try:
+                self._index_guild_tune(int(key))
+            except (TypeError, ValueError):
+                continue
+
+    def wants_guild_tune(self, channel_id: int, author_id: int) -> bool:
+        """O(1) check: does this author tune their adaptive profile from this guild channel?"""
+        users = self._guild_tune_index.get(channel_id)
+        return bool(users) and author_id in users
+
+    def queue_guild_tune(self, channel_id: int, author_id: int, content: Optional[str]) -> None:
+        """Collect a guild-channel sample; samples are applied together GUILD_TUNE_FLUSH_SECONDS later."""
+        if not content or not self.wants_guild_tune(channel_id, author_id):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._guild_tune_lock:
+            samples = self._guild_tune_pending.setdefault(int(author_id), [])
+            samples.append(content)
+            del samples[:-TUNE_QUEUE_MAX_ITEMS]
+            if loop is not None and self._guild_tune_handle is None:
+                self._guild_tune_handle = loop.call_later(GUILD_TUNE_FLUSH_SECONDS, self._flush_guild_tune_soon, loop)
+        if loop is None:
+            self.flush_guild_tune()  # no event loop (scripts): apply right away
+
+    def _flush_guild_tune_soon(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Timer callback on the event loop: run the batch off-loop in a worker thread."""
+        with self._guild_tune_lock:
+            self._guild_tune_handle = None
+        loop.create_task(asyncio.to_thread(self.flush_guild_tune))
+
+    def flush_guild_tune(self) -> int:
+        """Apply queued guild-channel samples now (one save for the whole batch). Returns samples applied."""
+        with self._guild_tune_lock:
+            pending = self._guild_tune_pending
+            self._guild_tune_pending = {}
+        applied = 0
+        with self._deferred_save():
+            for user_id, samples in pending.items():
+                for content in samples:
+                    self.apply_live_message_tune(user_id, content)
+                    applied += 1
+        return applied
+
     def maybe_tune_from_guild_channel_message(
         self,
         channel_id: int,
@@ -458,13 +550,7 @@ class AdaptiveDmManager:
         content: Optional[str],
     ) -> None:
         """If this user enabled guild-channel tuning and this is that channel, ingest (URLs ignored)."""
-        if not self.is_enabled(author_id):
-            return
-        st = self._get_user_state(author_id)
-        if not st.get("tune_guild_channel_enabled"):
-            return
-        tid = st.get("tune_guild_channel_id")
-        if tid is None or int(tid) != int(channel_id):
+        if not self.wants_guild_tune(int(channel_id), int(author_id)):
             return
         self.apply_live_message_tune(author_id, content or "")
 
@@ -480,17 +566,17 @@ class AdaptiveDmManager:
         lower = text.lower()
 
         # Name preference (very simple extraction).
-        m_name = re.search(r"\bcall me ([a-zA-Z0-9_\- ]{2,30})", text, flags=re.IGNORECASE)
+        m_name = _CALL_ME_RE.search(text)
         if m_name:
             preferred_name = m_name.group(1).strip()
 
         # Likes/dislikes extraction.
-        for m in re.finditer(r"\b(?:i like|i love|my favorite is)\s+([^\n\.\!\?]{2,60})", lower):
+        for m in _LIKES_RE.finditer(lower):
             val = m.group(1).strip(" .,!?:;")
             if val and val not in likes:
                 likes.append(val)
 
-        for m in re.finditer(r"\b(?:i dislike|i hate|i don't like|i dont like)\s+([^\n\.\!\?]{2,60})", lower):
+        for m in _DISLIKES_RE.finditer(lower):
             val = m.group(1).strip(" .,!?:;")
             if val and val not in dislikes:
                 dislikes.append(val)
@@ -505,7 +591,7 @@ class AdaptiveDmManager:
         if len(text.split()) <= 6:
             if "often writes short direct messages" not in tone_notes:
                 tone_notes.append("often writes short direct messages")
-        if len(text) > 12 and not re.search(r"[.!?]", text):
+        if len(text) > 12 and not _SENTENCE_END_RE.search(text):
             if "often skips sentence-ending punctuation" not in tone_notes:
                 tone_notes.append("often skips sentence-ending punctuation")
         slang_hits = (
@@ -524,7 +610,7 @@ class AdaptiveDmManager:
         ):
             if "uses informal internet shorthand" not in tone_notes:
                 tone_notes.append("uses informal internet shorthand")
-        if "..." in text or re.search(r"\.{2,}", text):
+        if "..." in text or _MULTI_DOT_RE.search(text):
             if "uses ellipses or multi-dot pauses" not in tone_notes:
                 tone_notes.append("uses ellipses or multi-dot pauses")
         if len(text) > 80:
@@ -697,15 +783,16 @@ class AdaptiveDmManager:
         raw = (batch_text or "").replace("\r\n", "\n")
         messages = 0
         applied = 0
-        for line in raw.split("\n"):
-            segment = line.strip()
-            if not segment:
-                continue
-            messages += 1
-            if text_for_adaptive_tuning(segment) is None:
-                continue
-            self.apply_live_message_tune(user_id, segment)
-            applied += 1
+        with self._deferred_save():
+            for line in raw.split("\n"):
+                segment = line.strip()
+                if not segment:
+                    continue
+                messages += 1
+                if text_for_adaptive_tuning(segment) is None:
+                    continue
+                self.apply_live_message_tune(user_id, segment)
+                applied += 1
         return {"messages": messages, "applied": applied}
 
     def get_full_adaptive_system_addition(self, user_id: int) -> str:
@@ -839,17 +926,29 @@ class AdaptiveDmManager:
         return False
 
     def save(self) -> None:
-        os.makedirs(os.path.dirname(self.save_file), exist_ok=True)
-        with open(self.save_file, "w") as f:
-            json.dump({"state": dict(self.state)}, f, indent=2)
+        """Persist users whose state changed (row-level on SQLite; full rewrite on the JSON backend)."""
+        local = self._save_local
+        if getattr(local, "depth", 0):
+            local.dirty = True
+            return
+        self._store.sync({"state": dict(self.state)})
 
-    def _load(self) -> None:
+    @contextmanager
+    def _deferred_save(self) -> Iterator[None]:
+        """Collapse the save() calls made inside the block into one at the end."""
+        local = self._save_local
+        local.depth = getattr(local, "depth", 0) + 1
         try:
-            with open(self.save_file) as f:
-                data = json.load(f)
-            self.state = defaultdict(dict, data.get("state", {}))
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
+            yield
+        finally:
+            local.depth -= 1
+            if not local.depth and getattr(local, "dirty", False):
+                local.dirty = False
+                self.save()
+
+    def _load(self) -> None:
+        self.state = defaultdict(dict, self._store.load().get("state", {}))
+        self._rebuild_guild_tune_index()
 
 
 adaptive_dm_manager = AdaptiveDmManager()
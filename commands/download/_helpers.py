@@ -1,58 +1,139 @@
+"""Media download helpers for /download and wake-word downloads.
+
+Downloads stream to a private temp directory under data/downloads (on disk, not tmpfs) and
+are uploaded to Discord from the file path, so memory use stays at one chunk regardless of
+download_limit_mb. Callers hold download_slot() while downloading and sending, and call
+cleanup(path) afterwards.
+"""
+import asyncio
 import os
 import re
+import shutil
 import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+from integrations import DOWNLOAD_CONCURRENCY
 
 DOWNLOAD_EXTENSIONS = {
     ".mp4", ".webm", ".mkv", ".mov", ".avi", ".m4v",
     ".mp3", ".wav", ".ogg", ".m4a", ".flac", ".aac",
     ".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp",
 }
+DOWNLOAD_DIR = os.path.join("data", "downloads")
+CHUNK_BYTES = 256 * 1024
+# Free space to leave on the disk beyond the file itself.
+DISK_HEADROOM_BYTES = 64 * 1024 * 1024
+STALE_SECONDS = 6 * 3600
+
+_slots: Optional[asyncio.Semaphore] = None
 
 
 def extract_urls(text: str):
     return re.compile(r"https?://[^\s<>\"']+", re.IGNORECASE).findall(text)
 
 
-def download_url_sync(url: str, max_bytes: int):
-    import requests
-    url_lower = url.lower()
-    use_yt_dlp = any(x in url_lower for x in [
-        "youtube.com", "youtu.be", "twitch.tv", "vimeo.com", "twitter.com", "x.com", "soundcloud.com"
-    ])
-    if use_yt_dlp:
+@asynccontextmanager
+async def download_slot() -> AsyncIterator[None]:
+    """Limit simultaneous downloads (DOWNLOAD_CONCURRENCY); later requests wait their turn."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    async with _slots:
+        yield
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"File too large. Max: {max_bytes // (1024*1024)} MB."
+
+
+def _sweep_stale() -> None:
+    """Remove download dirs left behind by a crash."""
+    cutoff = time.time() - STALE_SECONDS
+    try:
+        entries = os.listdir(DOWNLOAD_DIR)
+    except OSError:
+        return
+    for name in entries:
+        path = os.path.join(DOWNLOAD_DIR, name)
         try:
-            import yt_dlp
-            # Prefer audio for SoundCloud; video for others
-            if "soundcloud.com" in url_lower:
-                format_str = "bestaudio[ext=m4a]/bestaudio/best"
-            else:
-                format_str = "best[ext=mp4]/best[ext=webm]/best"
-            with tempfile.TemporaryDirectory() as tmpdir:
-                opts = {
-                    "outtmpl": os.path.join(tmpdir, "%(title)s.%(ext)s"),
-                    "format": format_str,
-                    "quiet": True,
-                    "no_warnings": True,
-                }
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
-                    if not info:
-                        return None, "Could not get media info"
-                    files = [f for f in os.listdir(tmpdir) if os.path.isfile(os.path.join(tmpdir, f))]
-                    if not files:
-                        return None, "No file produced"
-                    path = os.path.join(tmpdir, files[0])
-                    if os.path.getsize(path) > max_bytes:
-                        return None, f"File too large. Max: {max_bytes // (1024*1024)} MB."
-                    with open(path, "rb") as f:
-                        return f.read(), files[0]
-        except ImportError:
-            return None, "yt-dlp not installed. pip install yt-dlp"
-        except Exception as e:
-            return None, str(e)[:200]
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _new_workdir() -> str:
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    _sweep_stale()
+    return tempfile.mkdtemp(prefix="dl-", dir=DOWNLOAD_DIR)
+
+
+def cleanup(path: Optional[str]) -> None:
+    """Delete a downloaded file and its temp directory."""
+    if path:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def _check_disk(workdir: str, size: int) -> Optional[str]:
     try:
-        r = requests.get(url, stream=True, timeout=30)
+        free = shutil.disk_usage(workdir).free
+    except OSError:
+        return None
+    if free < size + DISK_HEADROOM_BYTES:
+        return f"Not enough disk space for {size // (1024*1024)} MB."
+    return None
+
+
+def _safe_name(name: str) -> str:
+    name = os.path.basename(name.replace("\\", "/")).strip() or "download"
+    return name[:200]
+
+
+def _download_yt_dlp(url: str, url_lower: str, max_bytes: int, workdir: str) -> Tuple[Optional[str], str]:
+    import yt_dlp
+    # Prefer audio for SoundCloud; video for others
+    if "soundcloud.com" in url_lower:
+        format_str = "bestaudio[ext=m4a]/bestaudio/best"
+    else:
+        format_str = "best[ext=mp4]/best[ext=webm]/best"
+    opts = {
+        "outtmpl": os.path.join(workdir, "%(title)s.%(ext)s"),
+        "format": format_str,
+        "quiet": True,
+        "no_warnings": True,
+        # Skip formats whose announced size is over the limit instead of downloading them.
+        "max_filesize": max_bytes,
+    }
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+    if not info:
+        return None, "Could not get media info"
+    files = [f for f in os.listdir(workdir) if os.path.isfile(os.path.join(workdir, f)) and not f.endswith(".part")]
+    if not files:
+        return None, f"No file produced (the media may be over {max_bytes // (1024*1024)} MB)"
+    path = os.path.join(workdir, files[0])
+    if os.path.getsize(path) > max_bytes:
+        return None, _too_large(max_bytes)
+    return path, files[0]
+
+
+def _download_http(url: str, max_bytes: int, workdir: str) -> Tuple[Optional[str], str]:
+    import requests
+    with requests.get(url, stream=True, timeout=30) as r:
         r.raise_for_status()
+        try:
+            expected = int(r.headers.get("content-length") or 0)
+        except ValueError:
+            expected = 0
+        # Reject before reading the body when the server announces the size.
+        if expected > max_bytes:
+            return None, _too_large(max_bytes)
+        if expected:
+            err = _check_disk(workdir, expected)
+            if err:
+                return None, err
         content_type = r.headers.get("content-type", "")
         disposition = r.headers.get("content-disposition", "")
         filename = None
@@ -70,11 +151,58 @@ def download_url_sync(url: str, max_bytes: int):
             from urllib.parse import urlparse
             name = os.path.basename(urlparse(url).path) or "download"
             filename = name if "." in name else name + ".bin"
-        data = b""
-        for chunk in r.iter_content(chunk_size=8192):
-            data += chunk
-            if len(data) > max_bytes:
-                return None, f"File too large. Max: {max_bytes // (1024*1024)} MB."
-        return data, filename
+        filename = _safe_name(filename)
+        path = os.path.join(workdir, filename)
+        written = 0
+        with open(path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_BYTES):
+                written += len(chunk)
+                if written > max_bytes:
+                    return None, _too_large(max_bytes)
+                f.write(chunk)
+    return path, filename
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def download_url_to_file(url: str, max_bytes: int) -> Tuple[Optional[str], str]:
+    """
+    Download `url` into a fresh temp directory. Returns (path, filename), or (None, error).
+    The caller must cleanup(path) once the file has been sent.
+    """
+    url_lower = url.lower()
+    use_yt_dlp = any(x in url_lower for x in [
+        "youtube.com", "youtu.be", "twitch.tv", "vimeo.com", "twitter.com", "x.com", "soundcloud.com"
+    ])
+    workdir = _new_workdir()
+    try:
+        if use_yt_dlp:
+            try:
+                path, info = _download_yt_dlp(url, url_lower, max_bytes, workdir)
+            except ImportError:
+                path, info = None, "yt-dlp not installed. pip install yt-dlp"
+        else:
+            path, info = _download_http(url, max_bytes, workdir)
+    except Exception as e:
+        path, info = None, str(e)[:200]
+    if path is None:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return path, info
+
+
+async def save_attachment_to_file(attachment, max_bytes: int) -> Tuple[Optional[str], str]:
+    """Save a Discord attachment like download_url_to_file; the size is checked before fetching."""
+    if (attachment.size or 0) > max_bytes:
+        return None, _too_large(max_bytes)
+    workdir = await asyncio.to_thread(_new_workdir)
+    filename = _safe_name(attachment.filename or "download")
+    path = os.path.join(workdir, filename)
+    try:
+        await attachment.save(path)
     except Exception as e:
-        return None, str(e)[:200]
+        shutil.rmtree(workdir, ignore_errors=True)
+        return None, f"Failed to read attachment: {e}"
+    return path, filename
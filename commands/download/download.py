@@ -3,7 +3,14 @@ import discord
 from discord import app_commands
 from whitelist import get_user_permission
 from config import get_download_limit_mb
-from commands.download._helpers import extract_urls, download_url_sync
+from commands.download._helpers import (
+    cleanup,
+    download_slot,
+    download_url_to_file,
+    extract_urls,
+    read_file,
+    save_attachment_to_file,
+)
 
 def register(client: discord.Client):
     @client.tree.command(name="download", description="Download media from a link or the last message with media and send to chat")
@@ -42,43 +49,46 @@ def register(client: discord.Client):
         if not target_url and not target_attachment:
             await interaction.followup.send("❌ No link or media found. Send a link, or use `/download` after a message that contains a link or attachment.")
             return
-        data, filename = None, None
-        if target_attachment:
+        import asyncio
+        ext = ""
+        data = None
+        async with download_slot():
+            if target_attachment:
+                path, info = await save_attachment_to_file(target_attachment, max_bytes)
+                if path is None:
+                    await interaction.followup.send(f"❌ {info}")
+                    return
+            else:
+                path, info = await asyncio.to_thread(download_url_to_file, target_url, max_bytes)
+                if path is None:
+                    await interaction.followup.send(f"❌ Download failed: {info}")
+                    return
+            filename = info
             try:
-                data = await target_attachment.read()
-                filename = target_attachment.filename
-                if len(data) > max_bytes:
-                    await interaction.followup.send(f"❌ File too large. Max: {get_download_limit_mb()} MB.")
+                if os.path.getsize(path) == 0:
+                    await interaction.followup.send("❌ Nothing to send.")
                     return
-            except Exception as e:
-                await interaction.followup.send(f"❌ Failed to read attachment: {e}")
-                return
-        elif target_url:
-            import asyncio
-            data, filename = await asyncio.to_thread(download_url_sync, target_url, max_bytes)
-            if data is None:
-                await interaction.followup.send(f"❌ Download failed: {filename}")
-                return
-        if not data:
-            await interaction.followup.send("❌ Nothing to send.")
-            return
+                ext = os.path.splitext(filename or "")[1].lower()
+                if ext in {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}:
+                    data = await asyncio.to_thread(read_file, path)
+                else:
+                    try:
+                        await interaction.followup.send(
+                            f"📥 Downloaded: **{filename}**", file=discord.File(path, filename=filename)
+                        )
+                    except Exception as e:
+                        await interaction.followup.send(f"❌ Failed to send file: {e}")
+                    return
+            finally:
+                await asyncio.to_thread(cleanup, path)
         from utils.llm_service import ask_llm
-        ext = os.path.splitext(filename or "")[1].lower()
-        is_image = ext in {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
-        if is_image:
-            try:
-                reply = await ask_llm(
-                    interaction.user.id, channel.id, "Describe or analyze this image.", str(interaction.user.name),
-                    is_continuation=False, platform="discord", attachments=[{"filename": filename, "data": data}],
-                )
-                from commands.shared import sanitize_discord_bot_content
+        try:
+            reply = await ask_llm(
+                interaction.user.id, channel.id, "Describe or analyze this image.", str(interaction.user.name),
+                is_continuation=False, platform="discord", attachments=[{"filename": filename, "data": data}],
+            )
+            from commands.shared import sanitize_discord_bot_content
 
-                await interaction.followup.send(sanitize_discord_bot_content(reply or ""))
-            except Exception as e:
-                await interaction.followup.send(f"❌ Error analyzing image: {e}")
-        else:
-            try:
-                from io import BytesIO
-                await interaction.followup.send(f"📥 Downloaded: **{filename}**", file=discord.File(filename=filename, fp=BytesIO(data)))
-            except Exception as e:
-                await interaction.followup.send(f"❌ Failed to send file: {e}")
+            await interaction.followup.send(sanitize_discord_bot_content(reply or ""))
+        except Exception as e:
+            await interaction.followup.send(f"❌ Error analyzing image: {e}")
@@ -4,7 +4,7 @@ import discord
 from discord import app_commands
 from whitelist import get_user_permission
 from utils.llm_service import compare_files
-from commands.shared import send_long_message
+from commands.shared import interaction_progress, send_long_message
 
 
 def register(client: discord.Client):
@@ -31,7 +31,8 @@ def register(client: discord.Client):
                 return
             file_data_list = [{"filename": f.filename, "data": await f.read()} for f in files]
             result = await compare_files(
-                interaction.user.id, interaction.channel.id, file_data_list, prompt, str(interaction.user.name)
+                interaction.user.id, interaction.channel.id, file_data_list, prompt, str(interaction.user.name),
+                progress=interaction_progress(interaction),
             )
             await send_long_message(interaction, result)
         except Exception as e:
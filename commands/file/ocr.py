@@ -3,7 +3,7 @@ from typing import Optional
 import discord
 from discord import app_commands
 from utils.llm_service import analyze_file
-from commands.shared import send_long_message
+from commands.shared import interaction_progress, send_long_message
 from ._shared import defer_and_read_file
 
 
@@ -25,6 +25,7 @@ def register(client: discord.Client):
             result = await analyze_file(
                 interaction.user.id, interaction.channel.id, file.filename, file_data,
                 prompt, str(interaction.user.name), vision_mode="concise", return_only_text=True,
+                progress=interaction_progress(interaction),
             )
             await send_long_message(interaction, result)
         except Exception as e:
@@ -5,6 +5,12 @@ from whitelist import is_admin
 from commands.shared import bot_embed_thumbnail_url
 from utils import home_log
 from utils import reliability_telemetry
+from utils import endpoint_health
+from utils import llm_cache
+from utils import llm_scheduler
+from utils import loop_monitor
+from utils import model_warmth
+from utils import ollama_router
 
 
 def _build_reliability_embed(client: discord.Client, title: str) -> discord.Embed:
@@ -23,6 +29,21 @@ def _build_reliability_embed(client: discord.Client, title: str) -> discord.Embe
     embed.add_field(name="Discord send retries", value=str(data.get("discord_send_retries", 0)), inline=True)
     embed.add_field(name="Discord send errors", value=str(data.get("discord_send_errors", 0)), inline=True)
     embed.add_field(name="Message handler errors", value=str(data.get("message_handler_errors", 0)), inline=True)
+    cache_entries, cache_bytes = llm_cache.stats()
+    embed.add_field(
+        name="LLM cache",
+        value=(
+            f"{data.get('llm_cache_hits', 0)} hits / {data.get('llm_cache_misses', 0)} misses · "
+            f"{cache_entries} entries, {cache_bytes // 1024} KiB"
+        ),
+        inline=False,
+    )
+    embed.add_field(name="Event loop lag", value=loop_monitor.format_snapshot()[:1024], inline=False)
+    embed.add_field(name="LLM scheduler", value=llm_scheduler.format_snapshot()[:1024], inline=False)
+    embed.add_field(name="Ollama model loads", value=model_warmth.format_ratio()[:1024], inline=False)
+    embed.add_field(name="Ollama endpoints", value=endpoint_health.format_snapshot()[:1024], inline=False)
+    if len(ollama_router.hosts()) > 1:
+        embed.add_field(name="Ollama hosts", value=ollama_router.format_snapshot()[:1024], inline=False)
     embed.set_footer(text="Use /reliability action:reset to clear counters")
     return embed
 
@@ -1,9 +1,10 @@
 from typing import Optional
+import aiohttp
 import discord
 from discord import app_commands
-import requests
 from whitelist import has_himas_permission
-from integrations import HA_URL, HA_ACCESS_TOKEN
+from integrations import HA_URL
+from utils.ha_integration import ha_manager
 
 
 def register(client: discord.Client):
@@ -15,12 +16,14 @@ def register(client: discord.Client):
             return
         await interaction.response.defer()
         try:
-            headers = {"Authorization": f"Bearer {HA_ACCESS_TOKEN}", "Content-Type": "application/json"}
-            response = requests.get(f"{HA_URL}/api/states", headers=headers, timeout=10)
-            if response.status_code != 200:
-                await interaction.followup.send(f"❌ Failed to get entities: HTTP {response.status_code}")
-                return
-            entities = response.json()
+            session = await ha_manager.get_session()
+            async with session.get(
+                f"{HA_URL}/api/states", headers=ha_manager.headers, timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status != 200:
+                    await interaction.followup.send(f"❌ Failed to get entities: HTTP {response.status}")
+                    return
+                entities = await response.json()
             if search:
                 entities = [e for e in entities if search.lower() in e["entity_id"].lower()]
             if not entities:
@@ -1,12 +1,19 @@
+import asyncio
 import json
 import os
+import aiohttp
 import discord
-import requests
 from whitelist import has_himas_permission
-from integrations import HA_URL, HA_ACCESS_TOKEN
+from integrations import HA_URL
+from utils.ha_integration import ha_manager
 from ._shared import HA_MAPPINGS_FILE
 
 
+def _count_mappings() -> int:
+    with open(HA_MAPPINGS_FILE) as f:
+        return len(json.load(f))
+
+
 def register(client: discord.Client):
     @client.tree.command(name="ha-status", description="Check Home Assistant connection and entities")
     async def ha_status(interaction: discord.Interaction):
@@ -15,21 +22,23 @@ def register(client: discord.Client):
             return
         await interaction.response.defer()
         try:
-            headers = {"Authorization": f"Bearer {HA_ACCESS_TOKEN}", "Content-Type": "application/json"}
-            response = requests.get(f"{HA_URL}/api/", headers=headers, timeout=10)
-            embed = discord.Embed(title="🏠 Home Assistant Status", color=discord.Color.green() if response.status_code == 200 else discord.Color.red())
-            if response.status_code == 200:
-                data = response.json()
+            session = await ha_manager.get_session()
+            timeout = aiohttp.ClientTimeout(total=10)
+            async with session.get(f"{HA_URL}/api/", headers=ha_manager.headers, timeout=timeout) as response:
+                status = response.status
+                data = await response.json() if status == 200 else {}
+            embed = discord.Embed(title="🏠 Home Assistant Status", color=discord.Color.green() if status == 200 else discord.Color.red())
+            if status == 200:
                 embed.add_field(name="Status", value="✅ Connected", inline=True)
                 embed.add_field(name="Version", value=data.get("message", "Unknown"), inline=True)
-                entities_response = requests.get(f"{HA_URL}/api/states", headers=headers, timeout=10)
-                if entities_response.status_code == 200:
-                    embed.add_field(name="Entities", value=str(len(entities_response.json())), inline=True)
+                async with session.get(f"{HA_URL}/api/states", headers=ha_manager.headers, timeout=timeout) as entities_response:
+                    if entities_response.status == 200:
+                        embed.add_field(name="Entities", value=str(len(await entities_response.json())), inline=True)
                 if os.path.exists(HA_MAPPINGS_FILE):
-                    embed.add_field(name="Mappings", value=str(len(json.load(open(HA_MAPPINGS_FILE)))), inline=True)
+                    embed.add_field(name="Mappings", value=str(await asyncio.to_thread(_count_mappings)), inline=True)
             else:
                 embed.add_field(name="Status", value="❌ Disconnected", inline=True)
-                embed.add_field(name="Error", value=f"HTTP {response.status_code}", inline=True)
+                embed.add_field(name="Error", value=f"HTTP {status}", inline=True)
             await interaction.followup.send(embed=embed)
         except Exception as e:
             await interaction.followup.send(f"❌ Error: {str(e)[:200]}")
@@ -16,6 +16,7 @@ from llm_function_prefs import (
     set_function_persona_name,
 )
 from models import model_manager
+from utils import model_registry
 from personas import persona_manager
 from utils.llm_service import validate_and_set_function_model, validate_and_set_model
 from whitelist import get_user_permission, is_admin
@@ -222,11 +223,16 @@ class LLMSettingsView(View):
                 prov, mname = pair
                 eff = model_manager.get_effective_model_for_function(self.user_id, self.fn_key)
                 is_eff = prov == eff.get("provider") and mname == eff.get("model")
+                notes = []
+                if is_eff:
+                    notes.append("Current for this function")
+                if model_registry.is_vision(mname, prov):
+                    notes.append("Vision (can read images)")
                 m_opts.append(
                     discord.SelectOption(
                         label=f"[{prov}] {mname}"[:100],
                         value=str(i),
-                        description="Current for this function" if is_eff else None,
+                        description=" · ".join(notes) or None,
                     )
                 )
         if m_opts:
@@ -1,10 +1,10 @@
 import json
-import requests
 import discord
 from discord import app_commands
 from whitelist import is_admin
 from integrations import OLLAMA_URL
 from models import model_manager
+from utils import llm_http
 from utils.llm_service import validate_and_set_model, validate_and_set_image_generation_model
 
 
@@ -73,23 +73,22 @@ def register(client: discord.Client):
 
             # type.value == "local"
             url = f"{OLLAMA_URL}/api/pull"
-            response = requests.post(url, json={"name": model}, stream=True, timeout=600)
-            if response.status_code != 200:
-                await interaction.followup.send(f"❌ Pull failed: HTTP {response.status_code}")
-                return
             lines = [f"⏳ **Pulling `{model}`**\n"]
             await interaction.edit_original_response(content=lines[0])
             last_update = 0
-            for line in response.iter_lines():
-                if not line:
-                    continue
+            failed = False
+
+            async def on_line(line: str) -> None:
+                nonlocal last_update, failed
+                if failed:
+                    return
                 try:
                     data = json.loads(line)
                     if "status" in data:
                         lines.append(_status_line(data))
                     if "error" in data:
                         lines.append(f"❌ {data['error']}")
-                        break
+                        failed = True
                 except json.JSONDecodeError:
                     pass
                 if len(lines) >= 2 and (len(lines) - last_update) >= 3:
@@ -101,19 +100,26 @@ def register(client: discord.Client):
                     except discord.NotFound:
                         pass
                     last_update = len(lines)
+
+            # Streamed on the shared async transport; 600 s is the longest gap allowed between progress lines.
+            response = await llm_http.post_stream(url, on_line, json_body={"name": model}, timeout=600)
+            if response is None or response.status_code != 200:
+                status = response.status_code if response is not None else "no response"
+                await interaction.followup.send(f"❌ Pull failed: HTTP {status}")
+                return
             final = "\n".join(lines[-20:])
             if len(final) > 1900:
                 final = final[-1900:]
             from utils.llm_service import clear_vision_model_cache
             clear_vision_model_cache()
-            model_manager.list_all_models(refresh_local=True)
+            await model_manager.refresh_local_models_async(force=True)
             if "error" in final.lower():
                 await interaction.edit_original_response(content=final)
             else:
                 await interaction.edit_original_response(
                     content=final.rstrip() + "\n\n✅ **Done.** Use **/llm-settings** to pick this model for chat or another function."
                 )
-        except requests.exceptions.Timeout:
+        except llm_http.TransportTimeout:
             await interaction.followup.send("❌ Pull timed out. Try again or check Ollama.")
         except Exception as e:
             await interaction.followup.send(f"❌ Error: {str(e)[:200]}")
@@ -12,12 +12,19 @@ def register(client: discord.Client):
         time="When to remind (e.g., 'in 2 hours', 'tomorrow at 3pm')",
         message="Reminder message",
         channel="Channel to send reminder (optional)",
+        repeat="Repeat the reminder (optional)",
     )
+    @app_commands.choices(repeat=[
+        app_commands.Choice(name="hourly", value="hourly"),
+        app_commands.Choice(name="daily", value="daily"),
+        app_commands.Choice(name="weekly", value="weekly"),
+    ])
     async def remind(
         interaction: discord.Interaction,
         time: str,
         message: str,
         channel: Optional[discord.TextChannel] = None,
+        repeat: Optional[app_commands.Choice[str]] = None,
     ):
         if not get_user_permission(interaction.user.id):
             await interaction.response.send_message("❌ Denied", ephemeral=True)
@@ -30,11 +37,14 @@ def register(client: discord.Client):
                 return
             target_channel = channel.id if channel else interaction.channel_id
             reminder_id = reminder_manager.add_timed_reminder(
-                interaction.user.id, target_channel, message, reminder_time, is_dm=False
+                interaction.user.id, target_channel, message, reminder_time, is_dm=False,
+                repeat=repeat.value if repeat else None,
             )
             embed = discord.Embed(title="⏰ Reminder set", color=discord.Color.green())
             embed.add_field(name="When", value=f"<t:{int(reminder_time.timestamp())}:F> (<t:{int(reminder_time.timestamp())}:R>)", inline=False)
             embed.add_field(name="Message", value=message[:1024] or "*No message*", inline=False)
+            if repeat:
+                embed.add_field(name="Repeats", value=repeat.name, inline=True)
             embed.add_field(name="ID", value=f"`{reminder_id}`", inline=True)
             embed.set_footer(text="Use /cancel-reminder with this ID to cancel")
             await interaction.followup.send(embed=embed)
@@ -16,6 +16,8 @@ def register(client: discord.Client):
         embed = discord.Embed(title="⏰ Your Active Reminders", color=discord.Color.blue())
         for reminder in user_reminders[:10]:
             time_str = f"<t:{int(reminder.trigger_time.timestamp())}:R>"
+            if reminder.repeat:
+                time_str += f" ({reminder.repeat})"
             location = "DMs" if reminder.is_dm else f"<#{reminder.channel_id}>"
             msg_preview = (reminder.message[:100] + "...") if len(reminder.message) > 100 else reminder.message
             embed.add_field(
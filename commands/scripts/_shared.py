@@ -1,3 +1,4 @@
+import asyncio
 import os
 import re
 from datetime import datetime, timedelta
@@ -58,3 +59,38 @@ def parse_when(when: Optional[str]) -> Tuple[bool, Optional[float], None]:
             target += timedelta(days=1)
         return False, (target - now).total_seconds(), None
     return True, None, None
+
+
+async def run_script(path: str, timeout: float) -> Tuple[int, str, str]:
+    """
+    Run a script as an async subprocess (the event loop keeps serving everyone else).
+    Returns (exit code, stdout, stderr); kills the process and raises asyncio.TimeoutError after `timeout`.
+    """
+    argv = [os.environ.get("PYTHON", "python3"), path] if path.endswith(".py") else ["bash", path]
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        cwd=SCRIPTS_DIR,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException:
+        # Timeout or cancellation: do not leave the script running.
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    return proc.returncode, out.decode(errors="replace"), err.decode(errors="replace")
+
+
+def format_script_output(returncode: int, stdout: str, stderr: str) -> str:
+    out = (stdout or "").strip() or "(no output)"
+    err = (stderr or "").strip()
+    if returncode != 0:
+        out = f"Exit code: {returncode}\n{out}"
+        if err:
+            out += f"\n{err}"
+    if len(out) > 1900:
+        out = out[:1900] + "..."
+    return out
@@ -1,12 +1,11 @@
 import os
 import asyncio
-import subprocess
 from typing import Optional
 import discord
 from discord import app_commands
 from whitelist import is_admin
 from utils import home_log
-from ._shared import list_scripts, parse_when, SCRIPTS_DIR
+from ._shared import list_scripts, parse_when, run_script as run_script_async, format_script_output, SCRIPTS_DIR
 
 # Scripts that wait for remote output (e.g. tail -f until sentinel): need longer timeout and background run
 LONG_RUNNING_SCRIPTS = {"site-update-1.py", "site-start-1.py"}
@@ -52,22 +51,12 @@ def register(client: discord.Client):
             async def run_later():
                 await asyncio.sleep(delay_sec)
                 try:
-                    if chosen.endswith(".py"):
-                        result = subprocess.run([os.environ.get("PYTHON", "python3"), path], cwd=SCRIPTS_DIR, capture_output=True, text=True, timeout=300)
-                    else:
-                        result = subprocess.run(["bash", path], cwd=SCRIPTS_DIR, capture_output=True, text=True, timeout=300)
-                    out = (result.stdout or "").strip() or "(no output)"
-                    err = (result.stderr or "").strip()
-                    if result.returncode != 0:
-                        out = f"Exit code: {result.returncode}\n{out}"
-                        if err:
-                            out += f"\n{err}"
-                    if len(out) > 1900:
-                        out = out[:1900] + "..."
-                    embed = discord.Embed(title=f"📜 Ran `{chosen}` (scheduled)", description=out, color=discord.Color.green() if result.returncode == 0 else discord.Color.orange())
-                    embed.set_footer(text=f"Exit code: {result.returncode}")
+                    returncode, stdout, stderr = await run_script_async(path, 300)
+                    out = format_script_output(returncode, stdout, stderr)
+                    embed = discord.Embed(title=f"📜 Ran `{chosen}` (scheduled)", description=out, color=discord.Color.green() if returncode == 0 else discord.Color.orange())
+                    embed.set_footer(text=f"Exit code: {returncode}")
                     await home_log.send_to_home(embed=embed)
-                except subprocess.TimeoutExpired:
+                except asyncio.TimeoutError:
                     await home_log.send_to_home(content=f"❌ Script `{chosen}` timed out (300s).")
                 except Exception as e:
                     home_log.log_sync(f"Script run error: {e}")
@@ -83,38 +72,16 @@ def register(client: discord.Client):
         async def run_and_send_to_home():
             timeout = LONG_RUNNING_TIMEOUT if is_long_running else 120
             try:
-                if chosen.endswith(".py"):
-                    result = subprocess.run(
-                        [os.environ.get("PYTHON", "python3"), path],
-                        cwd=SCRIPTS_DIR,
-                        capture_output=True,
-                        text=True,
-                        timeout=timeout,
-                    )
-                else:
-                    result = subprocess.run(
-                        ["bash", path],
-                        cwd=SCRIPTS_DIR,
-                        capture_output=True,
-                        text=True,
-                        timeout=timeout,
-                    )
-                out = (result.stdout or "").strip() or "(no output)"
-                err = (result.stderr or "").strip()
-                if result.returncode != 0:
-                    out = f"Exit code: {result.returncode}\n{out}"
-                    if err:
-                        out += f"\n{err}"
-                if len(out) > 1900:
-                    out = out[:1900] + "..."
+                returncode, stdout, stderr = await run_script_async(path, timeout)
+                out = format_script_output(returncode, stdout, stderr)
                 embed = discord.Embed(
                     title=f"📜 Ran `{chosen}`",
                     description=out,
-                    color=discord.Color.green() if result.returncode == 0 else discord.Color.orange(),
+                    color=discord.Color.green() if returncode == 0 else discord.Color.orange(),
                 )
-                embed.set_footer(text=f"Exit code: {result.returncode}")
+                embed.set_footer(text=f"Exit code: {returncode}")
                 await home_log.send_to_home(embed=embed)
-            except subprocess.TimeoutExpired:
+            except asyncio.TimeoutError:
                 await home_log.send_to_home(content=f"❌ Script `{chosen}` timed out ({timeout}s).")
             except Exception as e:
                 await home_log.send_to_home(content=f"❌ Script `{chosen}` error: {str(e)[:500]}")
@@ -124,27 +91,14 @@ def register(client: discord.Client):
             return
         await interaction.response.defer()
         try:
-            result = subprocess.run(
-                [os.environ.get("PYTHON", "python3"), path] if chosen.endswith(".py") else ["bash", path],
-                cwd=SCRIPTS_DIR,
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
-            out = (result.stdout or "").strip() or "(no output)"
-            err = (result.stderr or "").strip()
-            if result.returncode != 0:
-                out = f"Exit code: {result.returncode}\n{out}"
-                if err:
-                    out += f"\n{err}"
-            if len(out) > 1900:
-                out = out[:1900] + "..."
+            returncode, stdout, stderr = await run_script_async(path, 120)
+            out = format_script_output(returncode, stdout, stderr)
             embed = discord.Embed(
                 title=f"📜 Ran `{chosen}`",
                 description=out,
-                color=discord.Color.green() if result.returncode == 0 else discord.Color.orange(),
+                color=discord.Color.green() if returncode == 0 else discord.Color.orange(),
             )
-            embed.set_footer(text=f"Exit code: {result.returncode}")
+            embed.set_footer(text=f"Exit code: {returncode}")
             sent = await home_log.send_to_home(embed=embed)
             if sent:
                 await interaction.followup.send("✅ Output sent to home channel.", ephemeral=True)
@@ -153,7 +107,7 @@ def register(client: discord.Client):
                     embed=embed,
                     content="*(Home channel not set; use /sethome.)*",
                 )
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             await interaction.followup.send(f"❌ Script `{chosen}` timed out (120s).")
         except Exception as e:
             await interaction.followup.send(f"❌ Error: {str(e)[:200]}")
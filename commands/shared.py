@@ -265,3 +265,21 @@ async def send_long_message(interaction: discord.Interaction, message: str, max_
         await interaction.followup.send(chunk)
         if i < len(chunks) - 1:
             await asyncio.sleep(_CHUNK_SEND_DELAY)
+
+
+def interaction_progress(interaction: discord.Interaction, min_interval: float = 1.5):
+    """Progress callback for long jobs: edits the deferred response, at most once per `min_interval` seconds."""
+    last = 0.0
+
+    async def report(message: str) -> None:
+        nonlocal last
+        now = asyncio.get_running_loop().time()
+        if now - last < min_interval:
+            return
+        last = now
+        try:
+            await interaction.edit_original_response(content=message[:MAX_MESSAGE_LENGTH])
+        except discord.HTTPException:
+            pass
+
+    return report
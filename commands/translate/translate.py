@@ -19,7 +19,9 @@ async def do_translate(user_id: int, text: str, target_language: str = "English"
     system = f"{base}\n\n{instr}" if base else instr
     messages = [{"role": "system", "content": system}, {"role": "user", "content": text}]
     try:
-        _, out = await _try_models_with_fallback(model_name, messages, images=False, provider=provider)
+        _, out = await _try_models_with_fallback(
+            model_name, messages, images=False, provider=provider, cache_fn="translate"
+        )
         return (out or "").strip()
     except Exception:
         return ""
@@ -1,6 +1,13 @@
-"""Bot config: wake word, startup channel, download limit, etc."""
-import json
-from typing import Any, Dict
+"""Bot config: wake word, startup channel, download limit, etc.
+
+config.json is held in memory as a read-only snapshot (utils.settings_store), so the per-message
+getters below do no file I/O; external edits are picked up within a second.
+"""
+import copy
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, NamedTuple, Tuple
+
+from utils import settings_store
 
 CONFIG_FILE = "config.json"
 
@@ -19,27 +26,48 @@ DEFAULTS = {
 }
 
 
+class _ConfigSnapshot(NamedTuple):
+    data: Mapping[str, Any]
+    conversation_channels: Tuple[int, ...]
+    conversation_channel_set: FrozenSet[int]
+
+
+def _parse_config(raw: Any) -> _ConfigSnapshot:
+    if not isinstance(raw, dict):
+        raise TypeError("config.json must contain a JSON object")
+    data = copy.deepcopy(raw)
+    ids = []
+    for item in data.get("conversation_channels", []) or []:
+        try:
+            ids.append(int(item))
+        except (TypeError, ValueError):
+            continue
+    return _ConfigSnapshot(MappingProxyType(data), tuple(ids), frozenset(ids))
+
+
+_store = settings_store.JsonSnapshot(CONFIG_FILE, _parse_config, lambda: dict(DEFAULTS))
+
+
+def config_view() -> Mapping[str, Any]:
+    """Read-only view of the current config (no copy); use get_config() to modify and save."""
+    return _store.get().data
+
+
 def get_config() -> Dict[str, Any]:
-    try:
-        with open(CONFIG_FILE) as f:
-            return json.load(f)
-    except FileNotFoundError:
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(DEFAULTS, f, indent=4)
-        return DEFAULTS.copy()
+    """A mutable copy of the config, for callers that change it and call save_config()."""
+    return copy.deepcopy(dict(_store.get().data))
 
 
 def save_config(config: Dict[str, Any]) -> None:
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+    _store.save(config)
 
 
 def get_wake_word() -> str:
-    return get_config().get("wake_word", DEFAULTS["wake_word"])
+    return config_view().get("wake_word", DEFAULTS["wake_word"])
 
 
 def is_bot_awake() -> bool:
-    return bool(get_config().get("is_awake", DEFAULTS["is_awake"]))
+    return bool(config_view().get("is_awake", DEFAULTS["is_awake"]))
 
 
 def set_bot_awake(is_awake: bool) -> None:
@@ -50,7 +78,7 @@ def set_bot_awake(is_awake: bool) -> None:
 
 def get_startup_channel_id():
     """Return the /sethome channel ID or None."""
-    raw = get_config().get("startup_channel_id")
+    raw = config_view().get("startup_channel_id")
     if raw is None or raw == "":
         return None
     try:
@@ -60,7 +88,7 @@ def get_startup_channel_id():
 
 
 def get_download_limit_mb() -> int:
-    return int(get_config().get("download_limit_mb", DEFAULTS["download_limit_mb"]))
+    return int(config_view().get("download_limit_mb", DEFAULTS["download_limit_mb"]))
 
 
 def set_download_limit_mb(mb: int) -> None:
@@ -71,7 +99,7 @@ def set_download_limit_mb(mb: int) -> None:
 
 def get_current_persona() -> str:
     """Return the global persona name (used for all users)."""
-    return get_config().get("current_persona", DEFAULTS["current_persona"]) or "default"
+    return config_view().get("current_persona", DEFAULTS["current_persona"]) or "default"
 
 
 def set_current_persona(name: str) -> None:
@@ -83,7 +111,7 @@ def set_current_persona(name: str) -> None:
 
 def get_chat_history() -> int:
     """Number of user messages to remember per chat (pairs = user+assistant, so 2x messages kept)."""
-    return max(1, min(100, int(get_config().get("chat_history", DEFAULTS["chat_history"]) or 20)))
+    return max(1, min(100, int(config_view().get("chat_history", DEFAULTS["chat_history"]) or 20)))
 
 
 def set_chat_history(n: int) -> None:
@@ -95,15 +123,11 @@ def set_chat_history(n: int) -> None:
 
 def get_conversation_channels():
     """Return list of channel IDs where auto-conversation is enabled."""
-    cfg = get_config()
-    raw = cfg.get("conversation_channels", []) or []
-    ids = []
-    for item in raw:
-        try:
-            ids.append(int(item))
-        except (TypeError, ValueError):
-            continue
-    return ids
+    return list(_store.get().conversation_channels)
+
+
+def is_conversation_channel(channel_id: int) -> bool:
+    return channel_id in _store.get().conversation_channel_set
 
 
 def add_conversation_channel(channel_id: int) -> None:
@@ -129,7 +153,7 @@ def remove_conversation_channel(channel_id: int) -> None:
 
 def get_conversation_frequency():
     """Return (min_messages, max_messages) for auto-conversation trigger."""
-    cfg = get_config()
+    cfg = config_view()
     try:
         min_n = int(cfg.get("conversation_min_interval", DEFAULTS["conversation_min_interval"]) or 5)
     except (TypeError, ValueError):
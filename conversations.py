@@ -1,15 +1,28 @@
-import json
 import re
 import time
 from collections import defaultdict
 from typing import Any, Dict, List, Optional
 
 from config import get_chat_history
+from utils.journal_store import JournalStore
+from utils.state_store import DELETE, open_store
 
 
 DM_SESSION_GAP_SECONDS = 36 * 3600  # treat as fresh session after this idle (unless reply-to-bot)
 _TOPIC_STALE_SECONDS = 30 * 86400  # forget topic summaries not touched in ~30 days
 _DM_TOPICS_MAX = 14
+# Per-channel dicts persisted row-by-row (recent_bot_message_ids stays in memory).
+_PERSISTED_FIELDS = (
+    "conversations",
+    "last_bot_message",
+    "dm_history_cutoff",
+    "dm_summaries",
+    "dm_topics",
+    "dm_profile_llm",
+    "dm_last_user_ts",
+    "dm_adaptive_user_id",
+    "dm_fast_reply_until",
+)
 
 # Strip embedded "recent channel" block from persisted user lines (see ask_llm / Discord context).
 _DISCORD_RECENT_CTX_RE = re.compile(
@@ -74,6 +87,9 @@ class ConversationManager:
         self.dm_last_user_ts = {}  # channel_id -> last user message unix time (for session gap)
         self.dm_adaptive_user_id = {}  # channel_id -> int user id when DM is adaptive (for background tasks)
         self.dm_fast_reply_until = {}
+        self._store = open_store("conversations", _PERSISTED_FIELDS, JournalStore(save_file, _PERSISTED_FIELDS))
+        self._dirty = set()  # (field, channel key) changed since last save()
+        self._needs_rewrite = False
         self._load()
 
     def set_max_history(self, n: int):
@@ -83,6 +99,10 @@ class ConversationManager:
     def _key(self, channel_id):
         return str(channel_id)
 
+    def _mark(self, key: str, *fields: str) -> None:
+        for field in fields:
+            self._dirty.add((field, key))
+
     def is_continuation(self, message):
         if not message.reference or not message.reference.message_id:
             return False
@@ -103,13 +123,17 @@ class ConversationManager:
         return (time.time() - float(last)) < DM_SESSION_GAP_SECONDS
 
     def touch_dm_user_activity(self, channel_id: int) -> None:
-        self.dm_last_user_ts[self._key(channel_id)] = time.time()
+        key = self._key(channel_id)
+        self.dm_last_user_ts[key] = time.time()
+        self._mark(key, "dm_last_user_ts")
 
     def get_dm_last_user_activity(self, channel_id: int):
         return self.dm_last_user_ts.get(self._key(channel_id))
 
     def set_dm_adaptive_user(self, channel_id: int, user_id: int) -> None:
-        self.dm_adaptive_user_id[self._key(channel_id)] = int(user_id)
+        key = self._key(channel_id)
+        self.dm_adaptive_user_id[key] = int(user_id)
+        self._mark(key, "dm_adaptive_user_id")
 
     def get_dm_adaptive_user(self, channel_id: int):
         raw = self.dm_adaptive_user_id.get(self._key(channel_id))
@@ -124,6 +148,7 @@ class ConversationManager:
         if len(t) > 1200:
             t = t[:1200].rstrip()
         self.dm_profile_llm[key] = t
+        self._mark(key, "dm_profile_llm")
 
     def get_dm_topics(self, channel_id: int):
         return list(self.dm_topics.get(self._key(channel_id), []) or [])
@@ -155,6 +180,7 @@ class ConversationManager:
                 }
             )
         self.dm_topics[key] = cleaned[-_DM_TOPICS_MAX:]
+        self._mark(key, "dm_topics")
 
     def prune_stale_dm_topics(self, channel_id: int) -> None:
         """Drop topics older than stale window."""
@@ -164,6 +190,7 @@ class ConversationManager:
         kept = [t for t in items if now - float(t.get("last_ts", 0)) <= _TOPIC_STALE_SECONDS]
         if len(kept) != len(items):
             self.dm_topics[key] = kept[-_DM_TOPICS_MAX:]
+            self._mark(key, "dm_topics")
 
     def add_message(
         self,
@@ -180,6 +207,7 @@ class ConversationManager:
         self.conversations[key].append(entry)
         if len(self.conversations[key]) > self.max_history * 2:
             self.conversations[key] = self.conversations[key][-self.max_history * 2 :]
+        self._mark(key, "conversations")
 
     def get_conversation(self, channel_id):
         return self.conversations.get(self._key(channel_id), [])
@@ -209,6 +237,7 @@ class ConversationManager:
     def replace_conversation(self, channel_id, messages):
         key = self._key(channel_id)
         self.conversations[key] = list(messages or [])
+        self._mark(key, "conversations")
 
     def reset_dm_transcript_only(self, channel_id: int) -> None:
         """Clear rolling DM messages only; keep topic summaries and LLM profile memory."""
@@ -216,6 +245,7 @@ class ConversationManager:
         self.conversations[key] = []
         self.last_bot_message.pop(key, None)
         self.recent_bot_message_ids.pop(key, None)
+        self._mark(key, "conversations", "last_bot_message")
 
     def clear_conversation(self, channel_id=None, user_id=None):
         if channel_id is not None:
@@ -229,6 +259,7 @@ class ConversationManager:
             self.dm_last_user_ts.pop(key, None)
             self.dm_adaptive_user_id.pop(key, None)
             self.dm_fast_reply_until.pop(key, None)
+            self._mark(key, *_PERSISTED_FIELDS)
         elif user_id is not None:
             self.conversations.clear()
             self.last_bot_message.clear()
@@ -240,6 +271,7 @@ class ConversationManager:
             self.dm_profile_llm.clear()
             self.dm_last_user_ts.clear()
             self.dm_adaptive_user_id.clear()
+            self._needs_rewrite = True
 
     def get_dm_history_cutoff(self, channel_id, default_cutoff=10):
         key = self._key(channel_id)
@@ -252,6 +284,7 @@ class ConversationManager:
     def set_dm_history_cutoff(self, channel_id, cutoff):
         key = self._key(channel_id)
         self.dm_history_cutoff[key] = max(4, min(80, int(cutoff)))
+        self._mark(key, "dm_history_cutoff")
 
     def append_dm_summary(self, channel_id, summary_text, merged_messages=0):
         key = self._key(channel_id)
@@ -263,6 +296,7 @@ class ConversationManager:
             }
         )
         self.dm_summaries[key] = entries[-8:]
+        self._mark(key, "dm_summaries")
 
     def get_dm_summaries(self, channel_id):
         return self.dm_summaries.get(self._key(channel_id), [])
@@ -307,9 +341,12 @@ class ConversationManager:
         key = self._key(channel_id)
         mins = max(1, min(240, int(minutes)))
         self.dm_fast_reply_until[key] = time.time() + (mins * 60)
+        self._mark(key, "dm_fast_reply_until")
 
     def clear_dm_fast_reply_window(self, channel_id):
-        self.dm_fast_reply_until.pop(self._key(channel_id), None)
+        key = self._key(channel_id)
+        self.dm_fast_reply_until.pop(key, None)
+        self._mark(key, "dm_fast_reply_until")
 
     def get_dm_fast_reply_remaining_seconds(self, channel_id) -> int:
         key = self._key(channel_id)
@@ -319,6 +356,7 @@ class ConversationManager:
         remaining = int(until - time.time())
         if remaining <= 0:
             self.dm_fast_reply_until.pop(key, None)
+            self._mark(key, "dm_fast_reply_until")
             return 0
         return remaining
 
@@ -332,24 +370,37 @@ class ConversationManager:
         if message_id not in ids:
             ids.append(message_id)
         self.recent_bot_message_ids[key] = ids[-10:]
+        self._mark(key, "last_bot_message")
+
+    def _state(self) -> Dict[str, Dict[str, Any]]:
+        return {field: dict(getattr(self, field)) for field in _PERSISTED_FIELDS}
 
     def save(self):
-        with open(self.save_file, "w") as f:
-            json.dump(
-                {
-                    "conversations": dict(self.conversations),
-                    "last_bot_message": self.last_bot_message,
-                    "dm_history_cutoff": self.dm_history_cutoff,
-                    "dm_summaries": dict(self.dm_summaries),
-                    "dm_topics": dict(self.dm_topics),
-                    "dm_profile_llm": dict(self.dm_profile_llm),
-                    "dm_last_user_ts": dict(self.dm_last_user_ts),
-                    "dm_adaptive_user_id": dict(self.dm_adaptive_user_id),
-                    "dm_fast_reply_until": self.dm_fast_reply_until,
-                },
-                f,
-                indent=2,
-            )
+        """
+        Persist only the channels changed since the last save (SQLite rows, or the JSON journal
+        that is batched, fsync'd and periodically compacted into data/conversations.json).
+        """
+        if self._needs_rewrite:
+            self._needs_rewrite = False
+            self._dirty.clear()
+            self._store.rewrite(self._state())
+            return
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        changes = []
+        for field, key in dirty:
+            block = getattr(self, field)
+            if key in block:
+                changes.append((field, key, block[key]))
+            else:
+                changes.append((field, key, DELETE))
+        self._store.submit(changes)
+
+    def close(self) -> None:
+        """Flush pending writes (compacts the JSON journal / checkpoints SQLite) on shutdown."""
+        self.save()
+        self._store.close()
 
     def _migrate_legacy_summaries(self) -> None:
         """One-time: fold legacy dm_summaries into dm_topics so nothing is lost."""
@@ -377,25 +428,22 @@ class ConversationManager:
             if topics:
                 self.dm_topics[key] = topics[-_DM_TOPICS_MAX:]
                 self.dm_summaries[key] = []
+                self._mark(key, "dm_topics", "dm_summaries")
                 dirty = True
         if dirty:
             self.save()
 
     def _load(self):
-        try:
-            with open(self.save_file) as f:
-                data = json.load(f)
-                self.conversations = defaultdict(list, data.get("conversations", {}))
-                self.last_bot_message = data.get("last_bot_message", {})
-                self.dm_history_cutoff = data.get("dm_history_cutoff", {})
-                self.dm_summaries = defaultdict(list, data.get("dm_summaries", {}))
-                self.dm_fast_reply_until = data.get("dm_fast_reply_until", {})
-                self.dm_topics = defaultdict(list, data.get("dm_topics", {}))
-                self.dm_profile_llm = dict(data.get("dm_profile_llm", {}))
-                self.dm_last_user_ts = dict(data.get("dm_last_user_ts", {}))
-                self.dm_adaptive_user_id = dict(data.get("dm_adaptive_user_id", {}))
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
+        data = self._store.load()
+        self.conversations = defaultdict(list, data.get("conversations", {}))
+        self.last_bot_message = data.get("last_bot_message", {})
+        self.dm_history_cutoff = data.get("dm_history_cutoff", {})
+        self.dm_summaries = defaultdict(list, data.get("dm_summaries", {}))
+        self.dm_fast_reply_until = data.get("dm_fast_reply_until", {})
+        self.dm_topics = defaultdict(list, data.get("dm_topics", {}))
+        self.dm_profile_llm = dict(data.get("dm_profile_llm", {}))
+        self.dm_last_user_ts = dict(data.get("dm_last_user_ts", {}))
+        self.dm_adaptive_user_id = dict(data.get("dm_adaptive_user_id", {}))
         self._migrate_legacy_summaries()
         self._one_time_clear_transcripts_keep_dm_memory()
 
@@ -421,6 +469,7 @@ class ConversationManager:
                 f.write("1\n")
         except OSError:
             pass
+        self._needs_rewrite = True
         self.save()
 
 
@@ -86,6 +86,17 @@ def _env_bool(key: str, default: bool = True) -> bool:
     return str(raw).strip().lower() in ("1", "true", "yes", "on", "y")
 
 
+def _env_int(key: str, default: int, minimum: int = 1, maximum: int = 1024) -> int:
+    raw = _DOTENV_VALUES.get(key)
+    if raw is None or str(raw).strip() == "":
+        raw = os.environ.get(key, "")
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        return default
+    return max(minimum, min(maximum, value))
+
+
 def _env_raw(key: str) -> str:
     """Single env value for non-secret strings (e.g. model names); strip quotes only, keep spaces/slashes."""
     if key in _DOTENV_VALUES:
@@ -118,6 +129,10 @@ DISCORD_BOT_TOKEN = _get_secret("DISCORD_BOT_TOKEN")
 HA_URL = _normalize_secret(_DOTENV_VALUES.get("HA_URL", "") or os.environ.get("HA_URL", "")) or 'http://192.168.0.149:8123'
 HA_ACCESS_TOKEN = _get_secret("HA_ACCESS_TOKEN")
 OLLAMA_URL = _normalize_secret(_DOTENV_VALUES.get("OLLAMA_URL", "") or os.environ.get("OLLAMA_URL", "")) or 'http://localhost:11434'
+# Ollama host pool (comma-separated base URLs) for utils/ollama_router.py; defaults to OLLAMA_URL alone.
+OLLAMA_HOSTS = list(
+    dict.fromkeys(h.strip().rstrip("/") for h in (_env_raw("OLLAMA_HOSTS") or OLLAMA_URL).split(",") if h.strip())
+) or [OLLAMA_URL.rstrip("/")]
 
 # /himas: try Home Assistant Assist (conversation API) first; LLM fallback uses HIMAS_PARSE_* below.
 HIMAS_ASSIST_ENABLED = _env_bool("HIMAS_ASSIST_ENABLED", True)
@@ -133,6 +148,48 @@ HIMAS_PARSE_PROVIDER = (
     .lower()
 )
 HIMAS_PARSE_MODEL = _env_raw("HIMAS_PARSE_MODEL")
+# Max in-flight LLM HTTP requests per host (shared keep-alive pool in utils/llm_http.py).
+LLM_HTTP_OLLAMA_CONCURRENCY = _env_int("LLM_HTTP_OLLAMA_CONCURRENCY", 4)
+LLM_HTTP_OPENROUTER_CONCURRENCY = _env_int("LLM_HTTP_OPENROUTER_CONCURRENCY", 8)
+# Largest context window (tokens) requested from Ollama as options.num_ctx; smaller when the model's own is
+# smaller (utils/context_budget.py). Chat history, DM notes and channel context are trimmed to fit it.
+LLM_NUM_CTX = _env_int("LLM_NUM_CTX", 8192, minimum=2048, maximum=262144)
+# LLM scheduler (utils/llm_scheduler.py): total concurrent Ollama generations over the host pool, caps for
+# /himas parsing and background work (news, DM summaries, auto-conversation), and how many background
+# requests may queue before new ones are dropped.
+LLM_SCHED_MAX_CONCURRENCY = _env_int("LLM_SCHED_MAX_CONCURRENCY", LLM_HTTP_OLLAMA_CONCURRENCY * len(OLLAMA_HOSTS))
+LLM_SCHED_HA_CONCURRENCY = _env_int("LLM_SCHED_HA_CONCURRENCY", 2)
+LLM_SCHED_BACKGROUND_CONCURRENCY = _env_int("LLM_SCHED_BACKGROUND_CONCURRENCY", 1)
+LLM_SCHED_BACKGROUND_QUEUE = _env_int("LLM_SCHED_BACKGROUND_QUEUE", 8, minimum=0)
+# Persistence backend for conversations, adaptive state, models, reminders and news data:
+# sqlite = data/state.db (WAL, row-level writes; legacy JSON files imported once) | json = legacy files.
+STATE_BACKEND = (_env_raw("STATE_BACKEND") or "sqlite").lower()
+if STATE_BACKEND not in ("sqlite", "json"):
+    STATE_BACKEND = "sqlite"
+# Byte budget for cached deterministic LLM replies (utils/llm_cache.py); 0 disables the cache.
+LLM_CACHE_MAX_MB = _env_int("LLM_CACHE_MAX_MB", 16, minimum=0)
+# Large files in /analyze and /compare-files are read in chunks of ~this many tokens (utils/chunked_analysis.py),
+# with at most FILE_ANALYSIS_CONCURRENCY chunk requests in flight per file.
+FILE_ANALYSIS_CHUNK_TOKENS = _env_int("FILE_ANALYSIS_CHUNK_TOKENS", 2000, minimum=500, maximum=32768)
+FILE_ANALYSIS_CONCURRENCY = _env_int("FILE_ANALYSIS_CONCURRENCY", 3, maximum=16)
+# /download and wake-word downloads stream to disk; at most this many run at once (others wait their turn).
+DOWNLOAD_CONCURRENCY = _env_int("DOWNLOAD_CONCURRENCY", 2, maximum=16)
+# Images are downscaled to this long edge (px, lower for low-res vision models) and re-encoded before
+# vision requests (utils/image_prep.py). IMAGE_FORMAT=webp applies to OpenRouter only; Ollama always gets JPEG.
+IMAGE_MAX_EDGE = _env_int("IMAGE_MAX_EDGE", 1568, minimum=256, maximum=8192)
+IMAGE_QUALITY = _env_int("IMAGE_QUALITY", 85, minimum=30, maximum=100)
+IMAGE_FORMAT = (_env_raw("IMAGE_FORMAT") or "jpeg").lower()
+if IMAGE_FORMAT not in ("jpeg", "webp"):
+    IMAGE_FORMAT = "jpeg"
+# Memory budget (MB) for keeping the most-requested Ollama models loaded (utils/model_warmth.py); 0 disables.
+# Models held warm get this keep_alive (minutes) and are re-pinged before it runs out.
+OLLAMA_WARM_BUDGET_MB = _env_int("OLLAMA_WARM_BUDGET_MB", 8192, minimum=0, maximum=1048576)
+OLLAMA_WARM_KEEP_ALIVE_MINUTES = _env_int("OLLAMA_WARM_KEEP_ALIVE_MINUTES", 30, maximum=1440)
+# Event-loop lag monitor (utils/loop_monitor.py): stalls at or over this many ms are counted in /reliability.
+# LOOP_MONITOR_DEBUG logs the blocking stack of each stall; LOOP_MONITOR_STRICT also keeps them for raise_if_blocked().
+LOOP_LAG_THRESHOLD_MS = _env_int("LOOP_LAG_THRESHOLD_MS", 250, minimum=10, maximum=60000)
+LOOP_MONITOR_DEBUG = _env_bool("LOOP_MONITOR_DEBUG", False)
+LOOP_MONITOR_STRICT = _env_bool("LOOP_MONITOR_STRICT", False)
 # OpenRouter keys:
 # - OPENROUTER_API_KEY is the primary key for chat/completions.
 # - OPENROUTER_CHAT_API_KEY and OPENROUTER_MANAGEMENT_API_KEY are optional aliases.
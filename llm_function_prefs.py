@@ -8,7 +8,7 @@ from __future__ import annotations
 
 from typing import Dict, List, Tuple
 
-from config import get_config, save_config, get_current_persona
+from config import config_view, get_config, save_config, get_current_persona
 
 # Stable keys used in storage and UI
 LLM_FUNCTION_KEYS: List[str] = [
@@ -48,7 +48,7 @@ _UTILITY_DEFAULT_PERSONAS = {
 
 
 def get_function_persona_name(function_key: str) -> str:
-    cfg = get_config()
+    cfg = config_view()
     raw = cfg.get("function_personas") if isinstance(cfg.get("function_personas"), dict) else {}
     name = str(raw.get(function_key, "") or "").strip()
     if name and name != "__default__":
@@ -1,38 +1,84 @@
 """Model preferences and Ollama model list"""
+import asyncio
 import json
-import os
+import time
 import requests
 from typing import Any, Dict, List, Optional, Tuple
-from integrations import OLLAMA_URL
 from utils import home_log
+from utils import ollama_router
+from utils.state_store import JsonDocumentFile, open_store
 
 MODELS_FILE = "data/models.json"
 DEFAULT_FALLBACK = ["qwen2.5:7b", "llama3.2:3b", "llama3.2:1b"]
+# Reuse a model list fetched this recently instead of asking the hosts again.
+REFRESH_MIN_INTERVAL_SECONDS = 30
 
 
 class ModelManager:
     def __init__(self):
         self.available_models: List[str] = []
+        self._last_refresh = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
         self.user_models: Dict[str, Dict] = {}
+        self._legacy_file = JsonDocumentFile(MODELS_FILE, ("user_models",))
+        self._store = open_store("models", ("user_models",), self._legacy_file)
         self.load_models()
         self.refresh_local_models()
 
-    def refresh_local_models(self) -> bool:
-        """Fetch available models from Ollama. On failure, set available_models to [] (no fake list)."""
-        try:
-            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=10)
-            if response.status_code == 200:
-                models_data = response.json().get("models", [])
-                self.available_models = [m.get("name") for m in models_data if m.get("name")]
-                home_log.log_sync(f"✅ Found {len(self.available_models)} Ollama models")
-                return True
-        except requests.exceptions.ConnectionError:
-            home_log.log_sync(f"⚠️ Cannot connect to Ollama at {OLLAMA_URL}")
-        except Exception as e:
-            home_log.log_sync(f"⚠️ Error fetching models: {e}")
+    def _refresh_due(self, force: bool) -> bool:
+        return force or not self._last_refresh or time.time() - self._last_refresh >= REFRESH_MIN_INTERVAL_SECONDS
+
+    def _set_local_models(self, by_host: Dict[str, List[str]]) -> bool:
+        """Merge per-host model names; no reachable host means available_models = [] (no fake list)."""
+        if by_host:
+            self.available_models = list(dict.fromkeys(n for names in by_host.values() for n in names))
+            home_log.log_sync(f"✅ Found {len(self.available_models)} Ollama models on {len(by_host)} host(s)")
+            return True
         self.available_models = []
         return False
 
+    async def refresh_local_models_async(self, force: bool = False) -> bool:
+        """Fetch models from every Ollama host concurrently (ollama_router.refresh, async transport)."""
+        if not self._refresh_due(force):
+            return bool(self.available_models)
+        self._last_refresh = time.time()
+        by_host = await ollama_router.refresh()
+        return self._set_local_models(
+            {h: [str(m.get("name")) for m in entries if m.get("name")] for h, entries in by_host.items()}
+        )
+
+    def refresh_local_models(self, force: bool = False) -> bool:
+        """
+        Fetch available models from every Ollama host and merge them. On failure, set available_models to [] (no fake list).
+        Without force, a list fetched in the last REFRESH_MIN_INTERVAL_SECONDS is reused (no HTTP).
+        Called on the event loop, this never blocks: the refresh runs as a task and the current list is returned.
+        """
+        if not self._refresh_due(force):
+            return bool(self.available_models)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = loop.create_task(self.refresh_local_models_async(force))
+            return bool(self.available_models)
+        self._last_refresh = time.time()
+        by_host: Dict[str, List[str]] = {}
+        for host in ollama_router.hosts():
+            try:
+                response = requests.get(f"{host}/api/tags", timeout=10)
+                if response.status_code == 200:
+                    models_data = response.json().get("models", [])
+                    names = [m.get("name") for m in models_data if m.get("name")]
+                    ollama_router.update_inventory(host, names)
+                    by_host[host] = names
+            except requests.exceptions.ConnectionError:
+                home_log.log_sync(f"⚠️ Cannot connect to Ollama at {host}")
+            except Exception as e:
+                home_log.log_sync(f"⚠️ Error fetching models from {host}: {e}")
+        return self._set_local_models(by_host)
+
     def set_user_model(self, user_id, model_name: str, provider: str = "local") -> None:
         provider = (provider or "local").strip().lower()
         if provider not in {"local", "cloud"}:
@@ -288,18 +334,12 @@ class ModelManager:
             return []
 
     def save_models(self) -> None:
-        os.makedirs(os.path.dirname(MODELS_FILE), exist_ok=True)
-        with open(MODELS_FILE, "w") as f:
-            json.dump({"user_models": self.user_models}, f, indent=2)
+        self._store.sync({"user_models": self.user_models})
 
     def load_models(self) -> None:
-        if os.path.exists(MODELS_FILE):
-            try:
-                with open(MODELS_FILE) as f:
-                    self.user_models = json.load(f).get("user_models", {})
-            except json.JSONDecodeError:
-                self.user_models = {}
-        else:
+        fresh_json = self._store is self._legacy_file and not self._legacy_file.exists()
+        self.user_models = self._store.load().get("user_models", {})
+        if fresh_json:
             self.save_models()
 
 
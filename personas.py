@@ -3,11 +3,12 @@
 Adaptive exports use persona keys: the user's Discord display name plus a space and the word adaptive
 (for example .dubyu adaptive). The bot updates these on startup/shutdown (see adaptive_dm.export_adaptive_to_personas).
 Legacy keys adaptive_dm_* are removed on export.
-"""
-import json
-import os
 
+personas.json is read through utils.settings_store: edits made outside the bot are picked up
+on the next lookup (checked at most once a second) without restarting.
+"""
 from config import get_current_persona, set_current_persona
+from utils import settings_store
 
 PERSONAS_FILE = "personas.json"
 
@@ -21,27 +22,38 @@ DEFAULT_PERSONAS = {
 }
 
 
+def _parse_personas(raw):
+    if not isinstance(raw, dict):
+        raise TypeError("personas.json must contain a JSON object")
+    return raw
+
+
 class PersonaManager:
     def __init__(self):
-        self.personas = {}
+        self._store = settings_store.JsonSnapshot(
+            PERSONAS_FILE, _parse_personas, lambda: dict(DEFAULT_PERSONAS), indent=2, rewrite_invalid=True
+        )
+        self._personas = {}
+        self._version = 0
         self.load_personas()
 
+    @property
+    def personas(self):
+        """Persona name -> system prompt; replaced with the file's contents when it changes on disk."""
+        data = self._store.get()
+        if self._store.version != self._version:
+            self._personas = dict(data)
+            self._version = self._store.version
+        return self._personas
+
     def load_personas(self):
-        if os.path.exists(PERSONAS_FILE):
-            try:
-                with open(PERSONAS_FILE) as f:
-                    self.personas = json.load(f)
-            except json.JSONDecodeError:
-                self.personas = {}
-            changed = False
-            for k, v in DEFAULT_PERSONAS.items():
-                if k not in self.personas:
-                    self.personas[k] = v
-                    changed = True
-            if changed:
-                self.save_personas()
-        else:
-            self.personas = dict(DEFAULT_PERSONAS)
+        personas = self.personas
+        changed = False
+        for k, v in DEFAULT_PERSONAS.items():
+            if k not in personas:
+                personas[k] = v
+                changed = True
+        if changed:
             self.save_personas()
         # If config points at a persona that no longer exists, fall back to default.
         cur = get_current_persona()
@@ -49,8 +61,8 @@ class PersonaManager:
             set_current_persona("default")
 
     def save_personas(self):
-        with open(PERSONAS_FILE, "w") as f:
-            json.dump(self.personas, f, indent=2)
+        self._store.save(dict(self._personas))
+        self._version = self._store.version
 
     def get_persona(self, name):
         return self.personas.get(name, self.personas.get("default", ""))
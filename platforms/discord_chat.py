@@ -9,10 +9,11 @@ import logging
 import inspect
 import shlex
 import re
+import time
 from typing import Optional, Any, Dict, List, Tuple, get_args, get_origin
 from discord import app_commands
 from discord.ui import View, Button
-from config import get_config, get_wake_word, set_bot_awake
+from config import config_view, get_wake_word, set_bot_awake
 from conversations import (
     conversation_manager,
     is_news_style_dm_bot_text,
@@ -22,6 +23,7 @@ from services.reminder_service import reminder_manager
 from models import model_manager
 from utils.llm_service import (
     ask_llm,
+    ask_llm_stream,
     plan_command_from_text,
     analyze_file,
     compare_files,
@@ -108,6 +110,89 @@ async def _send_chat_output(message: discord.Message, content=None, *, embed=Non
     return await message.reply(content=content, embed=embed, embeds=embeds, file=file, files=files, view=view)
 
 
+# Streamed replies: min seconds between message edits (Discord rate limits) and min text before first send.
+_STREAM_EDIT_INTERVAL = 1.2
+_STREAM_MIN_CHARS = 24
+
+
+class _StreamingReply:
+    """Show a streamed LLM reply progressively: rate-limited edits, split at _chunk_message boundaries."""
+
+    def __init__(self, anchor: discord.Message):
+        self.anchor = anchor
+        self.messages: List[discord.Message] = []
+        self._shown: List[str] = []
+        self._last_push = 0.0
+
+    async def _apply(self, chunks: List[str], *, retry: bool) -> None:
+        async def _call(factory):
+            return await (_send_with_retry(factory) if retry else factory())
+
+        for i, chunk in enumerate(chunks):
+            if i < len(self.messages):
+                if self._shown[i] == chunk:
+                    continue
+                msg = self.messages[i]
+                await _call(lambda m=msg, c=chunk: m.edit(content=c))
+                self._shown[i] = chunk
+                continue
+            if i == 0:
+                msg = await _call(lambda c=chunk: _send_chat_output(self.anchor, c))
+            else:
+                msg = await _call(lambda c=chunk: self.anchor.channel.send(c))
+            self.messages.append(msg)
+            self._shown.append(chunk)
+            if i < len(chunks) - 1:
+                await asyncio.sleep(_CHUNK_SEND_DELAY)
+        # Text can shrink (model fallback restarted the stream, final cleanup): drop surplus parts.
+        while len(self.messages) > max(1, len(chunks)):
+            msg = self.messages.pop()
+            self._shown.pop()
+            try:
+                await msg.delete()
+            except Exception:
+                pass
+
+    async def update(self, text: str) -> None:
+        """Push a partial snapshot if the edit interval has passed; failures are ignored."""
+        now = time.monotonic()
+        if now - self._last_push < _STREAM_EDIT_INTERVAL:
+            return
+        if not self.messages and len((text or "").strip()) < _STREAM_MIN_CHARS:
+            return
+        self._last_push = now
+        try:
+            await self._apply(_chunk_message(text, MAX_MESSAGE_LENGTH), retry=False)
+        except Exception:
+            log.debug("stream edit failed", exc_info=True)
+
+    async def finish(self, text: str) -> List[discord.Message]:
+        """Write the final text (with send retries) and return every message of the reply."""
+        await self._apply(_chunk_message(text, MAX_MESSAGE_LENGTH), retry=True)
+        return list(self.messages)
+
+    async def discard(self) -> None:
+        """Delete anything already shown (superseded, failed or timed-out generation)."""
+        for msg in self.messages:
+            try:
+                await msg.delete()
+            except Exception:
+                pass
+        self.messages.clear()
+        self._shown.clear()
+
+
+async def _stream_llm_reply(stream_reply: "_StreamingReply", *args: Any, **kwargs: Any) -> str:
+    """Run ask_llm_stream, editing stream_reply as tokens arrive; return the final reply text."""
+    final = ""
+    async for text, done in ask_llm_stream(*args, **kwargs):
+        if done:
+            final = text
+        else:
+            await stream_reply.update(text)
+    return final
+
+
 async def _execute_planned_command(
     client: discord.Client,
     message: discord.Message,
@@ -348,7 +433,7 @@ async def _build_wake_message_reply_context(
             extra_attachments.append({"filename": att.filename, "data": data})
         except Exception:
             pass
-    wake = (get_config().get("wake_word", "robot") or "robot").strip()
+    wake = (config_view().get("wake_word", "robot") or "robot").strip()
     trigger = (message.content or "").strip()
     if wake and trigger.lower().startswith(wake.lower()):
         trigger = trigger[len(wake) :].strip()
@@ -1555,9 +1640,11 @@ async def _dm_llm_consumer_loop(channel_id: int) -> None:
             return await dm_typing_coalescer.should_abort_generation(cid)
 
         draft: Optional[str] = None
+        stream_reply = _StreamingReply(anchor)
         try:
             draft = await asyncio.wait_for(
-                ask_llm(
+                _stream_llm_reply(
+                    stream_reply,
                     user_id,
                     cid,
                     combined,
@@ -1575,6 +1662,7 @@ async def _dm_llm_consumer_loop(channel_id: int) -> None:
                 timeout=150,
             )
         except asyncio.TimeoutError:
+            await stream_reply.discard()
             timeout_count = reliability_telemetry.increment("llm_timeouts")
             await home_log.send_to_home(
                 f"🔴 Message generation timed out (timeout #{timeout_count}) in channel {cid}. "
@@ -1586,6 +1674,7 @@ async def _dm_llm_consumer_loop(channel_id: int) -> None:
             await dm_typing_coalescer.prepend_lines_async(cid, batch)
             continue
         except Exception as exc:
+            await stream_reply.discard()
             error_count = reliability_telemetry.increment("llm_errors")
             await home_log.send_to_home(
                 f"🔴 Message generation crashed (error #{error_count}) in channel {cid}. "
@@ -1599,6 +1688,7 @@ async def _dm_llm_consumer_loop(channel_id: int) -> None:
 
         if await _abort_check():
             # Superseded: do not persist a partial reply; re-queue this batch with any newer lines.
+            await stream_reply.discard()
             leftover = await dm_typing_coalescer.pop_pending_lines(cid)
             merged = batch + leftover
             if merged:
@@ -1611,6 +1701,7 @@ async def _dm_llm_consumer_loop(channel_id: int) -> None:
         ).strip():
             answer = _strip_leaked_image_placeholders(answer)
         if not answer.strip():
+            await stream_reply.discard()
             if await _abort_check():
                 leftover = await dm_typing_coalescer.pop_pending_lines(cid)
                 merged = batch + leftover
@@ -1646,16 +1737,8 @@ async def _dm_llm_consumer_loop(channel_id: int) -> None:
         except Exception:
             pass
 
-        chunks = _chunk_message(answer, MAX_MESSAGE_LENGTH)
-        response = None
-        for i, chunk in enumerate(chunks):
-            if i == 0:
-                response = await _send_with_retry(lambda: _send_chat_output(anchor, chunk))
-            else:
-                response = await _send_with_retry(lambda: ch.send(chunk))
+        for response in await stream_reply.finish(answer):
             conversation_manager.set_last_bot_message(cid, response.id)
-            if i < len(chunks) - 1:
-                await asyncio.sleep(_CHUNK_SEND_DELAY)
 
         conversation_manager.save()
         _schedule_adaptive_post_reply_calibration(anchor, combined)
@@ -1681,7 +1764,7 @@ async def _ensure_dm_llm_consumer(channel_id: int) -> None:
 
 async def process_discord_message(client, message, permission, conversation_manager) -> bool:
     """Process Discord messages with group chat awareness. Return True if handled."""
-    config = get_config()
+    config = config_view()
     wake_word = config.get("wake_word", "robot").lower()
     message_lower = (message.content or "").lower()
     
@@ -1837,10 +1920,12 @@ async def process_discord_message(client, message, permission, conversation_mana
             except Exception:
                 context = None
 
+        stream_reply = _StreamingReply(message)
         try:
             fast_reply_enabled = conversation_manager.is_dm_fast_reply_active(message.channel.id)
             answer = await asyncio.wait_for(
-                ask_llm(
+                _stream_llm_reply(
+                    stream_reply,
                     message.author.id,
                     message.channel.id,
                     clean_content,
@@ -1856,6 +1941,7 @@ async def process_discord_message(client, message, permission, conversation_mana
                 timeout=150,
             )
         except asyncio.TimeoutError:
+            await stream_reply.discard()
             timeout_count = reliability_telemetry.increment("llm_timeouts")
             await home_log.send_to_home(
                 f"🔴 Message generation timed out (timeout #{timeout_count}) in channel {message.channel.id}. "
@@ -1866,6 +1952,7 @@ async def process_discord_message(client, message, permission, conversation_mana
             )
             return True
         except Exception as exc:
+            await stream_reply.discard()
             error_count = reliability_telemetry.increment("llm_errors")
             await home_log.send_to_home(
                 f"🔴 Message generation crashed (error #{error_count}) in channel {message.channel.id}. "
@@ -1877,6 +1964,7 @@ async def process_discord_message(client, message, permission, conversation_mana
             return True
 
         if not answer:
+            await stream_reply.discard()
             error_count = reliability_telemetry.increment("llm_errors")
             await home_log.send_to_home(
                 f"🔴 Message generation returned empty response (error #{error_count}) in channel {message.channel.id}. "
@@ -1887,16 +1975,8 @@ async def process_discord_message(client, message, permission, conversation_mana
             )
             return True
 
-        chunks = _chunk_message(answer, MAX_MESSAGE_LENGTH)
-        response = None
-        for i, chunk in enumerate(chunks):
-            if i == 0:
-                response = await _send_with_retry(lambda: _send_chat_output(message, chunk))
-            else:
-                response = await _send_with_retry(lambda: message.channel.send(chunk))
+        for response in await stream_reply.finish(answer):
             conversation_manager.set_last_bot_message(message.channel.id, response.id)
-            if i < len(chunks) - 1:
-                await asyncio.sleep(_CHUNK_SEND_DELAY)
 
         conversation_manager.save()
         return True
@@ -1904,7 +1984,15 @@ async def process_discord_message(client, message, permission, conversation_mana
 async def process_wakeword_download(client, message, link_or_empty):
     """Download media from link or last message with media, send to chat. Files not stored."""
     from config import get_download_limit_mb
-    from commands.download._helpers import extract_urls, download_url_sync, DOWNLOAD_EXTENSIONS
+    from commands.download._helpers import (
+        DOWNLOAD_EXTENSIONS,
+        cleanup,
+        download_slot,
+        download_url_to_file,
+        extract_urls,
+        read_file,
+        save_attachment_to_file,
+    )
     import os
     channel = message.channel
     max_bytes = get_download_limit_mb() * 1024 * 1024
@@ -1935,50 +2023,52 @@ async def process_wakeword_download(client, message, link_or_empty):
     if not target_url and not target_attachment:
         await _send_chat_output(message, "❌ No link or media found. Send a link or use `/download` after a message with media.")
         return True
-    data, filename = None, None
-    if target_attachment:
+    data = None
+    async with download_slot():
+        if target_attachment:
+            path, info = await save_attachment_to_file(target_attachment, max_bytes)
+            if path is None:
+                await _send_chat_output(message, f"❌ {info}")
+                return True
+        else:
+            path, info = await asyncio.to_thread(download_url_to_file, target_url, max_bytes)
+            if path is None:
+                await _send_chat_output(message, f"❌ Download failed: {info}")
+                return True
+        filename = info
         try:
-            data = await target_attachment.read()
-            filename = target_attachment.filename
-            if len(data) > max_bytes:
-                await _send_chat_output(message, f"❌ File too large. Max: {get_download_limit_mb()} MB.")
+            if os.path.getsize(path) == 0:
+                await _send_chat_output(message, "❌ Nothing to send.")
                 return True
-        except Exception as e:
-            await _send_chat_output(message, f"❌ Failed to read attachment: {e}")
-            return True
-    elif target_url:
-        import asyncio
-        data, filename = await asyncio.to_thread(download_url_sync, target_url, max_bytes)
-        if data is None:
-            await _send_chat_output(message, f"❌ Download failed: {filename}")
-            return True
-    if not data:
-        await _send_chat_output(message, "❌ Nothing to send.")
-        return True
+            ext = os.path.splitext(filename or "")[1].lower()
+            if ext in {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}:
+                data = await asyncio.to_thread(read_file, path)
+            else:
+                try:
+                    await _send_chat_output(
+                        message,
+                        f"📥 Downloaded: **{filename}**",
+                        file=discord.File(path, filename=filename),
+                    )
+                except Exception as e:
+                    await _send_chat_output(message, f"❌ Error: {e}")
+                return True
+        finally:
+            await asyncio.to_thread(cleanup, path)
     from utils.llm_service import ask_llm
-    ext = os.path.splitext(filename or "")[1].lower()
-    is_image = ext in {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
     try:
-        if is_image:
-            attachments = [{"filename": filename, "data": data}]
-            reply = await ask_llm(
-                message.author.id,
-                channel.id,
-                "Describe or analyze this image.",
-                str(message.author.name),
-                is_continuation=False,
-                platform="discord",
-                attachments=attachments,
-                is_dm=isinstance(channel, discord.DMChannel),
-            )
-            await _send_chat_output(message, sanitize_discord_bot_content(reply or ""))
-        else:
-            from io import BytesIO
-            await _send_chat_output(
-                message,
-                f"📥 Downloaded: **{filename}**",
-                file=discord.File(filename=filename, fp=BytesIO(data)),
-            )
+        attachments = [{"filename": filename, "data": data}]
+        reply = await ask_llm(
+            message.author.id,
+            channel.id,
+            "Describe or analyze this image.",
+            str(message.author.name),
+            is_continuation=False,
+            platform="discord",
+            attachments=attachments,
+            is_dm=isinstance(channel, discord.DMChannel),
+        )
+        await _send_chat_output(message, sanitize_discord_bot_content(reply or ""))
     except Exception as e:
         await _send_chat_output(message, f"❌ Error: {e}")
     return True
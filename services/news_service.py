@@ -1,20 +1,33 @@
 """Background news service: fetches RSS feeds, summarizes via LLM, sends DMs with feedback buttons."""
 
 import asyncio
+import base64
 import hashlib
 import json
+import math
 import os
 import re
 import threading
 import time
 import traceback
+import zlib
+from collections import deque
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
+import aiohttp
 import discord
-import requests
 
+from utils import context_budget
 from utils import home_log
+from utils import llm_cache
+from utils import llm_http
+from utils import llm_scheduler
+from utils import model_warmth
+from utils import ollama_router
+from utils import reliability_telemetry
+from utils import state_store
 
 InlineKeyboardButton = None
 InlineKeyboardMarkup = None
@@ -24,10 +37,28 @@ SUBSCRIPTIONS_FILE = os.path.join(DATA_DIR, "subscriptions.json")
 SEEN_FILE = os.path.join(DATA_DIR, "seen_articles.json")
 PREFERENCES_FILE = os.path.join(DATA_DIR, "preferences.json")
 CONFIG_FILE = os.path.join(DATA_DIR, "news_config.json")
+FEED_CACHE_FILE = os.path.join(DATA_DIR, "feed_cache.json")
 
 FETCH_INTERVAL_SECONDS = 600  # 10 minutes between fetches
+# Load the local summary model this long before each cycle so the first summary is not a cold load.
+NEWS_PREWARM_LEAD_SECONDS = 45
 MAX_SEEN_ARTICLES = 5000
+# Hashes evicted from the exact seen-set go into a Bloom filter of this capacity (0 = off), so
+# dedup covers far more history in bounded memory (~1% false positives => skipped as "seen").
+# Two generations are kept: a full filter becomes the previous one, so at least one capacity's
+# worth of evicted hashes is always remembered.
+SEEN_BLOOM_CAPACITY = 200_000
+SEEN_BLOOM_ERROR_RATE = 0.01
 MAX_ARTICLES_PER_CYCLE = 8  # per topic per cycle
+FEED_FETCH_CONCURRENCY = 8  # feeds in flight per cycle
+FEED_FETCH_PER_HOST = 2  # feeds in flight per host
+# Summaries in flight per cycle, by news model backend (local Ollama is usually serial).
+SUMMARY_WORKERS_LOCAL = 2
+SUMMARY_WORKERS_CLOUD = 6
+# Token bucket for outgoing news DMs (discord.py still handles any 429s itself).
+DELIVERY_RATE_PER_SECOND = 4.0
+DELIVERY_BURST = 5
+DELIVERY_USER_CONCURRENCY = 16  # users being delivered to at once
 
 # High-signal filtering: prioritize critical developments, suppress low-value chatter.
 HIGH_IMPORTANCE_PHRASES = {
@@ -204,6 +235,8 @@ def _hash_article(title: str, link: str) -> str:
 # ---------------------------------------------------------------------------
 
 def _load_json(path: str, default: Any = None) -> Any:
+    if state_store.using_sqlite():
+        return state_store.load_document(path, default)
     try:
         with open(path) as f:
             return json.load(f)
@@ -212,6 +245,9 @@ def _load_json(path: str, default: Any = None) -> Any:
 
 
 def _save_json(path: str, data: Any) -> None:
+    if state_store.using_sqlite():
+        state_store.save_document(path, data)
+        return
     _ensure_data_dir()
     with open(path, "w") as f:
         json.dump(data, f, indent=2, default=str)
@@ -285,31 +321,179 @@ def get_user_topics(user_id: int) -> List[str]:
 # Seen articles
 # ---------------------------------------------------------------------------
 
-def _load_seen() -> Dict:
-    return _load_json(SEEN_FILE, {"hashes": [], "details": {}})
+class _BloomFilter:
+    """Fixed-size Bloom filter over article hashes (double hashing on sha256)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, int(capacity))
+        m = int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_bits = max(8, m)
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.sha256(item.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_dict(self) -> Dict:
+        return {
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "count": self.count,
+            "bits": base64.b64encode(zlib.compress(bytes(self.bits))).decode("ascii"),
+        }
 
+    @classmethod
+    def from_dict(cls, data: Dict, capacity: int, error_rate: float) -> "_BloomFilter":
+        bloom = cls(capacity, error_rate)
+        try:
+            if int(data.get("num_bits", 0)) != bloom.num_bits or int(data.get("num_hashes", 0)) != bloom.num_hashes:
+                return bloom  # sizing changed; start fresh
+            bits = zlib.decompress(base64.b64decode(data.get("bits", "")))
+            if len(bits) == len(bloom.bits):
+                bloom.bits = bytearray(bits)
+                bloom.count = int(data.get("count", 0))
+        except (ValueError, TypeError, zlib.error):
+            pass
+        return bloom
+
+
+class _SeenIndex:
+    """
+    In-memory seen-article index: exact hash set + insertion-ordered ring (evicts at
+    MAX_SEEN_ARTICLES, keeping details only for retained hashes), evicted hashes folded into a
+    two-generation Bloom filter. Loaded once; mark() only dirties, flush() persists once per cycle.
+    """
 
-def _save_seen(data: Dict) -> None:
-    _save_json(SEEN_FILE, data)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._set: set = set()
+        self._ring: deque = deque()
+        self._details: Dict[str, Dict] = {}
+        self._bloom: Optional[_BloomFilter] = None
+        self._bloom_prev: Optional[_BloomFilter] = None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        data = _load_json(SEEN_FILE, {"hashes": [], "details": {}})
+        hashes = [h for h in data.get("hashes", []) if isinstance(h, str)]
+        details = data.get("details", {}) if isinstance(data.get("details"), dict) else {}
+        if SEEN_BLOOM_CAPACITY > 0:
+            raw_bloom = data.get("bloom")
+            self._bloom = (
+                _BloomFilter.from_dict(raw_bloom, SEEN_BLOOM_CAPACITY, SEEN_BLOOM_ERROR_RATE)
+                if isinstance(raw_bloom, dict)
+                else _BloomFilter(SEEN_BLOOM_CAPACITY, SEEN_BLOOM_ERROR_RATE)
+            )
+            raw_prev = data.get("bloom_prev")
+            if isinstance(raw_prev, dict):
+                self._bloom_prev = _BloomFilter.from_dict(raw_prev, SEEN_BLOOM_CAPACITY, SEEN_BLOOM_ERROR_RATE)
+        for h in dict.fromkeys(hashes):
+            self._ring.append(h)
+            self._set.add(h)
+        self._details = {h: details[h] for h in self._set if isinstance(details.get(h), dict)}
+        self._evict()
+        self._loaded = True
+
+    def _evict(self) -> None:
+        while len(self._ring) > MAX_SEEN_ARTICLES:
+            old = self._ring.popleft()
+            self._set.discard(old)
+            self._details.pop(old, None)
+            if self._bloom is not None:
+                if self._bloom.count >= self._bloom.capacity:
+                    # Saturated: rotate rather than let the false-positive rate climb; only the
+                    # older generation is dropped.
+                    self._bloom_prev = self._bloom
+                    self._bloom = _BloomFilter(SEEN_BLOOM_CAPACITY, SEEN_BLOOM_ERROR_RATE)
+                self._bloom.add(old)
+            self._dirty = True
+
+    def contains(self, article_hash: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            if article_hash in self._set:
+                return True
+            if self._bloom is not None and article_hash in self._bloom:
+                return True
+            return self._bloom_prev is not None and article_hash in self._bloom_prev
+
+    def mark(self, article_hash: str, meta: Dict) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            if article_hash not in self._set:
+                self._set.add(article_hash)
+                self._ring.append(article_hash)
+            self._details[article_hash] = meta
+            self._dirty = True
+            self._evict()
+
+    def unmark(self, article_hash: str) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            if article_hash in self._set:
+                self._set.discard(article_hash)
+                self._ring.remove(article_hash)
+                self._details.pop(article_hash, None)
+                self._dirty = True
+
+    def details(self, article_hash: str) -> Dict:
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._details.get(article_hash, {}))
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data: Dict[str, Any] = {"hashes": list(self._ring), "details": dict(self._details)}
+            if self._bloom is not None:
+                data["bloom"] = self._bloom.to_dict()
+            if self._bloom_prev is not None:
+                data["bloom_prev"] = self._bloom_prev.to_dict()
+            self._dirty = False
+        _save_json(SEEN_FILE, data)
+
+
+_seen_index = _SeenIndex()
 
 
 def _is_seen(article_hash: str) -> bool:
-    return article_hash in _load_seen().get("hashes", [])
+    return _seen_index.contains(article_hash)
 
 
 def _mark_seen(article_hash: str, meta: Dict) -> None:
-    data = _load_seen()
-    hashes = data.get("hashes", [])
-    if article_hash not in hashes:
-        hashes.append(article_hash)
-        if len(hashes) > MAX_SEEN_ARTICLES:
-            removed = hashes[:len(hashes) - MAX_SEEN_ARTICLES]
-            hashes = hashes[-MAX_SEEN_ARTICLES:]
-            for h in removed:
-                data.get("details", {}).pop(h, None)
-    data["hashes"] = hashes
-    data.setdefault("details", {})[article_hash] = meta
-    _save_seen(data)
+    """Record in memory; persisted by _flush_seen() once per cycle."""
+    _seen_index.mark(article_hash, meta)
+
+
+def _unmark_seen(article_hash: str) -> None:
+    """Forget an article marked this cycle so the next cycle picks it up again."""
+    _seen_index.unmark(article_hash)
+
+
+def _flush_seen() -> None:
+    _seen_index.flush()
+
+
+def _count_shed(what: str) -> None:
+    reliability_telemetry.increment("news_shed")
+    home_log.log_sync(f"⏭️ LLM busy; {what} left for the next news cycle")
 
 
 # ---------------------------------------------------------------------------
@@ -340,8 +524,7 @@ def record_feedback(user_id: int, article_hash: str, feedback_type: str, topic:
         "sources_suppress": [],
         "sources_disabled": [],
     })
-    seen = _load_seen()
-    article_meta = seen.get("details", {}).get(article_hash, {})
+    article_meta = _seen_index.details(article_hash)
     title_words = _extract_keywords(article_meta.get("title", ""))
     source_name = (article_meta.get("source", "") or "").strip().lower()
 
@@ -723,6 +906,18 @@ def get_news_model() -> Tuple[str, Optional[str]]:
     return cfg.get("model_type", "local"), cfg.get("model_name")
 
 
+def _effective_news_model() -> Tuple[str, str]:
+    """Configured news model, else the default chat model: (model_type, model_name)."""
+    model_type, model_name = get_news_model()
+    if not model_name:
+        from models import model_manager
+
+        info = model_manager.get_user_model_info(0)
+        model_type = info.get("provider", "local")
+        model_name = info.get("model", "qwen2.5:7b")
+    return model_type, model_name
+
+
 def get_news_recent_cloud_models() -> List[str]:
     cfg = get_news_config()
     history = cfg.get("cloud_history", [])
@@ -899,44 +1094,38 @@ def _resolve_feeds_for_topic(topic: str) -> List[Tuple[str, str]]:
     return merged
 
 
-def _fetch_feed(url: str, timeout: int = 15) -> Tuple[List[Dict], Optional[str]]:
-    """Fetch and parse an RSS feed. Returns (articles, error_message)."""
-    try:
-        import feedparser
-    except ImportError:
-        home_log.log_sync("⚠️ feedparser not installed – news service cannot fetch RSS")
-        return [], "feedparser not installed"
+_FEED_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; DuBot/1.0; +https://github.com/dubot)",
+    "Accept": "application/rss+xml, application/atom+xml, application/xml, text/xml, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Cache-Control": "no-cache",
+}
+
+# Per-URL conditional-GET validators + last parsed articles: {url: {etag, last_modified, digest, articles}}
+_feed_cache: Optional[Dict[str, Dict]] = None
+_feed_cache_dirty = False
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; DuBot/1.0; +https://github.com/dubot)",
-        "Accept": "application/rss+xml, application/atom+xml, application/xml, text/xml, */*",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Cache-Control": "no-cache",
-    }
-    last_error = None
-    feed = None
-    for attempt in range(2):
-        try:
-            resp = requests.get(url, timeout=timeout, headers=headers)
-            resp.raise_for_status()
-            feed = feedparser.parse(resp.text)
-            if getattr(feed, "entries", None):
-                break
-            bozo_exc = getattr(feed, "bozo_exception", None)
-            if bozo_exc:
-                last_error = f"parse error: {bozo_exc}"
-            else:
-                last_error = "no entries in feed response"
-        except Exception as e:
-            last_error = str(e)
-        if attempt == 0:
-            time.sleep(1.0)
 
-    if not feed or not getattr(feed, "entries", None):
-        err = last_error or "unknown fetch/parse failure"
-        home_log.log_sync(f"⚠️ RSS fetch error for {url}: {err}")
-        return [], err
+def _get_feed_cache() -> Dict[str, Dict]:
+    global _feed_cache
+    if _feed_cache is None:
+        _feed_cache = _load_json(FEED_CACHE_FILE, {})
+    return _feed_cache
 
+
+def _save_feed_cache() -> None:
+    global _feed_cache_dirty
+    if _feed_cache is None or not _feed_cache_dirty:
+        return
+    _feed_cache_dirty = False
+    _save_json(FEED_CACHE_FILE, dict(_feed_cache))
+
+
+class _FeedEmpty(Exception):
+    """Feed downloaded but had no entries (retried once like a transport error)."""
+
+
+def _articles_from_feed(feed) -> List[Dict]:
     articles = []
     for entry in feed.entries[:MAX_ARTICLES_PER_CYCLE]:
         title = entry.get("title", "").strip()
@@ -953,24 +1142,127 @@ def _fetch_feed(url: str, timeout: int = 15) -> Tuple[List[Dict], Optional[str]]
             "summary": summary[:1500],
             "published": published,
         })
-    return articles, None
+    return articles
+
+
+async def _fetch_feed(
+    session: aiohttp.ClientSession,
+    url: str,
+    host_limits: Dict[str, asyncio.Semaphore],
+    timeout: int = 15,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch and parse an RSS feed with a conditional GET. Returns (articles, error_message).
+    304 Not Modified (or an identical body) reuses the cached articles without parsing.
+    """
+    global _feed_cache_dirty
+    try:
+        import feedparser
+    except ImportError:
+        home_log.log_sync("⚠️ feedparser not installed – news service cannot fetch RSS")
+        return [], "feedparser not installed"
+
+    cache = _get_feed_cache()
+    cached = cache.get(url) if isinstance(cache.get(url), dict) else None
+    headers = dict(_FEED_HEADERS)
+    if cached and cached.get("articles"):
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    host = (urlsplit(url).netloc or url).lower()
+    sem = host_limits.setdefault(host, asyncio.Semaphore(FEED_FETCH_PER_HOST))
+    last_error = None
+    for attempt in range(2):
+        try:
+            async with sem:
+                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    if resp.status == 304 and cached:
+                        return [dict(a) for a in cached.get("articles", [])], None
+                    if resp.status >= 400:
+                        raise RuntimeError(f"HTTP {resp.status}")
+                    body = await resp.read()
+                    etag = resp.headers.get("ETag", "")
+                    last_modified = resp.headers.get("Last-Modified", "")
+            digest = hashlib.sha1(body).hexdigest()
+            if cached and cached.get("digest") == digest and cached.get("articles"):
+                articles = cached["articles"]
+            else:
+                feed = await asyncio.to_thread(feedparser.parse, body)
+                if not getattr(feed, "entries", None):
+                    bozo_exc = getattr(feed, "bozo_exception", None)
+                    last_error = f"parse error: {bozo_exc}" if bozo_exc else "no entries in feed response"
+                    raise _FeedEmpty()
+                articles = _articles_from_feed(feed)
+            cache[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "digest": digest,
+                "articles": articles,
+            }
+            _feed_cache_dirty = True
+            return [dict(a) for a in articles], None
+        except _FeedEmpty:
+            pass
+        except Exception as e:
+            last_error = str(e) or type(e).__name__
+        if attempt == 0:
+            await asyncio.sleep(1.0)
+
+    err = last_error or "unknown fetch/parse failure"
+    home_log.log_sync(f"⚠️ RSS fetch error for {url}: {err}")
+    return [], err
 
 
-def fetch_articles_for_topic(topic: str) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+async def fetch_articles_for_topics(
+    topics: List[str],
+) -> Dict[str, Tuple[List[Dict], List[Tuple[str, str]]]]:
+    """
+    Fetch all feeds for these topics concurrently (each unique URL once per call; bounded
+    overall and per host). Returns {topic: (articles, failed_sources[(source, reason)])}.
+    """
+    feeds_by_topic = {topic: _resolve_feeds_for_topic(topic) for topic in topics}
+    unique_urls = list(dict.fromkeys(url for feeds in feeds_by_topic.values() for url, _ in feeds))
+    results: Dict[str, Tuple[List[Dict], Optional[str]]] = {}
+    if unique_urls:
+        await asyncio.to_thread(_get_feed_cache)
+        overall = asyncio.Semaphore(FEED_FETCH_CONCURRENCY)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+        connector = aiohttp.TCPConnector(limit=FEED_FETCH_CONCURRENCY, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector) as session:
+
+            async def _one(url: str) -> None:
+                async with overall:
+                    try:
+                        results[url] = await _fetch_feed(session, url, host_limits)
+                    except Exception as e:
+                        results[url] = ([], str(e) or type(e).__name__)
+
+            await asyncio.gather(*(_one(url) for url in unique_urls))
+        await asyncio.to_thread(_save_feed_cache)
+
+    out: Dict[str, Tuple[List[Dict], List[Tuple[str, str]]]] = {}
+    for topic, feeds in feeds_by_topic.items():
+        all_articles: List[Dict] = []
+        failed_sources: List[Tuple[str, str]] = []
+        for url, source in feeds:
+            articles, err = results.get(url, ([], "not fetched"))
+            for a in articles:
+                a = dict(a)
+                a["source"] = source
+                a["topic"] = topic
+                a["hash"] = _hash_article(a["title"], a["link"])
+                all_articles.append(a)
+            if err:
+                failed_sources.append((source, err))
+        out[topic] = (all_articles, failed_sources)
+    return out
+
+
+async def fetch_articles_for_topic(topic: str) -> Tuple[List[Dict], List[Tuple[str, str]]]:
     """Fetch topic articles and return (articles, failed_sources[(source, reason)])."""
-    feeds = _resolve_feeds_for_topic(topic)
-    all_articles = []
-    failed_sources: List[Tuple[str, str]] = []
-    for url, source in feeds:
-        articles, err = _fetch_feed(url)
-        for a in articles:
-            a["source"] = source
-            a["topic"] = topic
-            a["hash"] = _hash_article(a["title"], a["link"])
-        all_articles.extend(articles)
-        if err:
-            failed_sources.append((source, err))
-    return all_articles, failed_sources
+    return (await fetch_articles_for_topics([topic]))[topic]
 
 
 # ---------------------------------------------------------------------------
@@ -979,15 +1271,9 @@ def fetch_articles_for_topic(topic: str) -> Tuple[List[Dict], List[Tuple[str, st
 
 async def _summarize_article(article: Dict, detail_level: str = "normal", topic: str = "") -> Optional[str]:
     """Summarize an article using the configured LLM."""
-    from integrations import OLLAMA_URL
-    from models import model_manager
     from utils.llm_service import _make_openrouter_request
 
-    model_type, model_name = get_news_model()
-    if not model_name:
-        info = model_manager.get_user_model_info(0)
-        model_type = info.get("provider", "local")
-        model_name = info.get("model", "qwen2.5:7b")
+    model_type, model_name = _effective_news_model()
 
     from utils.llm_service import get_enhanced_prompt
 
@@ -1029,44 +1315,53 @@ Do NOT add any introduction or conclusion outside the structure above."""
         {"role": "user", "content": prompt},
     ]
 
+    cache_key = llm_cache.make_key("news_summary", model_type, model_name, messages)
+    hit = llm_cache.lookup("news_summary", cache_key)
+    if hit is not None:
+        return hit[1]
+
     try:
         if (model_type or "local").strip().lower() == "cloud":
             response = await _make_openrouter_request(model_name, messages)
             if response and not response.startswith("Error:"):
+                llm_cache.store("news_summary", cache_key, model_name, response.strip())
                 return response.strip()
             home_log.log_sync(f"⚠️ News cloud summarization failed: {response}")
             return None
 
-        url = f"{OLLAMA_URL}/api/chat"
+        host = ollama_router.route(model_name)[0]
+        url = f"{host}/api/chat"
         data = {
             "model": model_name,
             "messages": messages,
             "stream": False,
-            "options": {"temperature": 0.3, "num_predict": 800},
+            "options": {"temperature": 0.3, "num_predict": 800, "num_ctx": context_budget.num_ctx_for(model_name)},
         }
-        resp = await asyncio.to_thread(requests.post, url, json=data, timeout=90)
+        async with llm_scheduler.slot(llm_scheduler.BACKGROUND):
+            resp = await llm_http.post(url, json_body=data, timeout=90)
         if resp.status_code == 200:
             result = resp.json()
-            return result.get("message", {}).get("content", "").strip()
+            model_warmth.record_request(model_name, result.get("load_duration"))
+            ollama_router.record_success(host, model_name)
+            text = result.get("message", {}).get("content", "").strip()
+            llm_cache.store("news_summary", cache_key, model_name, text)
+            return text
+    except llm_scheduler.Busy:
+        _count_shed(f"summary of '{article.get('title', '')[:60]}'")
+        raise
     except Exception as e:
         home_log.log_sync(f"⚠️ News summarization error: {e}")
     return None
 
 
 async def _summarize_quiet_time_batch(articles: List[Dict]) -> Optional[str]:
-    """Produce a combined summary of articles queued during quiet time."""
-    from integrations import OLLAMA_URL
-    from models import model_manager
+    """Produce a combined summary of articles queued during quiet time (raises llm_scheduler.Busy when shed)."""
     from utils.llm_service import _make_openrouter_request
 
     if not articles:
         return None
 
-    model_type, model_name = get_news_model()
-    if not model_name:
-        info = model_manager.get_user_model_info(0)
-        model_type = info.get("provider", "local")
-        model_name = info.get("model", "qwen2.5:7b")
+    model_type, model_name = _effective_news_model()
 
     article_list = ""
     for i, a in enumerate(articles[:30], 1):
@@ -1097,17 +1392,22 @@ Keep the total summary concise but comprehensive. Use bullet points. End with a
             home_log.log_sync(f"⚠️ News cloud quiet-time summary failed: {response}")
             return None
 
-        url = f"{OLLAMA_URL}/api/chat"
+        host = ollama_router.route(model_name)[0]
+        url = f"{host}/api/chat"
         data = {
             "model": model_name,
             "messages": messages,
             "stream": False,
-            "options": {"temperature": 0.3, "num_predict": 2000},
+            "options": {"temperature": 0.3, "num_predict": 2000, "num_ctx": context_budget.num_ctx_for(model_name)},
         }
-        resp = await asyncio.to_thread(requests.post, url, json=data, timeout=120)
+        async with llm_scheduler.slot(llm_scheduler.BACKGROUND):
+            resp = await llm_http.post(url, json_body=data, timeout=120)
         if resp.status_code == 200:
             result = resp.json()
             return result.get("message", {}).get("content", "").strip()
+    except llm_scheduler.Busy:
+        _count_shed("quiet-hours digest")
+        raise
     except Exception as e:
         home_log.log_sync(f"⚠️ Quiet-time summary error: {e}")
     return None
@@ -1396,6 +1696,69 @@ def build_news_feedback_keyboard(article_hash: str, topic: str):
 # Main news manager
 # ---------------------------------------------------------------------------
 
+class _TokenBucket:
+    """Async token bucket: acquire() waits until a send is allowed."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(0.1, float(rate))
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+class _SummaryPool:
+    """
+    One summary per (article hash, detail level) per cycle, shared by every subscriber;
+    at most `workers` LLM calls in flight.
+    """
+
+    def __init__(self, workers: int):
+        self._sem = asyncio.Semaphore(max(1, workers))
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        # Hashes whose summary the LLM scheduler shed this cycle; not delivered, retried next cycle.
+        self.shed: set = set()
+
+    def prefetch(self, article: Dict, detail: str, topic: str) -> asyncio.Task:
+        key = (article["hash"], detail)
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(article, detail, topic))
+            self._tasks[key] = task
+        return task
+
+    async def get(self, article: Dict, detail: str, topic: str) -> Optional[str]:
+        # shield: a cancelled subscriber must not cancel the summary others are waiting on
+        return await asyncio.shield(self.prefetch(article, detail, topic))
+
+    async def _run(self, article: Dict, detail: str, topic: str) -> Optional[str]:
+        async with self._sem:
+            try:
+                return await _summarize_article(article, detail_level=detail, topic=topic)
+            except llm_scheduler.Busy:
+                self.shed.add(article["hash"])
+                return None
+            except Exception as e:
+                home_log.log_sync(f"⚠️ Summarize error for '{article.get('title', '')[:60]}': {e}")
+                return None
+
+    def cancel_pending(self) -> None:
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+
 class NewsManager:
     def __init__(self):
         self.running = False
@@ -1422,6 +1785,7 @@ class NewsManager:
         self.running = False
         if self.thread:
             self.thread.join(timeout=5)
+        _flush_seen()
         home_log.log_sync("🛑 News service stopped")
 
     def _run(self) -> None:
@@ -1435,10 +1799,27 @@ class NewsManager:
             except Exception as e:
                 home_log.log_sync(f"⚠️ News cycle error: {e}")
                 traceback.print_exc()
-            time.sleep(FETCH_INTERVAL_SECONDS)
+            time.sleep(max(0, FETCH_INTERVAL_SECONDS - NEWS_PREWARM_LEAD_SECONDS))
+            self._prewarm_summary_model()
+            time.sleep(min(FETCH_INTERVAL_SECONDS, NEWS_PREWARM_LEAD_SECONDS))
+
+    def _prewarm_summary_model(self) -> None:
+        """Fire-and-forget load of the local news model ahead of the next cycle."""
+        if not (self.running and self.loop and get_subscriptions()):
+            return
+        model_type, model_name = _effective_news_model()
+        if (model_type or "local").strip().lower() == "cloud":
+            return
+        asyncio.run_coroutine_threadsafe(model_warmth.prewarm(model_name), self.loop)
 
     async def _cycle(self) -> None:
         """One fetch-summarize-send cycle for all subscribed users."""
+        try:
+            await self._cycle_topics()
+        finally:
+            await asyncio.to_thread(_flush_seen)
+
+    async def _cycle_topics(self) -> None:
         subs = get_subscriptions()
         if not subs:
             return
@@ -1464,58 +1845,102 @@ class NewsManager:
         if not all_topics:
             return
 
-        # Fetch articles per topic
-        for topic, user_ids in all_topics.items():
-            try:
-                articles, failed_sources = await asyncio.to_thread(fetch_articles_for_topic, topic)
-            except Exception as e:
-                home_log.log_sync(f"⚠️ Fetch failed for topic '{topic}': {e}")
-                continue
+        # Fetch every topic's feeds up front, concurrently; shared feeds are fetched once.
+        try:
+            fetched = await fetch_articles_for_topics(list(all_topics))
+        except Exception as e:
+            home_log.log_sync(f"⚠️ Feed fetch failed: {e}")
+            return
 
-            if failed_sources:
-                await self._notify_source_errors(topic, sorted(user_ids), failed_sources)
+        model_type, _ = get_news_model()
+        summaries = _SummaryPool(SUMMARY_WORKERS_CLOUD if model_type == "cloud" else SUMMARY_WORKERS_LOCAL)
+        bucket = _TokenBucket(DELIVERY_RATE_PER_SECOND, DELIVERY_BURST)
+        user_slots = asyncio.Semaphore(DELIVERY_USER_CONCURRENCY)
+        try:
+            await asyncio.gather(
+                *(
+                    self._process_topic(topic, user_ids, *fetched.get(topic, ([], [])), summaries, bucket, user_slots)
+                    for topic, user_ids in all_topics.items()
+                )
+            )
+        finally:
+            summaries.cancel_pending()
+
+    async def _process_topic(
+        self,
+        topic: str,
+        user_ids: set,
+        articles: List[Dict],
+        failed_sources: List[Tuple[str, str]],
+        summaries: "_SummaryPool",
+        bucket: "_TokenBucket",
+        user_slots: asyncio.Semaphore,
+    ) -> None:
+        """Dedupe one topic's articles, then fan out to its subscribers concurrently."""
+        if failed_sources:
+            await self._notify_source_errors(topic, sorted(user_ids), failed_sources)
+
+        # Filter already seen
+        new_articles = [a for a in articles if not _is_seen(a["hash"])]
+        if not new_articles:
+            return
 
-            # Filter already seen
-            new_articles = [a for a in articles if not _is_seen(a["hash"])]
-            if not new_articles:
-                continue
+        # Limit per cycle
+        new_articles = new_articles[:5]
 
-            # Limit per cycle
-            new_articles = new_articles[:5]
-
-            for article in new_articles:
-                _mark_seen(article["hash"], {
-                    "title": article["title"],
-                    "link": article.get("link", ""),
-                    "source": article.get("source", ""),
-                    "topic": topic,
-                    "sent_at": datetime.now().isoformat(),
-                })
-
-            for uid in sorted(user_ids):
-                ranked_articles = sorted(
-                    new_articles,
-                    key=lambda a: (
-                        _importance_score(a),
-                        _article_relevance_score(uid, topic, a),
-                    ),
-                    reverse=True,
-                )
-                quota = _article_quota_for_user(uid, topic)
-                sent_count = 0
+        for article in new_articles:
+            _mark_seen(article["hash"], {
+                "title": article["title"],
+                "link": article.get("link", ""),
+                "source": article.get("source", ""),
+                "topic": topic,
+                "sent_at": datetime.now().isoformat(),
+            })
 
-                for article in ranked_articles:
-                    if sent_count >= quota:
-                        break
-                    try:
-                        delivered = await self._deliver_article(uid, article, topic)
-                        if delivered:
-                            sent_count += 1
-                    except Exception as e:
-                        home_log.log_sync(f"⚠️ Deliver error user={uid} topic={topic}: {e}")
+        async def _deliver_to(uid: int) -> None:
+            async with user_slots:
+                await self._deliver_topic_to_user(uid, topic, new_articles, summaries, bucket)
+
+        await asyncio.gather(*(_deliver_to(uid) for uid in sorted(user_ids)))
+
+        for article in new_articles:
+            if article["hash"] in summaries.shed:
+                _unmark_seen(article["hash"])
+
+    async def _deliver_topic_to_user(
+        self,
+        uid: int,
+        topic: str,
+        new_articles: List[Dict],
+        summaries: "_SummaryPool",
+        bucket: "_TokenBucket",
+    ) -> None:
+        ranked_articles = sorted(
+            new_articles,
+            key=lambda a: (
+                _importance_score(a),
+                _article_relevance_score(uid, topic, a),
+            ),
+            reverse=True,
+        )
+        quota = _article_quota_for_user(uid, topic)
 
-                # Small delay between users to avoid bursts
-                await asyncio.sleep(1)
+        # Start summaries for the articles this user will most likely receive.
+        if not user_in_quiet_window(uid):
+            detail = get_user_detail_level(uid, topic)
+            for article in [a for a in ranked_articles if not _should_skip_article(uid, topic, a)][:quota]:
+                summaries.prefetch(article, detail, topic)
+
+        sent_count = 0
+        for article in ranked_articles:
+            if sent_count >= quota:
+                break
+            try:
+                delivered = await self._deliver_article(uid, article, topic, summaries=summaries, bucket=bucket)
+                if delivered:
+                    sent_count += 1
+            except Exception as e:
+                home_log.log_sync(f"⚠️ Deliver error user={uid} topic={topic}: {e}")
 
     async def _notify_source_errors(self, topic: str, user_ids: List[int], failed_sources: List[Tuple[str, str]]) -> None:
         """Notify users of persistent source issues and offer one-click source disable."""
@@ -1545,7 +1970,15 @@ class NewsManager:
             except Exception:
                 continue
 
-    async def _deliver_article(self, user_id: int, article: Dict, topic: str) -> bool:
+    async def _deliver_article(
+        self,
+        user_id: int,
+        article: Dict,
+        topic: str,
+        *,
+        summaries: Optional["_SummaryPool"] = None,
+        bucket: Optional["_TokenBucket"] = None,
+    ) -> bool:
         """Deliver a single article to a user via DM. Respects quiet time and preferences."""
         if not self.client:
             return False
@@ -1568,8 +2001,16 @@ class NewsManager:
         # Determine detail level
         detail = get_user_detail_level(user_id, topic)
 
-        # Summarize
-        summary = await _summarize_article(article, detail_level=detail, topic=topic)
+        # Summarize (shared across subscribers when called from a cycle)
+        if summaries is not None:
+            summary = await summaries.get(article, detail, topic)
+            if article["hash"] in summaries.shed:
+                return False
+        else:
+            try:
+                summary = await _summarize_article(article, detail_level=detail, topic=topic)
+            except llm_scheduler.Busy:
+                return False
         if not summary:
             summary = (
                 f"**HEADLINE:** {article['title']}\n"
@@ -1587,6 +2028,8 @@ class NewsManager:
         if source_url:
             expanded_text = f"{expanded_text}\n\n{source_url}"
         view = NewsCompactView(article["hash"], topic, compact_text, expanded_text)
+        if bucket is not None:
+            await bucket.acquire()
         try:
             user = await self.client.fetch_user(user_id)
             await user.send(content=compact_text, view=view, suppress_embeds=True)
@@ -1620,11 +2063,14 @@ class NewsManager:
             if not articles:
                 continue
 
+            try:
+                summary = await _summarize_quiet_time_batch(list(articles))
+            except llm_scheduler.Busy:
+                continue  # queue kept; the digest goes out next cycle
             articles = pop_queued_articles_only(uid)
             if not articles:
                 continue
 
-            summary = await _summarize_quiet_time_batch(articles)
             if not summary:
                 summary = f"You had {len(articles)} articles queued. Could not generate summary."
 
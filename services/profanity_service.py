@@ -1,10 +1,17 @@
-"""Persistent profanity list and strict matching helpers."""
+"""Persistent profanity list and strict matching helpers.
+
+The word list is loaded once and compiled into an Aho-Corasick automaton, rebuilt only when
+add_word/remove_word/reset_defaults change it. A check is then one pass over the message's
+compact leet-normalized form, however long the list is.
+"""
 from __future__ import annotations
 
 import json
 import os
 import re
-from typing import List, Set
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
 
 _ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(_ROOT, "data", "profanity.json")
@@ -75,18 +82,79 @@ def _load_raw_words() -> List[str]:
         return list(DEFAULT_WORDS)
 
 
+class _Matcher:
+    """Aho-Corasick automaton over the normalized word list (boolean: does any word occur)."""
+
+    def __init__(self, words: List[str]):
+        self.words = words
+        self.word_set = frozenset(words)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._hit: List[bool] = [False]
+        for w in words:
+            state = 0
+            for ch in w:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._hit.append(False)
+                state = nxt
+            self._hit[state] = True
+        # Breadth-first fail links; a state also matches if its fail state does.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._hit[nxt] = self._hit[nxt] or self._hit[self._fail[nxt]]
+                queue.append(nxt)
+
+    def search(self, text: str) -> bool:
+        goto, fail, hit = self._goto, self._fail, self._hit
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if hit[state]:
+                return True
+        return False
+
+
+_lock = threading.Lock()
+_matcher: Optional[_Matcher] = None
+
+
+def _get_matcher() -> _Matcher:
+    global _matcher
+    m = _matcher
+    if m is None:
+        with _lock:
+            if _matcher is None:
+                words = _load_raw_words() or list(DEFAULT_WORDS)
+                _matcher = _Matcher(sorted(set(words)))
+            m = _matcher
+    return m
+
+
 def _save_words(words: List[str]) -> None:
+    global _matcher
     _ensure_data_dir()
     payload = {"words": sorted(set(_normalize_word(w) for w in words if _normalize_word(w)))}
     with open(DATA_PATH, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2)
+    with _lock:
+        _matcher = None  # rebuilt from the saved list on next use
 
 
 def get_words() -> List[str]:
-    words = _load_raw_words()
-    if not words:
-        words = list(DEFAULT_WORDS)
-    return sorted(set(words))
+    return list(_get_matcher().words)
 
 
 def add_word(word: str) -> bool:
@@ -116,28 +184,34 @@ def reset_defaults() -> None:
     _save_words(list(DEFAULT_WORDS))
 
 
-def contains_profanity(text: str) -> bool:
-    if not text:
-        return False
-    words: Set[str] = set(get_words())
-    if not words:
-        return False
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_REPEAT_RUN = re.compile(r"(.)\1{2,}")
+
 
+def _check(matcher: _Matcher, text: str) -> bool:
+    if not text or not matcher.words:
+        return False
     lowered = text.lower().translate(LEET_MAP)
-    tokenized = re.sub(r"[^a-z0-9]+", " ", lowered)
-    tokens = [t for t in tokenized.split() if t]
-
-    # Word-level and repeated-character checks.
-    for t in tokens:
-        if t in words:
-            return True
-        squeezed = re.sub(r"(.)\1{2,}", r"\1", t)
-        if squeezed in words:
-            return True
-
-    # Strict compact scan catches punctuation-separated forms like f.u.c.k.
-    compact = re.sub(r"[^a-z0-9]", "", lowered)
-    for w in words:
-        if w in compact:
-            return True
+
+    # Strict compact scan catches punctuation-separated forms like f.u.c.k. Every token is a
+    # substring of the compact form, so this also covers plain word matches.
+    if matcher.search(_NON_ALNUM.sub("", lowered)):
+        return True
+
+    # Repeated-character check (fuuuck), only for tokens that have a run to squeeze.
+    if _REPEAT_RUN.search(lowered):
+        for t in _NON_ALNUM.sub(" ", lowered).split():
+            squeezed = _REPEAT_RUN.sub(r"\1", t)
+            if squeezed != t and squeezed in matcher.word_set:
+                return True
     return False
+
+
+def contains_profanity(text: str) -> bool:
+    return _check(_get_matcher(), text)
+
+
+def contains_profanity_many(texts: Iterable[str]) -> List[bool]:
+    """contains_profanity for each text (e.g. a channel history page), sharing one matcher."""
+    matcher = _get_matcher()
+    return [_check(matcher, t) for t in texts]
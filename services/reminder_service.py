@@ -1,12 +1,30 @@
+"""Reminders: an asyncio scheduler on a min-heap of trigger times.
+
+The scheduler task sleeps until the earliest pending reminder (capped at MAX_SLEEP_SECONDS so
+wall-clock jumps are noticed) and is woken early when a nearer reminder is added. Reminders
+that come due together are sent as one batch. Adds, removals and fired reminders are persisted
+per reminder: row upserts on SQLite, an append-only journal (utils.journal_store) on the JSON
+backend. Recurring reminders (hourly / daily / weekly) are rescheduled after they fire.
+"""
 import asyncio
+import heapq
+import itertools
 import threading
-import json
-import os
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import discord
 
 from utils import home_log
+from utils.journal_store import JournalStore
+from utils.state_store import DELETE, JsonDocumentFile, open_store, using_sqlite
+
+MAX_SLEEP_SECONDS = 3600.0
+REPEAT_INTERVALS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
 
 
 def _runtime_platform() -> str:
@@ -22,6 +40,7 @@ class Reminder:
         trigger_time: datetime,
         is_dm: bool = False,
         platform: str = "discord",
+        repeat: Optional[str] = None,
     ):
         self.user_id = user_id
         self.channel_id = channel_id
@@ -29,8 +48,9 @@ class Reminder:
         self.trigger_time = trigger_time
         self.is_dm = is_dm
         self.platform = platform
+        self.repeat = repeat if repeat in REPEAT_INTERVALS else None
         self.id = f"{platform}_{user_id}_{int(trigger_time.timestamp())}"
-    
+
     def to_dict(self):
         return {
             "user_id": self.user_id,
@@ -39,9 +59,10 @@ class Reminder:
             "trigger_time": self.trigger_time.isoformat(),
             "is_dm": self.is_dm,
             "platform": self.platform,
+            "repeat": self.repeat,
             "id": self.id
         }
-    
+
     @classmethod
     def from_dict(cls, data):
         reminder = cls(
@@ -51,99 +72,201 @@ class Reminder:
             datetime.fromisoformat(data["trigger_time"]),
             data.get("is_dm", False),
             data.get("platform", "discord"),
+            data.get("repeat"),
         )
         reminder.id = data.get("id", reminder.id)
         return reminder
 
+    def advance(self, now: datetime) -> bool:
+        """Recurring: move trigger_time to the next occurrence after `now`. False for one-shot reminders."""
+        step = REPEAT_INTERVALS.get(self.repeat or "")
+        if step is None:
+            return False
+        while self.trigger_time <= now:
+            self.trigger_time += step
+        return True
+
+
 class ReminderManager:
     def __init__(self, save_file: str = "reminders.json"):
         self.save_file = save_file
         self.reminders: Dict[str, Reminder] = {}
         self.running = False
-        self.thread = None
         self.client = None
         self.platform = _runtime_platform()
         self.loop = None
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, str]] = []  # (trigger timestamp, seq, reminder id)
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        legacy = JsonDocumentFile(save_file, ("reminders",), list_fields={"reminders": "id"})
+        if using_sqlite():
+            self._legacy = None
+            self._store = open_store("reminders", ("reminders",), legacy)
+        else:
+            # Snapshot + journal at the same path; a list-style reminders.json is imported once on load.
+            self._legacy = legacy
+            self._store = JournalStore(save_file, ("reminders",))
         self.load()
-    
+
     def set_client(self, client):
-        """Set Discord client for sending notifications"""
+        """Set Discord client for sending notifications (call from the running loop)."""
         self.client = client
         self.platform = "discord"
         self.loop = client.loop if client else None
-    
-    def add_reminder(self, user_id: int, channel_id: int, message: str, delay_minutes: int, is_dm: bool = False) -> str:
-        """Add a new reminder"""
-        trigger_time = datetime.now() + timedelta(minutes=delay_minutes)
-        reminder = Reminder(user_id, channel_id, message, trigger_time, is_dm, self.platform)
-        self.reminders[reminder.id] = reminder
-        self.save()
-        return reminder.id
-    
-    def add_timed_reminder(self, user_id: int, channel_id: int, message: str, trigger_time: datetime, is_dm: bool = False) -> str:
-        """Add reminder for specific time"""
-        reminder = Reminder(user_id, channel_id, message, trigger_time, is_dm, self.platform)
+        if self.running:
+            self._ensure_task()
+
+    def _push(self, reminder: Reminder) -> None:
+        with self._lock:
+            heapq.heappush(self._heap, (reminder.trigger_time.timestamp(), next(self._seq), reminder.id))
+        self._poke()
+
+    def _poke(self) -> None:
+        """Wake the scheduler so it re-reads the earliest trigger time (safe from any thread)."""
+        loop, event = self.loop, self._wakeup
+        if loop is None or event is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+    def _persist(self, reminders: List[Reminder] = (), removed: List[str] = ()) -> None:
+        changes = [("reminders", r.id, r.to_dict()) for r in reminders]
+        changes += [("reminders", rid, DELETE) for rid in removed]
+        if changes:
+            self._store.submit(changes)
+
+    def _add(self, reminder: Reminder) -> str:
         self.reminders[reminder.id] = reminder
-        self.save()
+        self._persist([reminder])
+        self._push(reminder)
         return reminder.id
-    
+
+    def add_reminder(
+        self, user_id: int, channel_id: int, message: str, delay_minutes: int, is_dm: bool = False,
+        repeat: Optional[str] = None,
+    ) -> str:
+        """Add a new reminder"""
+        trigger_time = datetime.now() + timedelta(minutes=delay_minutes)
+        return self._add(Reminder(user_id, channel_id, message, trigger_time, is_dm, self.platform, repeat))
+
+    def add_timed_reminder(
+        self, user_id: int, channel_id: int, message: str, trigger_time: datetime, is_dm: bool = False,
+        repeat: Optional[str] = None,
+    ) -> str:
+        """Add reminder for specific time (repeat: hourly / daily / weekly, or None for once)"""
+        return self._add(Reminder(user_id, channel_id, message, trigger_time, is_dm, self.platform, repeat))
+
     def remove_reminder(self, reminder_id: str) -> bool:
-        """Remove a reminder by ID"""
+        """Remove a reminder by ID (its heap entry is skipped when it comes up)"""
         if reminder_id in self.reminders:
             del self.reminders[reminder_id]
-            self.save()
+            self._persist(removed=[reminder_id])
             return True
         return False
-    
+
     def get_user_reminders(self, user_id: int) -> List[Reminder]:
-        """Get all reminders for a user"""
-        return [r for r in self.reminders.values() if r.user_id == user_id]
-    
+        """Get all reminders for a user, soonest first"""
+        return sorted((r for r in self.reminders.values() if r.user_id == user_id), key=lambda r: r.trigger_time)
+
     def load(self):
-        """Load reminders from file"""
-        if os.path.exists(self.save_file):
+        """Load reminders from the state store"""
+        data = self._store.load().get("reminders", {})
+        if not data and self._legacy is not None and self._legacy.exists():
+            data = self._legacy.load().get("reminders", {})
+            if data:
+                self._store.rewrite({"reminders": data})
+        now = datetime.now()
+        stale: List[str] = []
+        advanced: List[Reminder] = []
+        for key, reminder_data in data.items():
             try:
-                with open(self.save_file, 'r') as f:
-                    data = json.load(f)
-                    for reminder_data in data.get("reminders", []):
-                        reminder = Reminder.from_dict(reminder_data)
-                        if getattr(reminder, "platform", "") == "telegram":
-                            reminder.platform = "discord"
-                        # Only load future reminders
-                        if reminder.trigger_time > datetime.now():
-                            self.reminders[reminder.id] = reminder
-            except (json.JSONDecodeError, KeyError) as e:
+                reminder = Reminder.from_dict(reminder_data)
+            except (KeyError, TypeError, ValueError) as e:
                 home_log.log_sync(f"Error loading reminders: {e}")
-    
-    def save(self):
-        """Save reminders to file"""
-        data = {"reminders": [r.to_dict() for r in self.reminders.values()]}
-        with open(self.save_file, 'w') as f:
-            json.dump(data, f, indent=2)
-    
-    def check_reminders(self):
-        """Check and trigger due reminders"""
-        now = datetime.now()
-        triggered = []
-        
-        for reminder_id, reminder in list(self.reminders.items()):
-            if reminder.platform != self.platform:
                 continue
+            if getattr(reminder, "platform", "") == "telegram":
+                reminder.platform = "discord"
+            # Only load future reminders; recurring ones skip the occurrences missed while offline
             if reminder.trigger_time <= now:
-                triggered.append(reminder)
-                del self.reminders[reminder_id]
-        
-        if triggered:
-            if self.loop and self.client:
-                for reminder in triggered:
-                    asyncio.run_coroutine_threadsafe(
-                        self._send_reminder(reminder),
-                        self.loop
-                    )
-        
-        if triggered:
-            self.save()
-    
+                if not reminder.advance(now):
+                    stale.append(key)
+                    continue
+                advanced.append(reminder)
+            self.reminders[reminder.id] = reminder
+            self._push(reminder)
+        self._persist(advanced, stale)
+
+    def save(self):
+        """Save all reminders (only changed rows on SQLite; snapshot rewrite on the journal)"""
+        state = {"reminders": {rid: r.to_dict() for rid, r in list(self.reminders.items())}}
+        if isinstance(self._store, JournalStore):
+            self._store.rewrite(state)
+        else:
+            self._store.sync(state)
+
+    def _pop_due(self) -> List[Reminder]:
+        """Remove due reminders from the heap; one-shot ones leave the store, recurring ones are rescheduled."""
+        now_ts = time.time()
+        due: List[Reminder] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts:
+                ts, _, rid = heapq.heappop(self._heap)
+                reminder = self.reminders.get(rid)
+                # Skip entries for removed reminders and for ones since moved to another time.
+                if reminder is None or reminder.trigger_time.timestamp() != ts:
+                    continue
+                if reminder.platform != self.platform:
+                    continue
+                due.append(reminder)
+        if not due:
+            return due
+        now = datetime.now()
+        rescheduled: List[Reminder] = []
+        removed: List[str] = []
+        for reminder in due:
+            if reminder.advance(now):
+                rescheduled.append(reminder)
+            else:
+                self.reminders.pop(reminder.id, None)
+                removed.append(reminder.id)
+        self._persist(rescheduled, removed)
+        for reminder in rescheduled:
+            self._push(reminder)
+        return due
+
+    def _next_delay(self) -> float:
+        with self._lock:
+            if not self._heap:
+                return MAX_SLEEP_SECONDS
+            return min(MAX_SLEEP_SECONDS, max(0.0, self._heap[0][0] - time.time()))
+
+    async def _run(self):
+        """Sleep until the earliest reminder is due (or a nearer one is added), then send what is due."""
+        self._wakeup = asyncio.Event()
+        while self.running:
+            self._wakeup.clear()
+            try:
+                due = self._pop_due()
+                if due and self.client:
+                    await asyncio.gather(*(self._send_reminder(r) for r in due))
+            except Exception as e:
+                home_log.log_sync(f"Error checking reminders: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    def check_reminders(self):
+        """Trigger due reminders now (the scheduler task normally does this on time)"""
+        due = self._pop_due()
+        if due and self.loop and self.client:
+            for reminder in due:
+                asyncio.run_coroutine_threadsafe(self._send_reminder(reminder), self.loop)
+
     async def _send_reminder(self, reminder: Reminder):
         """Send a single reminder notification"""
         try:
@@ -156,28 +279,35 @@ class ReminderManager:
                     await channel.send(f"<@{reminder.user_id}> ⏰ **Reminder:** {reminder.message}")
         except Exception as e:
             home_log.log_sync(f"Error sending reminder: {e}")
-    
+
+    def _ensure_task(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # started before the event loop; set_client() creates the task
+        self.loop = loop
+        self._task = loop.create_task(self._run())
+
     def start(self):
-        """Start the reminder checking thread"""
+        """Start the reminder scheduler (the task is created once the event loop is running)"""
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self._run, daemon=True)
-            self.thread.start()
+            self._ensure_task()
             home_log.log_sync("✅ Reminder service started")
-    
+
     def stop(self):
-        """Stop the reminder checking thread"""
+        """Stop the reminder scheduler and flush pending writes"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            try:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass
+        self._store.flush()
         home_log.log_sync("🛑 Reminder service stopped")
-    
-    def _run(self):
-        """Main loop for checking reminders"""
-        import time
-        while self.running:
-            self.check_reminders()
-            time.sleep(60)  # Check every minute
 
 # Global instance
 reminder_manager = ReminderManager()
@@ -17,7 +17,7 @@ def setup_project():
             os.makedirs(path)
             print(f"  ✅ Created directory: {name}/")
 
-    # commands/ packages (must match main.py imports)
+    # commands/ packages (must match discord_bot.py imports)
     command_packages = (
         "general", "file", "chat", "reminder", "persona", "model",
         "download", "translate", "scripts", "admin", "ha", "help",
@@ -0,0 +1,196 @@
+"""Map-reduce analysis for files too large for one prompt (analyze_file, compare_files).
+
+Text is split along its structure (PDF pages, code definitions, paragraphs, lines) into
+chunks under a token budget. Each chunk is summarized concurrently (map), then the notes
+are merged in groups until they fit one prompt (reduce), and the final instruction runs
+on the merged notes. Token counts are estimated (~4 chars/token); no tokenizer needed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Awaitable, Callable, List, Optional
+
+from integrations import FILE_ANALYSIS_CHUNK_TOKENS, FILE_ANALYSIS_CONCURRENCY
+
+CHARS_PER_TOKEN = 4
+# Guard against runaway cost on pathological inputs (e.g. 8 MB of minified text).
+MAX_CHUNKS = 64
+
+# (system, user) -> reply text
+LLMCall = Callable[[str, str], Awaitable[str]]
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+_PAGE_RE = re.compile(r"(?m)^(?=--- (?:Page \d+|slide\d+\.xml) ---$)")
+_CODE_DEF_RE = re.compile(
+    r"(?m)^(?=(?:async\s+def|def|class|function|func|fn|pub\s+fn|impl|interface|struct|enum|type|"
+    r"export\s+(?:default\s+)?(?:async\s+)?(?:function|class|const)|public|private|protected|static)\b)"
+)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+MAP_SYSTEM = (
+    "You read one part of a larger file and write compact notes for a later step. "
+    "Keep concrete facts, names, numbers, errors and quotes that matter. No preamble."
+)
+REDUCE_SYSTEM = "You merge notes taken from consecutive parts of one file into one compact set of notes. No preamble."
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def needs_chunking(text: str, budget_tokens: Optional[int] = None) -> bool:
+    return estimate_tokens(text) > (budget_tokens or FILE_ANALYSIS_CHUNK_TOKENS)
+
+
+def _split_pieces(text: str, file_type: str) -> List[str]:
+    if _PAGE_RE.search(text):
+        pieces = _PAGE_RE.split(text)
+    elif file_type == "code":
+        pieces = _CODE_DEF_RE.split(text)
+    else:
+        pieces = _PARAGRAPH_RE.split(text)
+    return [p for p in pieces if p.strip()]
+
+
+def _hard_split(piece: str, max_chars: int) -> List[str]:
+    """Split an oversized piece on line boundaries, cutting single long lines as a last resort."""
+    out: List[str] = []
+    buf = ""
+    for line in piece.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if buf:
+                out.append(buf)
+                buf = ""
+            out.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(buf) + len(line) > max_chars and buf:
+            out.append(buf)
+            buf = ""
+        buf += line
+    if buf:
+        out.append(buf)
+    return out
+
+
+def split_into_chunks(text: str, file_type: str, budget_tokens: Optional[int] = None) -> List[str]:
+    """Greedily pack structural pieces into chunks of at most `budget_tokens` (estimated)."""
+    max_chars = (budget_tokens or FILE_ANALYSIS_CHUNK_TOKENS) * CHARS_PER_TOKEN
+    sep = "\n" if file_type == "code" else "\n\n"
+    chunks: List[str] = []
+    buf = ""
+    for piece in _split_pieces(text, file_type):
+        parts = _hard_split(piece, max_chars) if len(piece) > max_chars else [piece]
+        for part in parts:
+            if buf and len(buf) + len(sep) + len(part) > max_chars:
+                chunks.append(buf)
+                buf = ""
+            buf = f"{buf}{sep}{part}" if buf else part
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+async def _report(progress: Optional[ProgressCallback], message: str) -> None:
+    if progress is None:
+        return
+    try:
+        await progress(message)
+    except Exception:
+        pass  # progress is cosmetic; never fail the analysis over it
+
+
+async def _gather_bounded(
+    prompts: List[str],
+    system: str,
+    call: LLMCall,
+    concurrency: int,
+    on_done: Callable[[int], Awaitable[None]],
+) -> List[str]:
+    sem = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def run(prompt: str) -> str:
+        nonlocal done
+        async with sem:
+            try:
+                reply = (await call(system, prompt)) or ""
+            except Exception as e:
+                reply = f"[part failed: {e}]"
+        done += 1
+        await on_done(done)
+        return reply.strip()
+
+    return await asyncio.gather(*(run(p) for p in prompts))
+
+
+async def reduce_notes(
+    notes: List[str],
+    call: LLMCall,
+    *,
+    budget_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    label: str = "",
+) -> str:
+    """Merge notes in budget-sized groups until they fit one prompt."""
+    budget = budget_tokens or FILE_ANALYSIS_CHUNK_TOKENS
+    level = 1
+    while len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > budget:
+        groups: List[List[str]] = [[]]
+        for note in notes:
+            if groups[-1] and estimate_tokens("\n\n".join(groups[-1] + [note])) > budget:
+                groups.append([])
+            groups[-1].append(note)
+        if len(groups) == len(notes):
+            # Every note is already budget-sized: pair them up so the loop makes progress.
+            groups = [notes[i : i + 2] for i in range(0, len(notes), 2)]
+        prompts = [
+            f"Merge these notes{label} (parts in order):\n\n" + "\n\n".join(f"[Notes {j}]\n{n}" for j, n in enumerate(g, 1))
+            for g in groups
+        ]
+
+        async def on_done(n: int, total=len(prompts), lvl=level) -> None:
+            await _report(progress, f"⏳ Merging notes{label} (round {lvl}): {n}/{total}")
+
+        notes = await _gather_bounded(prompts, REDUCE_SYSTEM, call, concurrency or FILE_ANALYSIS_CONCURRENCY, on_done)
+        level += 1
+    return "\n\n".join(notes)
+
+
+async def map_notes(
+    text: str,
+    filename: str,
+    file_type: str,
+    instruction: str,
+    call: LLMCall,
+    *,
+    budget_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> str:
+    """Chunk `text`, take notes per chunk relevant to `instruction`, and reduce them to one block."""
+    chunks = split_into_chunks(text, file_type, budget_tokens)
+    omitted = 0
+    if len(chunks) > MAX_CHUNKS:
+        omitted = len(chunks) - MAX_CHUNKS
+        chunks = chunks[:MAX_CHUNKS]
+    total = len(chunks)
+    await _report(progress, f"⏳ `{filename}` is large — reading it in {total} parts…")
+    prompts = [
+        f"File '{filename}', part {i}/{total}. Take notes relevant to this task: {instruction}\n\n---\n{chunk}"
+        for i, chunk in enumerate(chunks, 1)
+    ]
+
+    async def on_done(n: int) -> None:
+        await _report(progress, f"⏳ Reading `{filename}`: {n}/{total} parts")
+
+    notes = await _gather_bounded(prompts, MAP_SYSTEM, call, concurrency or FILE_ANALYSIS_CONCURRENCY, on_done)
+    notes = [f"(part {i}/{total}) {n}" for i, n in enumerate(notes, 1)]
+    merged = await reduce_notes(
+        notes, call, budget_tokens=budget_tokens, concurrency=concurrency, progress=progress, label=f" for `{filename}`"
+    )
+    if omitted:
+        merged += f"\n\n[Last {omitted} parts of the file were not read (size limit).]"
+    return merged
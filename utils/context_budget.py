@@ -0,0 +1,121 @@
+"""Token budgets for chat prompts, sized to the target model's context window.
+
+num_ctx_for() picks the context length requested from Ollama: the model's own length from
+model_registry, capped at LLM_NUM_CTX (KV memory grows with it). It is sent with every Ollama
+request for that model, because a request with a different num_ctx makes Ollama reload the model.
+
+Budget splits that window between the reply (num_predict), the system prompt and runtime note
+(measured as-is), and capped shares for the older-DM notes, recent channel messages and the user
+message itself. History gets what is left, newest turns first. Token counts come from a
+cached approximate tokenizer (letter runs ≈ 4 chars/token, digits and symbols 1 each),
+which deliberately errs high. Real tokenizers are per model and are not available here.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from integrations import LLM_NUM_CTX
+from utils import model_registry
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role markers / template tokens per chat message
+IMAGE_TOKENS = 768  # typical vision encoder output per image
+CLOUD_MAX_CONTEXT = 32768  # budget cap for OpenRouter models (billed per token)
+SAFETY_TOKENS = 64
+# A history message is only kept in trimmed form when at least this much of it fits.
+MIN_TRIMMED_TOKENS = 64
+SHARES = {"summary": 0.10, "channel": 0.15, "message": 0.25}
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\S")
+
+
+@lru_cache(maxsize=8192)
+def _count(text: str) -> int:
+    n = 0
+    for piece in _TOKEN_RE.findall(text):
+        n += (len(piece) + 3) // 4 if piece[0].isascii() and piece[0].isalpha() else 1
+    return n
+
+
+def count_tokens(text: Optional[str]) -> int:
+    return _count(text) if text else 0
+
+
+def message_tokens(msg: Dict[str, Any]) -> int:
+    images = msg.get("images") or ()
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(str(msg.get("content") or "")) + IMAGE_TOKENS * len(images)
+
+
+def num_ctx_for(model: str, provider: str = "local") -> int:
+    """Context window to budget for (and, for Ollama, to request as options.num_ctx)."""
+    known = model_registry.context_length(model, "cloud" if provider == "cloud" else "local")
+    if provider == "cloud":
+        return min(known or CLOUD_MAX_CONTEXT, CLOUD_MAX_CONTEXT)
+    return min(known, LLM_NUM_CTX) if known else LLM_NUM_CTX
+
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens`, keeping its start and end."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Token estimates per char vary; shrink by ratio and re-check.
+    keep = len(text)
+    while keep > 0 and count_tokens(text[: keep // 2] + text[len(text) - keep // 2 :]) > max_tokens - 8:
+        keep = int(keep * 0.8)
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head].rstrip() + "\n[… trimmed to fit the model's context …]\n" + text[len(text) - tail :].lstrip()
+
+
+def fit_lines(lines: List[str], max_tokens: int) -> List[str]:
+    """Leading lines that fit `max_tokens` (callers put the most relevant lines first)."""
+    out: List[str] = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        out.append(line)
+        used += cost
+    return out
+
+
+def fit_history(messages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+    """Newest messages that fit `max_tokens`, in their original order; the first one that does not fit is trimmed."""
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    for msg in reversed(messages):
+        cost = message_tokens(msg)
+        if used + cost > max_tokens:
+            room = max_tokens - used - MESSAGE_OVERHEAD_TOKENS
+            if room >= MIN_TRIMMED_TOKENS and not msg.get("images"):
+                kept.append(dict(msg, content=trim_text(str(msg.get("content") or ""), room)))
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+class Budget:
+    """Token allocation for one request against a model's context window."""
+
+    def __init__(self, num_ctx: int, reserve_output: int):
+        self.num_ctx = num_ctx
+        # Leave the prompt at least half the window even when num_predict is large.
+        self.reserve_output = min(max(0, reserve_output), num_ctx // 2)
+        self.prompt_tokens = num_ctx - self.reserve_output - SAFETY_TOKENS
+
+    @classmethod
+    def for_model(cls, model: str, provider: str = "local", reserve_output: int = 1024) -> "Budget":
+        return cls(num_ctx_for(model, provider), reserve_output)
+
+    def share(self, part: str) -> int:
+        return int(self.prompt_tokens * SHARES[part])
+
+    def remaining(self, used: int) -> int:
+        return max(0, self.prompt_tokens - used)
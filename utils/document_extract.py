@@ -0,0 +1,207 @@
+"""Text extraction for uploaded documents (PDF, Office), run in a process pool.
+
+PDFs: per-page text via pypdf; pages without a text layer are rasterized (pdf2image) and
+OCR'd with Tesseract. Office Open XML (docx/xlsx/pptx) is read from its XML parts; legacy
+binary formats fall back to printable-string extraction. Results are cached in memory by
+content hash, so re-analyzing the same attachment does not re-parse it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+MAX_WORKERS = 2
+# Pages OCR'd per PDF at most (OCR is ~1-3 s/page).
+MAX_OCR_PAGES = 20
+OCR_DPI = 200
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Worker-side extraction (must stay picklable / top-level)
+# ---------------------------------------------------------------------------
+
+def _decode_text(content: bytes) -> str:
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("latin-1", errors="replace")
+
+
+def _ocr_pdf_page(data: bytes, page_number: int, lang: str) -> str:
+    try:
+        from pdf2image import convert_from_bytes
+        import pytesseract
+    except ImportError:
+        return ""
+    try:
+        images = convert_from_bytes(data, dpi=OCR_DPI, first_page=page_number, last_page=page_number)
+    except Exception:
+        return ""
+    return "\n".join(pytesseract.image_to_string(img, lang=lang or "eng") for img in images).strip()
+
+
+def _extract_pdf(data: bytes, lang: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return "[PDF text extraction unavailable: pypdf is not installed]"
+    try:
+        reader = PdfReader(io.BytesIO(data))
+    except Exception as e:
+        return f"[Could not open PDF: {e}]"
+    parts: List[str] = []
+    ocr_done = 0
+    for i, page in enumerate(reader.pages, start=1):
+        try:
+            text = (page.extract_text() or "").strip()
+        except Exception:
+            text = ""
+        if not text and ocr_done < MAX_OCR_PAGES:
+            text = _ocr_pdf_page(data, i, lang)
+            ocr_done += 1
+            if text:
+                text = f"[OCR]\n{text}"
+        parts.append(f"--- Page {i} ---\n{text or '[no text found]'}")
+    return "\n\n".join(parts)
+
+
+_XML_TAG_RE = re.compile(r"<[^>]+>")
+_OOXML_PARTS = {
+    ".docx": (r"^word/(document|header\d*|footer\d*|footnotes)\.xml$", r"</w:p>"),
+    ".pptx": (r"^ppt/slides/slide\d+\.xml$", r"</a:p>"),
+    ".xlsx": (r"^xl/(sharedStrings|worksheets/sheet\d+)\.xml$", r"</(si|row)>"),
+}
+
+
+def _extract_ooxml(data: bytes, ext: str) -> str:
+    pattern, para_end = _OOXML_PARTS[ext]
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        return _extract_printable(data)
+    names = sorted(
+        (n for n in zf.namelist() if re.match(pattern, n)),
+        key=lambda n: [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", n)],
+    )
+    chunks: List[str] = []
+    for name in names:
+        xml = zf.read(name).decode("utf-8", errors="replace")
+        xml = re.sub(para_end, "\n", xml)
+        xml = re.sub(r"</(w:tc|c)>", "\t", xml)
+        text = _XML_TAG_RE.sub("", xml)
+        text = (
+            text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&apos;", "'").replace("&amp;", "&")
+        )
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        if text:
+            if ext == ".pptx":
+                chunks.append(f"--- {os.path.basename(name)} ---\n{text}")
+            else:
+                chunks.append(text)
+    return "\n\n".join(chunks)
+
+
+def _extract_printable(data: bytes) -> str:
+    """Legacy binary Office files: keep runs of printable text (ASCII and UTF-16LE)."""
+    runs = re.findall(rb"[\x20-\x7e\t\r\n]{6,}", data)
+    runs += [r.decode("utf-16le", errors="ignore").encode() for r in re.findall(rb"(?:[\x20-\x7e]\x00){6,}", data)]
+    text = "\n".join(r.decode("latin-1").strip() for r in runs)
+    return text.strip() or "[no extractable text]"
+
+
+def extract_text_sync(data: bytes, filename: str, ocr_lang: str = "eng") -> str:
+    """Extract plain text from a document's bytes (runs in a worker process)."""
+    ext = os.path.splitext((filename or "").lower())[1]
+    if ext == ".pdf" or data[:5] == b"%PDF-":
+        return _extract_pdf(data, ocr_lang)
+    if ext in _OOXML_PARTS:
+        return _extract_ooxml(data, ext)
+    if ext in (".doc", ".xls", ".ppt"):
+        return _extract_printable(data)
+    return _decode_text(data)
+
+
+# ---------------------------------------------------------------------------
+# Loop-side API
+# ---------------------------------------------------------------------------
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Never fork the bot: a forked child inherits the event loop, sockets and held locks.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[str]:
+    with _cache_lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+        return text
+
+
+def _cache_put(key: Tuple[str, str], text: str) -> None:
+    global _cache_bytes
+    size = len(text.encode("utf-8"))
+    if size > CACHE_MAX_BYTES:
+        return
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_bytes -= len(old.encode("utf-8"))
+        _cache[key] = text
+        _cache_bytes += size
+        while _cache_bytes > CACHE_MAX_BYTES and _cache:
+            _, dropped = _cache.popitem(last=False)
+            _cache_bytes -= len(dropped.encode("utf-8"))
+
+
+async def extract_text(data: bytes, filename: str, ocr_lang: str = "eng") -> str:
+    """Extract text without blocking the event loop; cached by (sha256 of bytes, OCR language)."""
+    key = (hashlib.sha256(data).hexdigest(), ocr_lang or "eng")
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    loop = asyncio.get_running_loop()
+    try:
+        text = await loop.run_in_executor(_get_pool(), extract_text_sync, data, filename, ocr_lang)
+    except concurrent.futures.process.BrokenProcessPool:
+        _reset_pool()
+        text = await asyncio.to_thread(extract_text_sync, data, filename, ocr_lang)
+    _cache_put(key, text)
+    return text
+
+
+def shutdown() -> None:
+    _reset_pool()
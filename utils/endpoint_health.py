@@ -0,0 +1,240 @@
+"""Ollama endpoint health registry: rolling latency/error stats and a per-endpoint circuit breaker.
+
+Also remembers models that recently returned 404 so the fallback chain can skip them.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Breaker opens after this many consecutive connection/5xx failures.
+FAILURE_THRESHOLD = 2
+# First open period; doubles on each failed half-open probe up to MAX_COOLDOWN_SECONDS.
+BASE_COOLDOWN_SECONDS = 15.0
+MAX_COOLDOWN_SECONDS = 300.0
+# A half-open probe that reports nothing for this long (its caller was cancelled) is given back.
+PROBE_TIMEOUT_SECONDS = 180.0
+# Rolling window of recent outcomes used for error-rate ordering.
+WINDOW = 20
+LATENCY_EWMA_ALPHA = 0.3
+# How long a model that returned 404 is skipped by the fallback chain.
+MISSING_MODEL_TTL_SECONDS = 600.0
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+_LOCK = threading.Lock()
+
+
+class _EndpointStats:
+    __slots__ = (
+        "outcomes",
+        "latency_ewma",
+        "consecutive_failures",
+        "state",
+        "opened_at",
+        "cooldown",
+        "probe_in_flight",
+        "probe_started",
+        "probe_id",
+    )
+
+    def __init__(self) -> None:
+        self.outcomes: Deque[bool] = deque(maxlen=WINDOW)
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self.cooldown = BASE_COOLDOWN_SECONDS
+        self.probe_in_flight = False
+        self.probe_started = 0.0
+        self.probe_id = 0
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def cooldown_left(self, now: float) -> float:
+        return max(0.0, self.opened_at + self.cooldown - now)
+
+
+_endpoints: Dict[str, _EndpointStats] = {}
+_missing_models: Dict[str, float] = {}
+
+
+def _norm(endpoint: str) -> str:
+    return (endpoint or "").strip().rstrip("/")
+
+
+def _stats(endpoint: str) -> _EndpointStats:
+    key = _norm(endpoint)
+    st = _endpoints.get(key)
+    if st is None:
+        st = _EndpointStats()
+        _endpoints[key] = st
+    return st
+
+
+def claim(endpoint: str) -> Optional[int]:
+    """
+    None if the endpoint is not available now; 0 when it is closed; otherwise the id of the
+    single half-open probe granted to this caller, to pass to release() when done.
+    """
+    now = time.time()
+    with _LOCK:
+        st = _stats(endpoint)
+        if st.state == STATE_CLOSED:
+            return 0
+        if st.state == STATE_OPEN and st.cooldown_left(now) <= 0:
+            st.state = STATE_HALF_OPEN
+            st.probe_in_flight = False
+        if st.state == STATE_HALF_OPEN and st.probe_in_flight and now - st.probe_started > PROBE_TIMEOUT_SECONDS:
+            st.probe_in_flight = False  # holder never reported back
+        if st.state == STATE_HALF_OPEN and not st.probe_in_flight:
+            st.probe_in_flight = True
+            st.probe_started = now
+            st.probe_id += 1
+            return st.probe_id
+        return None
+
+
+def allow(endpoint: str) -> bool:
+    """True if a request may go to this endpoint now (closed, or the single half-open probe)."""
+    return claim(endpoint) is not None
+
+
+def record_success(endpoint: str, latency_s: float) -> None:
+    with _LOCK:
+        st = _stats(endpoint)
+        st.outcomes.append(True)
+        if st.latency_ewma is None:
+            st.latency_ewma = latency_s
+        else:
+            st.latency_ewma = LATENCY_EWMA_ALPHA * latency_s + (1 - LATENCY_EWMA_ALPHA) * st.latency_ewma
+        st.consecutive_failures = 0
+        st.state = STATE_CLOSED
+        st.cooldown = BASE_COOLDOWN_SECONDS
+        st.probe_in_flight = False
+
+
+def record_failure(endpoint: str, *, trip: bool = True) -> None:
+    """Count a failure. trip=False (e.g. generation timeout) affects ordering but not the breaker."""
+    now = time.time()
+    with _LOCK:
+        st = _stats(endpoint)
+        st.outcomes.append(False)
+        if not trip:
+            if st.state == STATE_HALF_OPEN:
+                st.probe_in_flight = False
+            return
+        st.consecutive_failures += 1
+        if st.state == STATE_HALF_OPEN:
+            st.cooldown = min(MAX_COOLDOWN_SECONDS, st.cooldown * 2)
+            st.state = STATE_OPEN
+            st.opened_at = now
+            st.probe_in_flight = False
+        elif st.consecutive_failures >= FAILURE_THRESHOLD:
+            st.state = STATE_OPEN
+            st.opened_at = now
+
+
+def state(endpoint: str) -> str:
+    """Effective breaker state without claiming a probe slot (open past its cooldown reads as half-open)."""
+    now = time.time()
+    with _LOCK:
+        st = _stats(endpoint)
+        if st.state == STATE_OPEN and st.cooldown_left(now) <= 0:
+            return STATE_HALF_OPEN
+        return st.state
+
+
+def release(endpoint: str, probe: Optional[int] = None) -> None:
+    """
+    Give back a half-open probe slot that was granted but produced no outcome (aborted or
+    cancelled request). With `probe` from claim(), only that probe is released; no-op once a
+    success or failure has been recorded for it.
+    """
+    with _LOCK:
+        st = _stats(endpoint)
+        if st.state != STATE_HALF_OPEN:
+            return
+        if probe is not None and (probe != st.probe_id or not st.probe_in_flight):
+            return
+        st.probe_in_flight = False
+
+
+def ordered(endpoints: List[str]) -> List[str]:
+    """
+    Deduplicated endpoints, healthiest first: closed before half-open before open, then by
+    rolling error rate and latency; configured order breaks ties. Open endpoints stay in the
+    list (last, soonest-to-retry first) so callers can still fall back when everything is down.
+    """
+    now = time.time()
+    unique = list(dict.fromkeys(_norm(e) for e in endpoints if _norm(e)))
+    rank = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+    with _LOCK:
+        def _key(item):
+            idx, ep = item
+            st = _stats(ep)
+            state = st.state
+            if state == STATE_OPEN and st.cooldown_left(now) <= 0:
+                state = STATE_HALF_OPEN
+            latency = st.latency_ewma if st.latency_ewma is not None else 0.0
+            return (rank[state], st.cooldown_left(now) if state == STATE_OPEN else 0.0, round(st.error_rate(), 1), latency, idx)
+
+        return [ep for _, ep in sorted(enumerate(unique), key=_key)]
+
+
+def mark_model_missing(model_name: str) -> None:
+    with _LOCK:
+        _missing_models[str(model_name)] = time.time() + MISSING_MODEL_TTL_SECONDS
+
+
+def is_model_missing(model_name: str) -> bool:
+    now = time.time()
+    with _LOCK:
+        until = _missing_models.get(str(model_name))
+        if until is None:
+            return False
+        if until <= now:
+            _missing_models.pop(str(model_name), None)
+            return False
+        return True
+
+
+def clear_missing_models() -> None:
+    """Forget 404s (call after the model list changes, e.g. /pull-model)."""
+    with _LOCK:
+        _missing_models.clear()
+
+
+def snapshot() -> Dict[str, Dict[str, object]]:
+    """Per-endpoint state for /reliability."""
+    now = time.time()
+    with _LOCK:
+        out: Dict[str, Dict[str, object]] = {}
+        for ep, st in _endpoints.items():
+            out[ep] = {
+                "state": st.state,
+                "error_rate": round(st.error_rate(), 2),
+                "latency_ms": int(st.latency_ewma * 1000) if st.latency_ewma is not None else None,
+                "consecutive_failures": st.consecutive_failures,
+                "retry_in_s": int(st.cooldown_left(now)) if st.state == STATE_OPEN else 0,
+            }
+        return out
+
+
+def format_snapshot() -> str:
+    data = snapshot()
+    if not data:
+        return "No Ollama requests yet."
+    lines = []
+    for ep, d in data.items():
+        lat = f"{d['latency_ms']} ms" if d["latency_ms"] is not None else "n/a"
+        extra = f", retry in {d['retry_in_s']}s" if d["state"] == STATE_OPEN else ""
+        lines.append(f"`{ep}` {d['state']} · err {int(float(d['error_rate']) * 100)}% · {lat}{extra}")
+    return "\n".join(lines)
@@ -0,0 +1,182 @@
+"""Precomputed lookup structures for resolving spoken entity names to Home Assistant entity_ids.
+
+Built once per entity refresh (HomeAssistantManager.get_all_entities): exact friendly-name
+map, token inverted index, trigram index (substring candidates + fuzzy scoring) and domain
+buckets. /explain mappings are loaded once and re-read only when the file's mtime changes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MAPPINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ha_mappings.json")
+# Minimum Dice similarity for a fuzzy "did you mean" suggestion (suggestions are never executed).
+FUZZY_MIN_SCORE = 0.72
+
+_DOMAIN_PREFIX_RE = re.compile(r"^(light|switch|sensor|binary_sensor|climate|fan|cover|media_player)\s+(.+)$")
+_TOKEN_RE = re.compile(r"[a-z0-9äöåü]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _trigrams(text: str) -> Set[str]:
+    s = f"  {text.lower()} "
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+def _substring_trigrams(text: str) -> Set[str]:
+    """Trigrams every string containing `text` must also contain (no padding)."""
+    s = text.lower()
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+class EntityIndex:
+    def __init__(self, entities: Dict[str, Dict]):
+        self.order: Dict[str, int] = {}
+        self.names: Dict[str, str] = {}  # entity_id -> lowercased friendly_name
+        self.exact: Dict[str, str] = {}
+        self.tokens: Dict[str, Set[str]] = {}
+        self.grams: Dict[str, Set[str]] = {}  # over friendly name and entity_id (as given, "_" kept)
+        self.name_grams: Dict[str, Set[str]] = {}  # entity_id -> padded trigrams of friendly name
+        self.domains: Dict[str, List[str]] = {}
+        for rank, (entity_id, entity) in enumerate(entities.items()):
+            self.order[entity_id] = rank
+            friendly = str((entity.get("attributes") or {}).get("friendly_name", "") or "").lower()
+            self.names[entity_id] = friendly
+            if friendly:
+                self.exact.setdefault(friendly, entity_id)
+                for tok in _tokens(friendly):
+                    self.tokens.setdefault(tok, set()).add(entity_id)
+                self.name_grams[entity_id] = _trigrams(friendly)
+            for gram in _substring_trigrams(friendly) | _substring_trigrams(entity_id.lower()):
+                self.grams.setdefault(gram, set()).add(entity_id)
+            domain = entity_id.split(".", 1)[0]
+            self.domains.setdefault(domain, []).append(entity_id)
+
+    def _first(self, ids: Iterable[str]) -> Optional[str]:
+        """Earliest entity in HA order (matches the old linear-scan result)."""
+        best = None
+        for eid in ids:
+            if best is None or self.order[eid] < self.order[best]:
+                best = eid
+        return best
+
+    def _gram_candidates(self, needle: str) -> Optional[Set[str]]:
+        grams = _substring_trigrams(needle)
+        if not grams:
+            return None  # too short to filter; caller scans
+        postings = sorted((self.grams.get(g, set()) for g in grams), key=len)
+        out = set(postings[0])
+        for p in postings[1:]:
+            out &= p
+            if not out:
+                break
+        return out
+
+    def _substring_match(self, name: str) -> Optional[str]:
+        underscored = name.replace(" ", "_")
+        cands_a = self._gram_candidates(name)
+        cands_b = self._gram_candidates(underscored)
+        if cands_a is None or cands_b is None:
+            pool: Iterable[str] = self.order.keys()
+        else:
+            pool = cands_a | cands_b
+        hits = [eid for eid in pool if name in self.names[eid] or underscored in eid]
+        return self._first(hits)
+
+    def _token_match(self, name: str) -> Optional[str]:
+        toks = _tokens(name)
+        if not toks:
+            return None
+        postings = [self.tokens.get(t) for t in toks]
+        if any(p is None for p in postings):
+            return None
+        common = set.intersection(*postings)
+        return self._first(common)
+
+    def _domain_match(self, name: str) -> Optional[str]:
+        m = _DOMAIN_PREFIX_RE.match(name)
+        if not m:
+            return None
+        domain, name_part = m.group(1), m.group(2).replace(" ", "_")
+        for eid in self.domains.get(domain, []):
+            if name_part in eid:
+                return eid
+        return None
+
+    def resolve(self, entity_name: str) -> Optional[str]:
+        """Exact friendly name, then substring (name or entity_id), then domain prefix."""
+        name = (entity_name or "").lower()
+        if not name:
+            return None
+        return self.exact.get(name) or self._substring_match(name) or self._domain_match(name)
+
+    def suggest(self, entity_name: str) -> Optional[str]:
+        """Likely entity for a name resolve() did not match (all tokens, then fuzzy); to ask about, not act on."""
+        name = (entity_name or "").lower()
+        if not name:
+            return None
+        hit = self._token_match(name)
+        if hit:
+            return hit
+        best = self.fuzzy(name, limit=1)
+        if best and best[0][1] >= FUZZY_MIN_SCORE:
+            return best[0][0]
+        return None
+
+    def fuzzy(self, entity_name: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Trigram Dice similarity against friendly names, best first."""
+        q = _trigrams(entity_name or "")
+        if not q:
+            return []
+        counts: Dict[str, int] = {}
+        for gram in q:
+            for eid in self.grams.get(gram, ()):
+                counts[eid] = counts.get(eid, 0) + 1
+        scored = []
+        for eid in counts:
+            grams = self.name_grams.get(eid)
+            if not grams:
+                continue
+            score = 2 * len(q & grams) / (len(q) + len(grams))
+            scored.append((eid, score))
+        scored.sort(key=lambda x: (-x[1], self.order[x[0]]))
+        return scored[:limit]
+
+
+class _Mappings:
+    """/explain mappings, reloaded only when the file changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._data: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[str]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._data = {}
+                if mtime is not None:
+                    try:
+                        with open(self.path) as f:
+                            raw = json.load(f)
+                        if isinstance(raw, dict):
+                            self._data = {str(k).lower(): str(v) for k, v in raw.items()}
+                    except (OSError, json.JSONDecodeError):
+                        pass
+            return self._data.get(name.lower()) or self._data.get(name.strip().lower())
+
+
+mappings = _Mappings(MAPPINGS_FILE)
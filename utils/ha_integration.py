@@ -11,13 +11,17 @@ from integrations import (
     HIMAS_ASSIST_AGENT_ID,
     HIMAS_PARSE_PROVIDER,
     HIMAS_PARSE_MODEL,
-    OLLAMA_URL,
     OPENROUTER_API_KEY,
 )
 import sys
 import os
 
+from utils import context_budget
 from utils import home_log
+from utils import llm_cache
+from utils import llm_scheduler
+from utils import ollama_router
+from utils.ha_entity_index import EntityIndex, mappings as ha_mappings
 
 # Add the project root to the path so we can import from utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -81,6 +85,8 @@ class HomeAssistantManager:
         }
         self.entities_cache = {}
         self.last_update = 0
+        self._entity_index: Optional[EntityIndex] = None
+        self._entity_index_source: Optional[Dict] = None
         self.session = None
         self._himas_llm_label = ""
     
@@ -254,6 +260,8 @@ class HomeAssistantManager:
                     allowlist = self._get_entity_allowlist()
                     if allowlist:
                         self.entities_cache = {eid: self.entities_cache[eid] for eid in allowlist if eid in self.entities_cache}
+                    self._entity_index = EntityIndex(self.entities_cache)
+                    self._entity_index_source = self.entities_cache
                     self.last_update = current_time
                     return self.entities_cache
                 else:
@@ -463,19 +471,23 @@ User command: "{user_command}"
             user_tail = f'Convert to HA command: {user_command}'
 
             response_text = ""
-            if backend == "openrouter":
+            cache_key = llm_cache.make_key("himas_parse", backend, model_name, system_prompt, user_tail)
+            hit = llm_cache.lookup("himas_parse", cache_key)
+            if hit is not None:
+                response_text = hit[1]
+            elif backend == "openrouter":
                 response_text = await self._openrouter_parse_json(system_prompt, user_tail, model_name)
             else:
-                base_url = (OLLAMA_URL or "http://localhost:11434").rstrip("/")
+                base_url = ollama_router.route(model_name)[0]
                 prompt = f"### System:\n{system_prompt}\n\n### User:\n{user_tail}\n\n### Assistant:\n"
                 session = await self.get_session()
-                async with session.post(
+                async with llm_scheduler.slot(llm_scheduler.HA), session.post(
                     f"{base_url}/api/generate",
                     json={
                         "model": model_name,
                         "prompt": prompt,
                         "stream": False,
-                        "options": {"temperature": 0.1, "num_predict": 300}
+                        "options": {"temperature": 0.1, "num_predict": 300, "num_ctx": context_budget.num_ctx_for(model_name)}
                     },
                     timeout=aiohttp.ClientTimeout(total=30)
                 ) as response:
@@ -487,9 +499,13 @@ User command: "{user_command}"
                 json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
                 if json_match:
                     try:
-                        return json.loads(json_match.group())
+                        parsed = json.loads(json_match.group())
                     except json.JSONDecodeError:
-                        pass
+                        parsed = None
+                    if isinstance(parsed, dict):
+                        if hit is None:
+                            llm_cache.store("himas_parse", cache_key, model_name, response_text)
+                        return parsed
         except Exception as e:
             home_log.log_sync(f"LLM parse error: {e}")
         return {"type": "error", "message": f"Could not parse: {user_command}"}
@@ -501,32 +517,16 @@ User command: "{user_command}"
             return basic_parse
         return await self._parse_with_llm(user_command, user_id)
     
+    def _index_for(self, entities_cache: Dict) -> EntityIndex:
+        """Index for this entity dict; rebuilt only when get_all_entities refreshed it."""
+        if self._entity_index is None or self._entity_index_source is not entities_cache:
+            self._entity_index = EntityIndex(entities_cache)
+            self._entity_index_source = entities_cache
+        return self._entity_index
+
     def find_entity_by_name(self, entity_name: str, entities_cache: Dict) -> Optional[str]:
         """Find entity ID by friendly name or partial match"""
-        entity_name_lower = entity_name.lower()
-        
-        # Exact match in cache
-        for entity_id, entity in entities_cache.items():
-            friendly_name = entity.get('attributes', {}).get('friendly_name', '').lower()
-            if entity_name_lower == friendly_name:
-                return entity_id
-        
-        # Partial match in friendly name
-        for entity_id, entity in entities_cache.items():
-            friendly_name = entity.get('attributes', {}).get('friendly_name', '').lower()
-            if entity_name_lower in friendly_name or entity_name_lower.replace(' ', '_') in entity_id:
-                return entity_id
-        
-        # Try to match by domain
-        domain_match = re.match(r'^(light|switch|sensor|binary_sensor|climate|fan|cover|media_player)\s+(.+)$', entity_name_lower)
-        if domain_match:
-            domain = domain_match.group(1)
-            name_part = domain_match.group(2).replace(' ', '_')
-            for entity_id in entities_cache.keys():
-                if entity_id.startswith(f"{domain}.") and name_part in entity_id:
-                    return entity_id
-        
-        return None
+        return self._index_for(entities_cache).resolve(entity_name)
     
     async def execute_command(self, command_data: Dict) -> Tuple[bool, str, Optional[Dict]]:
         """Execute parsed Home Assistant command"""
@@ -543,16 +543,17 @@ User command: "{user_command}"
         entity_id = self.find_entity_by_name(entity_name, entities)
         
         if not entity_id:
-            # Try custom mappings from data/ha_mappings.json (from /explain)
-            try:
-                mapping_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ha_mappings.json")
-                if os.path.exists(mapping_file):
-                    with open(mapping_file, 'r') as f:
-                        mappings = json.load(f)
-                    entity_id = mappings.get(entity_name.lower()) or mappings.get(entity_name.strip().lower())
-            except Exception:
-                pass
-            
+            # Custom mappings from data/ha_mappings.json (from /explain)
+            entity_id = ha_mappings.get(entity_name)
+
+        if not entity_id:
+            # Near misses are only suggested: acting on a guess could switch the wrong device.
+            index = self._index_for(entities)
+            suggestion = index.suggest(entity_name)
+            if suggestion:
+                friendly = index.names.get(suggestion) or suggestion
+                return False, f"Could not find entity: \"{entity_name}\". Did you mean \"{friendly}\" ({suggestion})? Use /explain \"{entity_name}\" {suggestion} to map it.", None
+
         if not entity_id:
             return False, f"Could not find entity: \"{entity_name}\". Use /explain to add a mapping, e.g. /explain \"{entity_name}\" light.your_entity_id", None
         
@@ -0,0 +1,160 @@
+"""Image preprocessing before vision requests (Pillow).
+
+Attachments are EXIF-oriented, downscaled so the long edge fits the model's useful input
+size, flattened to RGB and re-encoded (JPEG, or WebP for OpenRouter when IMAGE_FORMAT=webp)
+without metadata. Results are cached by content hash + target, so the same image sent to
+several fallback models is only re-encoded once per size. Without Pillow, or for images it
+cannot decode, the original bytes pass through unchanged.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from integrations import IMAGE_FORMAT, IMAGE_MAX_EDGE, IMAGE_QUALITY
+
+# Long-edge limits for vision models whose encoders tile/resize to a small input anyway;
+# matched as substrings of the lowercased model name, first hit wins.
+MODEL_MAX_EDGE = (
+    ("moondream", 768),
+    ("llava-phi", 672),
+    ("llava", 672),
+    ("bakllava", 672),
+    ("minicpm-v", 1344),
+    ("llama3.2-vision", 1120),
+    ("gemma3", 896),
+    ("qwen2.5vl", 1280),
+    ("qwen2-vl", 1280),
+)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+_OUTPUTS_MAX = 4096
+
+_cache: "OrderedDict[Tuple[str, int, str], Tuple[bytes, str]]" = OrderedDict()
+_cache_bytes = 0
+# sha256 of images this module produced -> (long edge, fmt); lets a per-model pass skip a second lossy encode.
+_outputs: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def sniff_mime(data: bytes, default: str = "image/png") -> str:
+    """MIME type from magic bytes (the filename extension on Discord attachments is not reliable)."""
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    return default
+
+
+def mime_from_b64(b64: str, default: str = "image/png") -> str:
+    try:
+        return sniff_mime(base64.b64decode(b64[:24]), default)
+    except (binascii.Error, ValueError):
+        return default
+
+
+def max_edge_for_model(model_name: Optional[str]) -> int:
+    name = (model_name or "").lower()
+    for needle, edge in MODEL_MAX_EDGE:
+        if needle in name:
+            return min(edge, IMAGE_MAX_EDGE)
+    return IMAGE_MAX_EDGE
+
+
+def _encode(data: bytes, max_edge: int, fmt: str) -> Optional[Tuple[bytes, str, int]]:
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.seek(0)  # first frame of animated GIF/WebP
+            img = ImageOps.exif_transpose(img)
+            if max(img.size) > max_edge:
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                rgba = img.convert("RGBA")
+                if fmt == "webp":
+                    img = rgba
+                else:
+                    flat = Image.new("RGB", rgba.size, (255, 255, 255))
+                    flat.paste(rgba, mask=rgba.split()[-1])
+                    img = flat
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            if fmt == "webp":
+                img.save(out, format="WEBP", quality=IMAGE_QUALITY, method=4)
+                return out.getvalue(), "image/webp", max(img.size)
+            img.save(out, format="JPEG", quality=IMAGE_QUALITY, optimize=True)
+            return out.getvalue(), "image/jpeg", max(img.size)
+    except Exception:
+        return None
+
+
+def prepare(data: bytes, *, max_edge: Optional[int] = None, fmt: Optional[str] = None) -> Tuple[bytes, str]:
+    """Return (bytes, mime) ready for a vision request. Falls back to the input unchanged."""
+    global _cache_bytes
+    edge = int(max_edge or IMAGE_MAX_EDGE)
+    fmt = (fmt or "jpeg").lower()
+    digest = hashlib.sha256(data).hexdigest()
+    key = (digest, edge, fmt)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+        produced = _outputs.get(digest)
+        if produced is not None and produced[0] <= edge and produced[1] == fmt:
+            return data, sniff_mime(data)
+    result = _encode(data, edge, fmt)
+    if result is None:
+        encoded = (data, sniff_mime(data))
+    else:
+        encoded = (result[0], result[1])
+    with _lock:
+        if result is not None:
+            _outputs[hashlib.sha256(result[0]).hexdigest()] = (result[2], fmt)
+            while len(_outputs) > _OUTPUTS_MAX:
+                _outputs.popitem(last=False)
+        if key not in _cache:
+            _cache[key] = encoded
+            _cache_bytes += len(encoded[0])
+            while _cache_bytes > CACHE_MAX_BYTES and _cache:
+                _, (dropped, _) = _cache.popitem(last=False)
+                _cache_bytes -= len(dropped)
+    return encoded
+
+
+def prepare_b64(b64: str, *, max_edge: Optional[int] = None, fmt: Optional[str] = None) -> str:
+    """Same as prepare() for an already base64-encoded image (as carried in message `images`)."""
+    try:
+        raw = base64.b64decode(b64)
+    except (binascii.Error, ValueError):
+        return b64
+    out, _ = prepare(raw, max_edge=max_edge, fmt=fmt)
+    if out is raw:
+        return b64
+    return base64.b64encode(out).decode("ascii")
+
+
+def for_model(b64: str, model_name: Optional[str], provider: str = "local") -> str:
+    """Fit a base64 image to `model_name` (smaller edge for low-res encoders; WebP only for OpenRouter)."""
+    fmt = "webp" if provider == "cloud" and IMAGE_FORMAT == "webp" else "jpeg"
+    return prepare_b64(b64, max_edge=max_edge_for_model(model_name), fmt=fmt)
+
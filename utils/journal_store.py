@@ -0,0 +1,250 @@
+"""Append-only journal + snapshot persistence for keyed state (e.g. per-channel conversation data).
+
+State is `{field: {key: value}}`. Callers hand over only the keys that changed; records are
+appended as JSON lines to `<snapshot>.journal` by a background writer (batched, fsync'd),
+and the journal is periodically compacted into an atomically replaced snapshot. Records carry
+full per-key values, so replaying a journal over a newer snapshot is idempotent and a torn
+last line (crash mid-write) is simply ignored.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils import home_log
+
+# Compact once the journal grows past either bound.
+COMPACT_BYTES = 4 * 1024 * 1024
+COMPACT_RECORDS = 5000
+
+_DELETE = object()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JournalStore:
+    """Snapshot file plus mutation journal; writes happen on a single daemon thread."""
+
+    DELETE = _DELETE
+
+    def __init__(self, snapshot_path: str, fields: Iterable[str]):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.fields = tuple(fields)
+        # Writer-owned mirror of what is on disk: field -> key -> serialized value.
+        self._mirror: Dict[str, Dict[str, str]] = {f: {} for f in self.fields}
+        self._queue: "queue.Queue[Optional[Tuple[str, List[Tuple[str, str, Any]]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._journal_bytes = 0
+        self._journal_records = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    # ----- startup -----
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Read snapshot, replay journal on top, and return `{field: {key: value}}`."""
+        state: Dict[str, Dict[str, Any]] = {f: {} for f in self.fields}
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                for field in self.fields:
+                    block = data.get(field)
+                    if isinstance(block, dict):
+                        state[field] = dict(block)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            pass
+        records = 0
+        good_offset = 0
+        torn = False
+        try:
+            with open(self.journal_path, "rb") as f:
+                for raw in f:
+                    try:
+                        if not raw.endswith(b"\n"):
+                            raise ValueError("unterminated record")
+                        rec = json.loads(raw.decode("utf-8"))
+                    except (ValueError, UnicodeDecodeError):
+                        torn = True  # torn tail from a crash mid-append
+                        break
+                    good_offset += len(raw)
+                    field, key = rec.get("f"), rec.get("k")
+                    if field not in state or key is None:
+                        continue
+                    if rec.get("d"):
+                        state[field].pop(str(key), None)
+                    else:
+                        state[field][str(key)] = rec.get("v")
+                    records += 1
+            if torn:
+                # Drop the partial record so later appends start on a clean line.
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good_offset)
+                    os.fsync(f.fileno())
+        except (FileNotFoundError, OSError):
+            pass
+        for field, block in state.items():
+            self._mirror[field] = {k: _dumps(v) for k, v in block.items()}
+        self._journal_records = records
+        try:
+            self._journal_bytes = os.path.getsize(self.journal_path)
+        except OSError:
+            self._journal_bytes = 0
+        return state
+
+    # ----- writes -----
+
+    def submit(self, changes: List[Tuple[str, str, Any]]) -> None:
+        """
+        Queue changed keys for the journal. Each change is (field, key, value); pass
+        `JournalStore.DELETE` as value to drop the key. Values are serialized here so later
+        in-memory mutation cannot race the writer.
+        """
+        if not changes:
+            return
+        encoded = [
+            (field, str(key), None if value is _DELETE else _dumps(value))
+            for field, key, value in changes
+            if field in self._mirror
+        ]
+        if encoded:
+            self._ensure_writer()
+            self._queue.put(("append", encoded))
+
+    def rewrite(self, state: Dict[str, Dict[str, Any]]) -> None:
+        """Replace everything with `state` (snapshot written, journal truncated)."""
+        encoded = {f: {str(k): _dumps(v) for k, v in (state.get(f) or {}).items()} for f in self.fields}
+        self._ensure_writer()
+        self._queue.put(("rewrite", encoded))
+
+    def flush(self, timeout: Optional[float] = 10.0) -> None:
+        """Block until queued writes are on disk."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(("barrier", done))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """Drain, compact, and stop the writer."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(("compact", None))
+        self._queue.put(None)
+        self._thread.join(timeout=15.0)
+        self._thread = None
+
+    # ----- writer thread -----
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._writer_loop, name="journal-writer", daemon=True)
+            self._thread.start()
+
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            pending: List[Tuple[str, str, Optional[str]]] = []
+            stop = False
+            for entry in batch:
+                if entry is None:
+                    stop = True
+                    continue
+                kind, payload = entry
+                if kind == "append":
+                    pending.extend(payload)
+                    continue
+                self._write_journal(pending)
+                pending = []
+                if kind == "rewrite":
+                    self._mirror = payload
+                    self._compact()
+                elif kind == "compact":
+                    if self._journal_records:
+                        self._compact()
+                elif kind == "barrier":
+                    payload.set()
+            self._write_journal(pending)
+            if self._journal_bytes >= COMPACT_BYTES or self._journal_records >= COMPACT_RECORDS:
+                self._compact()
+            if stop:
+                return
+
+    def _write_journal(self, records: List[Tuple[str, str, Optional[str]]]) -> None:
+        if not records:
+            return
+        lines = []
+        for field, key, value in records:
+            if value is None:
+                self._mirror[field].pop(key, None)
+                lines.append(f'{{"f":{_dumps(field)},"k":{_dumps(key)},"d":1}}\n')
+            else:
+                self._mirror[field][key] = value
+                lines.append(f'{{"f":{_dumps(field)},"k":{_dumps(key)},"v":{value}}}\n')
+        blob = "".join(lines).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            with open(self.journal_path, "ab") as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            home_log.log_sync(f"⚠️ Journal write failed ({self.journal_path}): {e}")
+            return
+        self._journal_bytes += len(blob)
+        self._journal_records += len(records)
+
+    def _compact(self) -> None:
+        """Write mirror to `<snapshot>.tmp`, fsync, atomically replace snapshot, truncate journal."""
+        parts = []
+        for field in self.fields:
+            body = ",".join(f"{_dumps(k)}:{v}" for k, v in self._mirror.get(field, {}).items())
+            parts.append(f"{_dumps(field)}:{{{body}}}")
+        blob = ("{" + ",".join(parts) + "}").encode("utf-8")
+        tmp = self.snapshot_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            _fsync_dir(self.snapshot_path)
+            # Crash between replace and truncate is harmless: replay is idempotent.
+            with open(self.journal_path, "wb") as f:
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            home_log.log_sync(f"⚠️ Snapshot compaction failed ({self.snapshot_path}): {e}")
+            return
+        self._journal_bytes = 0
+        self._journal_records = 0
@@ -0,0 +1,172 @@
+"""Content-addressed cache for deterministic utility LLM calls (translate, planner, file analysis, ...).
+
+Keys are sha256 over (function, provider, model, messages, options), so the same text/bytes
+and prompt hit regardless of caller. Entries expire per function (TTL_SECONDS), are evicted
+LRU by total text size (LLM_CACHE_MAX_MB), and persist to data/llm_cache.json (debounced
+write, flushed on shutdown). Hits/misses are counted in reliability_telemetry.
+Chat replies (ask_llm) are never cached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from integrations import LLM_CACHE_MAX_MB
+from utils import home_log
+from utils import reliability_telemetry
+
+CACHE_FILE = "data/llm_cache.json"
+SAVE_DELAY_SECONDS = 30.0
+
+TTL_SECONDS = {
+    "translate": 7 * 86400,
+    "command_planner": 3600,
+    "file_analysis": 86400,
+    "compare_files": 86400,
+    "news_summary": 2 * 86400,
+    "himas_parse": 86400,
+}
+DEFAULT_TTL_SECONDS = 3600
+
+_LOCK = threading.Lock()
+# key -> (function, model_used, text, expires_at); order = LRU (oldest first)
+_entries: "OrderedDict[str, Tuple[str, str, str, float]]" = OrderedDict()
+_bytes = 0
+_loaded = False
+_save_timer: Optional[threading.Timer] = None
+
+
+def enabled() -> bool:
+    return LLM_CACHE_MAX_MB > 0
+
+
+def _budget_bytes() -> int:
+    return LLM_CACHE_MAX_MB * 1024 * 1024
+
+
+def _size(text: str) -> int:
+    return len(text.encode("utf-8")) + 128  # rough per-entry overhead
+
+
+def make_key(function: str, *parts: Any) -> str:
+    """Stable hash of the call inputs (messages, model, options, ...)."""
+    blob = json.dumps([function, *parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _ensure_loaded() -> None:
+    global _loaded, _bytes
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        with open(CACHE_FILE) as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return
+    now = time.time()
+    for item in data.get("entries", []) if isinstance(data, dict) else []:
+        try:
+            key, fn, model, text, exp = item
+            if float(exp) <= now:
+                continue
+            _entries[str(key)] = (str(fn), str(model), str(text), float(exp))
+            _bytes += _size(str(text))
+        except (TypeError, ValueError):
+            continue
+    _evict()
+
+
+def _evict() -> None:
+    global _bytes
+    budget = _budget_bytes()
+    while _entries and _bytes > budget:
+        _, (_, _, text, _) = _entries.popitem(last=False)
+        _bytes -= _size(text)
+
+
+def lookup(function: str, key: str) -> Optional[Tuple[str, str]]:
+    """Return (model_used, text) on a fresh hit, else None."""
+    global _bytes
+    if not enabled():
+        return None
+    with _LOCK:
+        _ensure_loaded()
+        entry = _entries.get(key)
+        if entry is not None and entry[3] <= time.time():
+            _entries.pop(key, None)
+            _bytes -= _size(entry[2])
+            entry = None
+        if entry is None:
+            reliability_telemetry.increment("llm_cache_misses")
+            return None
+        _entries.move_to_end(key)
+    reliability_telemetry.increment("llm_cache_hits")
+    return entry[1], entry[2]
+
+
+def store(function: str, key: str, model_used: str, text: str) -> None:
+    global _bytes
+    if not enabled() or not text:
+        return
+    ttl = TTL_SECONDS.get(function, DEFAULT_TTL_SECONDS)
+    with _LOCK:
+        _ensure_loaded()
+        old = _entries.pop(key, None)
+        if old is not None:
+            _bytes -= _size(old[2])
+        _entries[key] = (function, model_used or "", text, time.time() + ttl)
+        _bytes += _size(text)
+        _evict()
+    _schedule_save()
+
+
+def stats() -> Tuple[int, int]:
+    """(entries, bytes) currently cached."""
+    with _LOCK:
+        return len(_entries), _bytes
+
+
+def _schedule_save() -> None:
+    global _save_timer
+    with _LOCK:
+        if _save_timer is not None:
+            return
+        _save_timer = threading.Timer(SAVE_DELAY_SECONDS, flush)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+
+def flush() -> None:
+    """Write the cache to disk now (atomic replace)."""
+    global _save_timer
+    with _LOCK:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        if not _loaded:
+            return
+        now = time.time()
+        rows = [[k, fn, model, text, exp] for k, (fn, model, text, exp) in _entries.items() if exp > now]
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp = CACHE_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"entries": rows}, f, ensure_ascii=False)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        home_log.log_sync(f"⚠️ LLM cache save failed: {e}")
+
+
+def clear() -> None:
+    global _bytes
+    with _LOCK:
+        _entries.clear()
+        _bytes = 0
+    flush()
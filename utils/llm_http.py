@@ -0,0 +1,232 @@
+"""Shared asyncio HTTP transport for LLM backends (Ollama hosts, OpenRouter).
+
+One pooled keep-alive aiohttp session per event loop, a concurrency cap per host, and
+abortable requests: when `abort_check` fires the in-flight request is cancelled instead
+of being waited out in a worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from integrations import LLM_HTTP_OLLAMA_CONCURRENCY, LLM_HTTP_OPENROUTER_CONCURRENCY
+
+OPENROUTER_HOST = "openrouter.ai"
+# How often a pending request re-checks abort_check (seconds).
+ABORT_POLL_SECONDS = 0.25
+KEEPALIVE_SECONDS = 60
+
+# Re-exported so callers do not need to import aiohttp to handle transport failures.
+# Timeouts must be caught before connection errors (aiohttp.ServerTimeoutError is both).
+TransportTimeout = asyncio.TimeoutError
+TransportConnectionError = aiohttp.ClientConnectionError
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Requests queued or running per host (read by the Ollama router for least-outstanding routing).
+_in_flight: Dict[str, int] = {}
+
+
+class HttpResponse:
+    """Fully-read response (body already buffered, connection back in the pool)."""
+
+    __slots__ = ("status_code", "text", "headers", "content")
+
+    def __init__(self, status_code: int, text: str, headers: Dict[str, str], content: bytes = b""):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.content = content
+
+    def json(self) -> Any:
+        """Parse body as JSON; raises ValueError like requests.Response.json()."""
+        return json.loads(self.text)
+
+
+def host_limit(host: str) -> int:
+    """Concurrency cap for a host: OpenRouter vs everything else (Ollama endpoints)."""
+    if (host or "").lower().endswith(OPENROUTER_HOST):
+        return LLM_HTTP_OPENROUTER_CONCURRENCY
+    return LLM_HTTP_OLLAMA_CONCURRENCY
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return (parts.netloc or parts.path).lower()
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the pooled session for the running loop (recreated if the loop changed)."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is not None and not _session.closed and _session_loop is loop:
+        return _session
+    connector = aiohttp.TCPConnector(
+        limit=64,
+        limit_per_host=max(LLM_HTTP_OLLAMA_CONCURRENCY, LLM_HTTP_OPENROUTER_CONCURRENCY),
+        keepalive_timeout=KEEPALIVE_SECONDS,
+        ttl_dns_cache=300,
+    )
+    _session = aiohttp.ClientSession(connector=connector)
+    _session_loop = loop
+    _host_semaphores.clear()
+    return _session
+
+
+def in_flight(url: str) -> int:
+    """Outstanding requests (waiting for a slot or running) to the host of `url`."""
+    return _in_flight.get(_host_key(url), 0)
+
+
+class _Outstanding:
+    __slots__ = ("host",)
+
+    def __init__(self, host: str):
+        self.host = host
+
+    def __enter__(self) -> None:
+        _in_flight[self.host] = _in_flight.get(self.host, 0) + 1
+
+    def __exit__(self, *exc: Any) -> None:
+        _in_flight[self.host] = max(0, _in_flight.get(self.host, 1) - 1)
+
+
+def _semaphore_for(host: str) -> asyncio.Semaphore:
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        sem = asyncio.Semaphore(host_limit(host))
+        _host_semaphores[host] = sem
+    return sem
+
+
+async def _run_abortable(
+    coro: Awaitable[HttpResponse],
+    abort_check: Optional[Callable[[], Awaitable[bool]]],
+) -> Optional[HttpResponse]:
+    """Await coro; poll abort_check meanwhile and cancel the request when it returns True."""
+    if abort_check is None:
+        return await coro
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=ABORT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await abort_check():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                return None
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+async def request(
+    method: str,
+    url: str,
+    *,
+    json_body: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 75,
+    abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> Optional[HttpResponse]:
+    """
+    Send one request through the shared pool. Returns None when aborted via abort_check.
+    Raises TransportTimeout / TransportConnectionError on transport failures.
+    """
+    if abort_check and await abort_check():
+        return None
+    host = _host_key(url)
+
+    async def _send() -> HttpResponse:
+        session = await get_session()
+        with _Outstanding(host):
+            async with _semaphore_for(host):
+                async with session.request(
+                    method,
+                    url,
+                    json=json_body,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                ) as resp:
+                    body = await resp.text(errors="replace")
+                    return HttpResponse(resp.status, body, dict(resp.headers))
+
+    return await _run_abortable(_send(), abort_check)
+
+
+async def post_stream(
+    url: str,
+    on_line: Callable[[str], Awaitable[None]],
+    *,
+    json_body: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 75,
+    abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> Optional[HttpResponse]:
+    """
+    POST and feed each non-empty response line to on_line as it arrives (NDJSON / SSE).
+    `timeout` bounds the gap between chunks, not the whole generation. Non-200 bodies are
+    buffered and returned like request(); on 200 the returned `text` is empty.
+    """
+    if abort_check and await abort_check():
+        return None
+    host = _host_key(url)
+
+    async def _send() -> HttpResponse:
+        session = await get_session()
+        with _Outstanding(host):
+            async with _semaphore_for(host):
+                async with session.post(
+                    url,
+                    json=json_body,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=min(timeout, 15), sock_read=timeout),
+                ) as resp:
+                    if resp.status != 200:
+                        body = await resp.text(errors="replace")
+                        return HttpResponse(resp.status, body, dict(resp.headers))
+                    async for raw in resp.content:
+                        line = raw.decode("utf-8", errors="replace").strip()
+                        if line:
+                            await on_line(line)
+                    return HttpResponse(resp.status, "", dict(resp.headers))
+
+    return await _run_abortable(_send(), abort_check)
+
+
+async def post(url: str, **kwargs: Any) -> Optional[HttpResponse]:
+    return await request("POST", url, **kwargs)
+
+
+async def get(url: str, **kwargs: Any) -> Optional[HttpResponse]:
+    return await request("GET", url, **kwargs)
+
+
+async def get_bytes(url: str, timeout: float = 60) -> HttpResponse:
+    """GET a binary resource (e.g. a generated image URL); body is in `.content`."""
+    host = _host_key(url)
+    session = await get_session()
+    async with _semaphore_for(host):
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            content = await resp.read()
+            return HttpResponse(resp.status, "", dict(resp.headers), content)
+
+
+async def close() -> None:
+    """Close the pooled session (bot shutdown)."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+    _host_semaphores.clear()
@@ -0,0 +1,151 @@
+"""Admission control for local (Ollama) LLM work.
+
+Every Ollama generation takes a slot here first. Slots go to waiting requests in priority
+order: interactive (DM / wake-word replies, slash commands) before HA control (/himas
+parsing) before background work (news summaries, DM topic merges, profile refreshes,
+auto-conversation), first come first served within a class. HA and background have their own
+concurrency caps below the global one, so background work can never take every slot. Background requests are
+shed (Busy) when too many are already queued or when they wait longer than
+BACKGROUND_MAX_WAIT_SECONDS. Wait times and shed counts are shown by /reliability.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+from integrations import (
+    LLM_SCHED_BACKGROUND_CONCURRENCY,
+    LLM_SCHED_BACKGROUND_QUEUE,
+    LLM_SCHED_HA_CONCURRENCY,
+    LLM_SCHED_MAX_CONCURRENCY,
+)
+from utils import reliability_telemetry
+
+INTERACTIVE = "interactive"
+HA = "ha"
+BACKGROUND = "background"
+CLASSES = (INTERACTIVE, HA, BACKGROUND)
+_RANK = {INTERACTIVE: 0, HA: 1, BACKGROUND: 2}
+
+BACKGROUND_MAX_WAIT_SECONDS = 300.0
+
+
+class Busy(RuntimeError):
+    """A background request was shed instead of queued."""
+
+
+_seq = itertools.count()
+_waiting: List[Tuple[int, int, str, asyncio.Future]] = []  # heap of (rank, seq, class, future)
+_running: Dict[str, int] = {c: 0 for c in CLASSES}
+_stats: Dict[str, Dict[str, float]] = {
+    c: {"admitted": 0, "shed": 0, "wait_total": 0.0, "wait_max": 0.0} for c in CLASSES
+}
+
+
+def _cap(cls: str) -> int:
+    if cls == HA:
+        return min(LLM_SCHED_MAX_CONCURRENCY, LLM_SCHED_HA_CONCURRENCY)
+    if cls == BACKGROUND:
+        return min(LLM_SCHED_MAX_CONCURRENCY, LLM_SCHED_BACKGROUND_CONCURRENCY)
+    return LLM_SCHED_MAX_CONCURRENCY
+
+
+def _queued(cls: str) -> int:
+    return sum(1 for _, _, c, fut in _waiting if c == cls and not fut.done())
+
+
+def _dispatch() -> None:
+    """Hand free slots to waiters, best priority first; a class at its cap does not block the others."""
+    capped = []
+    while _waiting and sum(_running.values()) < LLM_SCHED_MAX_CONCURRENCY:
+        item = heapq.heappop(_waiting)
+        _, _, cls, fut = item
+        if fut.done():
+            continue  # cancelled or timed out while waiting
+        if _running[cls] >= _cap(cls):
+            capped.append(item)
+            continue
+        _running[cls] += 1
+        fut.set_result(None)
+    for item in capped:
+        heapq.heappush(_waiting, item)
+
+
+def _release(cls: str) -> None:
+    _running[cls] = max(0, _running[cls] - 1)
+    _dispatch()
+
+
+def _shed(cls: str, reason: str) -> Busy:
+    _stats[cls]["shed"] += 1
+    reliability_telemetry.increment("llm_shed")
+    return Busy(reason)
+
+
+async def _acquire(cls: str) -> None:
+    fut = asyncio.get_running_loop().create_future()
+    heapq.heappush(_waiting, (_RANK[cls], next(_seq), cls, fut))
+    started = time.monotonic()
+    _dispatch()
+    if not fut.done() and cls == BACKGROUND and _queued(BACKGROUND) > LLM_SCHED_BACKGROUND_QUEUE:
+        fut.cancel()
+        raise _shed(cls, "LLM queue is full; background request skipped")
+    if not fut.done():
+        try:
+            if cls == BACKGROUND:
+                await asyncio.wait_for(asyncio.shield(fut), BACKGROUND_MAX_WAIT_SECONDS)
+            else:
+                await fut
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                _release(cls)  # the slot was granted just as we gave up
+            else:
+                fut.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise _shed(cls, "LLM busy; background request waited too long") from None
+            raise
+    waited = time.monotonic() - started
+    stats = _stats[cls]
+    stats["admitted"] += 1
+    stats["wait_total"] += waited
+    stats["wait_max"] = max(stats["wait_max"], waited)
+
+
+@asynccontextmanager
+async def slot(priority: str = INTERACTIVE) -> AsyncIterator[None]:
+    """Hold one LLM slot of class `priority` for the duration of the block; may raise Busy for background."""
+    cls = priority if priority in _RANK else INTERACTIVE
+    await _acquire(cls)
+    try:
+        yield
+    finally:
+        _release(cls)
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    out = {}
+    for cls in CLASSES:
+        stats = dict(_stats[cls])
+        stats["running"] = _running[cls]
+        stats["queued"] = _queued(cls)
+        out[cls] = stats
+    return out
+
+
+def format_snapshot() -> str:
+    lines = []
+    for cls, s in snapshot().items():
+        avg = s["wait_total"] / s["admitted"] if s["admitted"] else 0.0
+        line = (
+            f"{cls}: {s['running']} running · {s['queued']} queued · {int(s['admitted'])} served · "
+            f"wait avg {avg:.1f}s / max {s['wait_max']:.1f}s"
+        )
+        if s["shed"]:
+            line += f" · {int(s['shed'])} shed"
+        lines.append(line)
+    return "\n".join(lines)
@@ -3,12 +3,12 @@ import json
 import os
 import asyncio
 import base64
-import mimetypes
+import hashlib
 import time
-import requests
-from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import integrations
-from integrations import OLLAMA_URL, OPENROUTER_API_KEY, update_system_time_date, get_location_by_ip
+from integrations import OPENROUTER_API_KEY, update_system_time_date, get_location_by_ip
 from conversations import (
     conversation_manager,
     is_news_style_dm_bot_text,
@@ -28,6 +28,22 @@ from adaptive_dm import (
 from utils import home_log
 from utils import reliability_telemetry
 from utils import dm_background
+from utils import llm_http
+from utils import endpoint_health
+from utils import llm_cache
+from utils import document_extract
+from utils import chunked_analysis
+from utils import image_prep
+from utils import model_registry
+from utils import model_warmth
+from utils import ollama_router
+from utils import llm_scheduler
+from utils import prompt_assembly
+from utils import context_budget
+
+# Streaming callback: awaited with the accumulated reply text each time new tokens arrive.
+PartialCallback = Callable[[str], Awaitable[None]]
+
 
 def _get_fallback_chain():
     from utils.model_fallback import get_fallback_chain
@@ -407,9 +423,8 @@ class FileProcessor:
     
     @staticmethod
     def prepare_image_for_llm(image_data: bytes, filename: str) -> Dict:
-        """Prepare image data for LLM with vision capabilities"""
-        import base64
-        mime_type = mimetypes.guess_type(filename)[0] or 'image/png'
+        """Prepare image data for LLM with vision capabilities (oriented, downscaled, re-encoded; CPU-bound)"""
+        image_data, mime_type = image_prep.prepare(image_data)
         base64_image = base64.b64encode(image_data).decode('utf-8')
         
         return {
@@ -421,20 +436,18 @@ class FileProcessor:
     @staticmethod
     def analyze_file_content(filename: str, content: bytes, file_type: str) -> str:
         """Generate analysis prompt based on file type"""
+        # File content (or map-reduce notes for large files) is appended by analyze_file.
         if file_type == "text":
-            text_content = FileProcessor.read_text_file(content)
-            return f"Analyze the following text file '{filename}':\n\n{text_content}\n\nPlease provide: 1) Summary, 2) Key points, 3) Any issues or suggestions"
+            return f"Analyze the following text file '{filename}'. Please provide: 1) Summary, 2) Key points, 3) Any issues or suggestions"
         
         elif file_type == "code":
-            code_content = FileProcessor.read_text_file(content)
-            return f"Review this code file '{filename}':\n\n```\n{code_content}\n```\n\nPlease provide: 1) What the code does, 2) Potential bugs or issues, 3) Suggestions for improvement, 4) Security concerns if any"
+            return f"Review this code file '{filename}'. Please provide: 1) What the code does, 2) Potential bugs or issues, 3) Suggestions for improvement, 4) Security concerns if any"
         
         elif file_type == "image":
             return f"Analyze this image file: '{filename}'. Describe what you see in detail, including any text, objects, colors, and context. If there's text in the image, transcribe it."
         
         elif file_type == "document":
-            text_content = FileProcessor.read_text_file(content)
-            return f"Analyze this document '{filename}':\n\n{text_content[:5000]}...\n\nPlease provide: 1) Document type, 2) Main topics, 3) Key information, 4) Summary"
+            return f"Analyze this document '{filename}'. Please provide: 1) Document type, 2) Main topics, 3) Key information, 4) Summary"
         
         else:
             return f"Analyze this file '{filename}'. Provide information about what type of file it appears to be and any observations."
@@ -594,6 +607,7 @@ async def _dm_llm_merge_topic_summaries(
     user_id: int,
     channel_id: int,
     joined_old_transcript: str,
+    priority: str = llm_scheduler.BACKGROUND,
 ) -> None:
     """Background: merge rolled-off DM lines into per-topic summaries (JSON)."""
     if not joined_old_transcript.strip():
@@ -619,6 +633,7 @@ async def _dm_llm_merge_topic_summaries(
             images=False,
             provider=provider,
             request_options={"num_predict": 420, "temperature": 0.2},
+            priority=priority,
         )
     except Exception:
         return
@@ -683,6 +698,7 @@ async def _dm_llm_refresh_brief_profile(user_id: int, channel_id: int) -> None:
             images=False,
             provider=provider,
             request_options={"num_predict": 200, "temperature": 0.15},
+            priority=llm_scheduler.BACKGROUND,
         )
     except Exception:
         return
@@ -746,7 +762,7 @@ async def compact_dm_history_for_channel(
     conversation_manager.save()
 
     if force:
-        await _dm_llm_merge_topic_summaries(user_id, channel_id, joined)
+        await _dm_llm_merge_topic_summaries(user_id, channel_id, joined, priority=llm_scheduler.INTERACTIVE)
         return {
             "compacted": True,
             "cutoff": cutoff,
@@ -810,6 +826,7 @@ async def plan_command_from_text(user_id: int, message_text: str, command_schema
         images=False,
         provider=provider,
         request_options={"num_predict": 320, "temperature": 0.1},
+        cache_fn="command_planner",
     )
     parsed = _extract_json_object(raw or "")
     if not parsed:
@@ -933,7 +950,8 @@ async def adaptive_dm_image_flow_refine_text_for_image(
     requested_model = model_info.get("model", "llama3.2:1b")
     provider = model_info.get("provider", "local")
     try:
-        b64 = base64.b64encode(image_bytes).decode("ascii")
+        prepared, _ = await asyncio.to_thread(image_prep.prepare, image_bytes)
+        b64 = base64.b64encode(prepared).decode("ascii")
     except Exception:
         return draft_reply or ""
     sys = (
@@ -995,8 +1013,15 @@ async def ask_llm(
     persist: bool = True,
     abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
     reuse_response: Optional[str] = None,
+    on_partial: Optional[PartialCallback] = None,
+    priority: str = llm_scheduler.INTERACTIVE,
 ):
-    """Main LLM interface for all platforms with file support"""
+    """Main LLM interface for all platforms with file support.
+
+    on_partial streams the reply: it is awaited with the accumulated raw text as tokens arrive.
+    See ask_llm_stream for the async-iterator form. priority is the llm_scheduler class
+    (unprompted auto-conversation replies run as background work).
+    """
     if abort_check and await abort_check():
         return ""
     # Get system info
@@ -1020,6 +1045,14 @@ async def ask_llm(
         eff = model_manager.get_effective_model_for_function(user_id, "chat")
         requested_model = eff.get("model", "llama3.2:1b")
         provider = eff.get("provider", "local")
+
+    request_options = None
+    if fast_reply:
+        request_options = {"num_predict": 220, "temperature": 0.55}
+    # Token shares for this model's context window (see context_budget).
+    budget = context_budget.Budget.for_model(
+        requested_model, provider, reserve_output=(request_options or {}).get("num_predict", 1024)
+    )
     
     # Check if user is asking for commands or help
     user_message_lower = message_text.lower()
@@ -1057,14 +1090,16 @@ async def ask_llm(
             # Prepare images for vision models
             if file_type == "image":
                 try:
-                    img_data = FileProcessor.prepare_image_for_llm(attachment['data'], fn)
+                    img_data = await asyncio.to_thread(FileProcessor.prepare_image_for_llm, attachment['data'], fn)
                     images_data.append(img_data)
                 except Exception as e:
                     attachment_context += f"   ⚠️ Failed to process image: {str(e)}\n"
     
     # Prefix every user message with who said it (no wake word in content)
     if platform == "discord" and chat_context:
-        formatted_message = _format_discord_message(username, message_text, chat_context)
+        formatted_message = _format_discord_message(
+            username, message_text, chat_context, max_tokens=budget.share("channel")
+        )
     else:
         formatted_message = f"{username} says: {message_text}"
     persisted_user_message = f"{username} says: {message_text}"
@@ -1102,80 +1137,107 @@ async def ask_llm(
         formatted_message += attachment_context
     
     chat_prompt_key = "chat_adaptive_dm" if adaptive_dm else "chat"
-    enhanced = get_enhanced_prompt(
-        chat_prompt_key,
-        date=date,
-        time=time,
-        location=location,
-        city=city,
-        country=country,
-        platform=platform.capitalize(),
-        command_count=len(command_db.commands),
-        command_list=command_db.get_all_commands_formatted(),
-        command_suggestions=command_suggestions or "",
+    if adaptive_dm and not (_get_system_prompts().get(chat_prompt_key) or "").strip():
+        chat_prompt_key = "chat"
+    template = _get_system_prompts().get(chat_prompt_key, "")
+    runtime_fields = {
+        "date": date,
+        "time": time,
+        "location": location,
+        "city": city,
+        "country": country,
+        "command_suggestions": command_suggestions or "",
+    }
+    has_image_model = bool(
+        is_dm
+        and str(model_manager.get_effective_model_for_function(user_id, "image_generation").get("model") or "").strip()
     )
-    if adaptive_dm and not (enhanced or "").strip():
-        enhanced = get_enhanced_prompt(
-            "chat",
-            date=date,
-            time=time,
-            location=location,
-            city=city,
-            country=country,
+    dm_profile_prompt = adaptive_dm_manager.get_profile_prompt(user_id) if adaptive_dm else ""
+    command_list = command_db.get_all_commands_formatted()
+
+    def _build_system_prefix() -> str:
+        enhanced = prompt_assembly.render(
+            template,
             platform=platform.capitalize(),
             command_count=len(command_db.commands),
-            command_list=command_db.get_all_commands_formatted(),
-            command_suggestions=command_suggestions or "",
+            command_list=command_list,
+            **runtime_fields,
+        )
+        prefix = f"{system_prompt}\n\n{enhanced}"
+        if adaptive_dm:
+            prefix += ADAPTIVE_DM_SYSTEM_SUFFIX
+            if has_image_model:
+                prefix += "\n\n" + (
+                    image_gen_capability_note
+                    or (
+                        "You can generate images for this user when they clearly ask for a visual (they have an image model configured). "
+                        "Do not claim you are text-only or cannot draw/render if they ask for a picture—offer `/imagine` or acknowledge images can be produced in this DM.\n"
+                        "If the transcript notes you sent an image earlier, treat that as context only; reference it when relevant. "
+                        "Never write bracketed placeholders or pretend to attach images in text—the user only sees real attachments."
+                    )
+                )
+            # User-specific and retuned over time: last, so a profile update keeps the prefix above cached.
+            if dm_profile_prompt:
+                prefix += f"\n\n{dm_profile_prompt}"
+        elif is_dm:
+            prefix += (
+                "\n\nThis is a direct DM chat. Use a relaxed, natural tone. "
+                "Keep it human and concise, and avoid overly formal phrasing."
+            )
+            if has_image_model:
+                prefix += "\n\n" + (
+                    image_gen_capability_note
+                    or (
+                        "This user has an **image generation** model configured. "
+                        "Do not claim you are text-only or cannot produce images if they ask for a picture—point them to **`/imagine`**.\n"
+                        "If the transcript notes you sent an image earlier, refer to it only when relevant. "
+                        "Never output bracketed placeholders for images."
+                    )
+                )
+        return prefix
+
+    # Per-turn data goes after the history so the system prefix and earlier turns stay byte-identical.
+    runtime_parts: List[str] = []
+    if prompt_assembly.is_stable_template(template):
+        enhanced_system_prompt = prompt_assembly.stable_prefix(
+            (
+                system_prompt,
+                chat_prompt_key,
+                template,
+                platform,
+                is_dm,
+                adaptive_dm,
+                has_image_model,
+                image_gen_capability_note,
+                # The text itself, not the count: an edited description must rebuild the prefix.
+                hashlib.sha256(command_list.encode("utf-8")).hexdigest(),
+                dm_profile_prompt,
+            ),
+            _build_system_prefix,
+        )
+        runtime_template = get_enhanced_prompt("chat_runtime_context") or (
+            "Current context: Date: {date} Time: {time} Location: {location}"
         )
-    enhanced_system_prompt = f"{system_prompt}\n\n{enhanced}"
+        runtime_parts.append(prompt_assembly.render(runtime_template, **runtime_fields))
+        runtime_parts.append(command_suggestions)
+    else:
+        # Customized template with {date}/{time}/... inline: rendered per turn, not memoized.
+        enhanced_system_prompt = _build_system_prefix()
     if adaptive_dm:
-        dm_profile_prompt = adaptive_dm_manager.get_profile_prompt(user_id)
-        if dm_profile_prompt:
-            enhanced_system_prompt = f"{enhanced_system_prompt}\n\n{dm_profile_prompt}"
         llm_prof = conversation_manager.get_dm_profile_llm(channel_id)
         if llm_prof:
-            enhanced_system_prompt += (
-                "\n\nBrief user profile (for tone/personalization only; do not mention unless clearly relevant):\n"
+            runtime_parts.append(
+                "Brief user profile (for tone/personalization only; do not mention unless clearly relevant):\n"
                 f"{llm_prof}"
             )
-        enhanced_system_prompt += ADAPTIVE_DM_SYSTEM_SUFFIX
-        eff_img = model_manager.get_effective_model_for_function(user_id, "image_generation")
-        if str(eff_img.get("model") or "").strip():
-            note = (
-                image_gen_capability_note
-                or (
-                    "You can generate images for this user when they clearly ask for a visual (they have an image model configured). "
-                    "Do not claim you are text-only or cannot draw/render if they ask for a picture—offer `/imagine` or acknowledge images can be produced in this DM.\n"
-                    "If the transcript notes you sent an image earlier, treat that as context only; reference it when relevant. "
-                    "Never write bracketed placeholders or pretend to attach images in text—the user only sees real attachments."
-                )
-            )
-            enhanced_system_prompt += "\n\n" + note
-    elif is_dm:
-        enhanced_system_prompt += (
-            "\n\nThis is a direct DM chat. Use a relaxed, natural tone. "
-            "Keep it human and concise, and avoid overly formal phrasing."
-        )
-        eff_img = model_manager.get_effective_model_for_function(user_id, "image_generation")
-        if str(eff_img.get("model") or "").strip():
-            note = (
-                image_gen_capability_note
-                or (
-                    "This user has an **image generation** model configured. "
-                    "Do not claim you are text-only or cannot produce images if they ask for a picture—point them to **`/imagine`**.\n"
-                    "If the transcript notes you sent an image earlier, refer to it only when relevant. "
-                    "Never output bracketed placeholders for images."
-                )
-            )
-            enhanced_system_prompt += "\n\n" + note
     if fast_reply:
-        enhanced_system_prompt += (
-            "\n\nFast reply mode is enabled. Be concise and quick: "
+        runtime_parts.append(
+            "Fast reply mode is enabled. Be concise and quick: "
             "usually 1-3 short sentences unless the user asks for details."
         )
     
     # Prepare conversation history (channel-based). Persisted turns are user/assistant only;
-    # the full system prompt (including current date/time/location) must be injected every request.
+    # the system prefix and the runtime note (current date/time/location) are injected every request.
     if is_continuation:
         if is_dm:
             try:
@@ -1197,41 +1259,40 @@ async def ask_llm(
         for m in (history or [])
         if isinstance(m, dict) and m.get("role") in ("user", "assistant")
     ]
-    if is_dm and len(rolling) > 13:
-        # Match prior budget: at most 13 user/assistant turns before the new user message.
-        rolling = rolling[-13:]
-    messages: List[Dict[str, Any]] = [{"role": "system", "content": enhanced_system_prompt}]
-    messages.extend(rolling)
 
+    dm_notes = None
     if is_dm:
         dm_summary = conversation_manager.get_dm_summary_text(channel_id)
+        # Topic lines come newest first; drop the oldest ones beyond the summary share.
+        dm_summary = "\n".join(context_budget.fit_lines((dm_summary or "").splitlines(), budget.share("summary")))
         if dm_summary:
-            messages.insert(
-                1,
-                {
-                    "role": "system",
-                    "content": (
-                        "Older DM context (topic notes; may be stale—use only when clearly relevant; "
-                        "do not bring up unrelated past topics):\n"
-                        f"{dm_summary}"
-                    ),
-                },
+            dm_notes = (
+                "Older DM context (topic notes; may be stale—use only when clearly relevant; "
+                "do not bring up unrelated past topics):\n"
+                f"{dm_summary}"
             )
     
     # If we have images, always attach them so fallback can use a vision model
+    user_message: Dict[str, Any] = {
+        "role": "user",
+        "content": context_budget.trim_text(formatted_message, budget.share("channel") + budget.share("message")),
+    }
     if images_data:
-        user_message = {
-            "role": "user",
-            "content": formatted_message,
-            "images": [img["data"] for img in images_data]
-        }
-        messages.append(user_message)
-    else:
-        messages.append({"role": "user", "content": formatted_message})
-    
-    request_options = None
-    if fast_reply:
-        request_options = {"num_predict": 220, "temperature": 0.55}
+        user_message["images"] = [img["data"] for img in images_data]
+    # History gets whatever the window has left after everything else, newest turns first.
+    used = sum(
+        context_budget.message_tokens(m)
+        for m in (
+            {"content": enhanced_system_prompt},
+            {"content": dm_notes},
+            {"content": "\n\n".join(p for p in runtime_parts if p)},
+            user_message,
+        )
+    )
+    rolling = context_budget.fit_history(rolling, budget.remaining(used))
+    messages = prompt_assembly.assemble(
+        enhanced_system_prompt, rolling, user_message, notes=dm_notes, runtime_parts=runtime_parts
+    )
 
     # Try models with fallback
     final_model, response_text = await _try_models_with_fallback(
@@ -1241,6 +1302,9 @@ async def ask_llm(
         provider=provider,
         request_options=request_options,
         abort_check=abort_check,
+        on_partial=on_partial,
+        route_key=f"dm:{channel_id}" if is_dm else None,
+        priority=priority,
     )
     if abort_check and await abort_check():
         return ""
@@ -1270,6 +1334,39 @@ async def ask_llm(
 
     return response_text
 
+async def ask_llm_stream(*args: Any, **kwargs: Any) -> AsyncIterator[Tuple[str, bool]]:
+    """
+    Streaming form of ask_llm (same arguments). Yields (text_so_far, done): cleaned partial
+    text while tokens arrive (only the newest snapshot when the consumer lags behind), then
+    the final cleaned reply with done=True. Closing the iterator early cancels generation.
+    """
+    queue: "asyncio.Queue[Tuple[str, Optional[str]]]" = asyncio.Queue()
+
+    async def _on_partial(text: str) -> None:
+        queue.put_nowait(("partial", text))
+
+    task = asyncio.create_task(ask_llm(*args, on_partial=_on_partial, **kwargs))
+    task.add_done_callback(lambda _t: queue.put_nowait(("done", None)))
+    try:
+        while True:
+            kind, text = await queue.get()
+            while kind == "partial" and not queue.empty():
+                kind_next, text_next = queue.get_nowait()
+                if kind_next == "done":
+                    queue.put_nowait((kind_next, text_next))
+                    break
+                text = text_next
+            if kind == "done":
+                break
+            partial = _clean_response(text or "")
+            if partial:
+                yield partial, False
+        yield (task.result() or ""), True
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 def _json_object_end_index(s: str, start: int) -> int:
     """Index after the closing `}` of a JSON object starting at s[start] == '{', or -1 if incomplete."""
     depth = 0
@@ -1415,32 +1512,41 @@ async def ask_llm_shitpost(user_id: int, word: str) -> str:
         return ""
 
 
-def _format_discord_message(username, message, context):
-    """Format Discord message with chat context; prefix with who is speaking."""
+def _format_discord_message(username, message, context, max_tokens: Optional[int] = None):
+    """Format Discord message with chat context; prefix with who is speaking.
+
+    max_tokens bounds the channel context block (newest messages kept); None keeps the last 10.
+    """
     if not context or len(context) == 0:
         return f"{username} says: {message}"
-    context_str = "\nRecent messages in this channel:\n"
-    for msg in context[-10:]:
-        context_str += f"{msg['author']}: {msg['content']}\n"
+    lines = [f"{msg['author']}: {msg['content']}" for msg in context]
+    if max_tokens is None:
+        lines = lines[-10:]
+    else:
+        lines = context_budget.fit_lines(lines[::-1], max_tokens)[::-1]
+    if not lines:
+        return f"{username} says: {message}"
+    context_str = "\nRecent messages in this channel:\n" + "".join(f"{line}\n" for line in lines)
     return f"{context_str}\n{username} says: {message}"
 
-_vision_model_cache = None
-
-
 def clear_vision_model_cache() -> None:
-    """Call when model list changes (e.g. after /pull-model or remove) so vision is re-resolved."""
-    global _vision_model_cache
-    _vision_model_cache = None
+    """Call when model list changes (e.g. after /pull-model or remove) so capabilities are re-read."""
+    endpoint_health.clear_missing_models()
+    model_registry.schedule_refresh()
 
 
-# Name patterns that typically indicate vision-capable models (Ollama)
+# Name patterns that typically indicate vision-capable models (Ollama); used only for models
+# the capability registry has not inspected yet.
 VISION_NAME_PATTERNS = ("llava", "llama3.2", "llama3.1", "pixtral", "minicpm-v", "vision", "moondream", "bakllava", "llava-phi", "nano-llava")
 
 
-def _is_vision_capable(model_name: str) -> bool:
-    """Heuristic: model name suggests vision support."""
+def _is_vision_capable(model_name: str, provider: str = "local") -> bool:
+    """Model metadata from the capability registry; name heuristic when the model is unknown."""
     if not model_name:
         return False
+    known = model_registry.is_vision(model_name, provider)
+    if known is not None:
+        return known
     lower = model_name.lower()
     return any(p in lower for p in VISION_NAME_PATTERNS)
 
@@ -1457,25 +1563,19 @@ def _format_vision_help_message() -> str:
     return "\n".join(lines)
 
 
-async def _test_model_vision(model_name: str, messages: list) -> bool:
-    try:
-        r = await _make_ollama_request(model_name, messages)
-        return bool(r and not r.startswith("Error:"))
-    except Exception:
-        return False
+async def _vision_candidates(requested_model: str) -> List[str]:
+    """
+    Local models to try for an image request, without probing: the requested model and fallback
+    chain first, then other installed models, keeping only those the registry (or, for models it
+    has not inspected, the name heuristic) marks vision-capable.
+    """
+    await model_registry.ensure_local()
+    installed = model_registry.local_models() or model_manager.list_all_models()
+    ordered = list(dict.fromkeys([requested_model] + _get_fallback_chain() + installed))
+    return [m for m in ordered if _is_vision_capable(m)]
 
-async def _resolve_vision_model(requested_model: str, messages: list) -> Optional[str]:
-    global _vision_model_cache
-    if _vision_model_cache is not None:
-        return _vision_model_cache
-    chain = [requested_model] + [m for m in _get_fallback_chain() if m != requested_model]
-    for model in chain:
-        if await _test_model_vision(model, messages):
-            _vision_model_cache = model
-            return model
-    return None
-
-def _to_openrouter_messages(messages: list) -> list:
+def _to_openrouter_messages(messages: list, model_name: Optional[str] = None) -> list:
+    """OpenAI-style content parts; images are fitted to the model and labelled with their real MIME type."""
     converted = []
     for msg in messages:
         role = msg.get("role", "user")
@@ -1486,10 +1586,12 @@ def _to_openrouter_messages(messages: list) -> list:
             if content:
                 parts.append({"type": "text", "text": str(content)})
             for base64_img in images:
+                base64_img = image_prep.for_model(base64_img, model_name, provider="cloud")
+                mime = image_prep.mime_from_b64(base64_img)
                 parts.append(
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{base64_img}"},
+                        "image_url": {"url": f"data:{mime};base64,{base64_img}"},
                     }
                 )
             converted.append({"role": role, "content": parts})
@@ -1503,13 +1605,14 @@ async def _make_openrouter_request(
     messages: list,
     max_tokens: Optional[int] = None,
     abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
+    on_partial: Optional[PartialCallback] = None,
 ) -> Optional[str]:
     if not OPENROUTER_API_KEY:
         return "Error: OPENROUTER_API_KEY is not configured."
     url = "https://openrouter.ai/api/v1/chat/completions"
     payload = {
         "model": model_name,
-        "messages": _to_openrouter_messages(messages),
+        "messages": await asyncio.to_thread(_to_openrouter_messages, messages, model_name),
         "temperature": 0.7,
     }
     if max_tokens is not None:
@@ -1540,15 +1643,48 @@ async def _make_openrouter_request(
             return f"OpenRouter request failed ({status_code}): {detail[:220]}"
         return f"OpenRouter request failed ({status_code})."
 
+    stream_parts: List[str] = []
+
+    async def _on_sse_line(line: str) -> None:
+        # SSE: "data: {json}" events, ": keep-alive" comments, "data: [DONE]" terminator.
+        if not line.startswith("data:"):
+            return
+        chunk_raw = line[5:].strip()
+        if not chunk_raw or chunk_raw == "[DONE]":
+            return
+        try:
+            chunk = json.loads(chunk_raw)
+        except ValueError:
+            return
+        choices = chunk.get("choices") if isinstance(chunk, dict) else None
+        if not choices or not isinstance(choices[0], dict):
+            return
+        piece = (choices[0].get("delta") or {}).get("content") or ""
+        if piece:
+            stream_parts.append(piece)
+            await on_partial("".join(stream_parts))
+
+    async def _send():
+        if on_partial is not None:
+            return await llm_http.post_stream(
+                url,
+                _on_sse_line,
+                json_body={**payload, "stream": True},
+                headers=headers,
+                timeout=90,
+                abort_check=abort_check,
+            )
+        return await llm_http.post(url, json_body=payload, headers=headers, timeout=90, abort_check=abort_check)
+
     try:
         if abort_check and await abort_check():
             return None
-        response = await asyncio.to_thread(requests.post, url, json=payload, headers=headers, timeout=90)
-        if abort_check and await abort_check():
+        response = await _send()
+        if response is None:
             return None
         body = {}
         try:
-            body = response.json()
+            body = response.json() if response.text else {}
         except ValueError:
             body = {}
 
@@ -1556,11 +1692,11 @@ async def _make_openrouter_request(
             await asyncio.sleep(2)
             if abort_check and await abort_check():
                 return None
-            response = await asyncio.to_thread(requests.post, url, json=payload, headers=headers, timeout=90)
-            if abort_check and await abort_check():
+            response = await _send()
+            if response is None:
                 return None
             try:
-                body = response.json()
+                body = response.json() if response.text else {}
             except ValueError:
                 body = {}
 
@@ -1572,6 +1708,9 @@ async def _make_openrouter_request(
         if response.status_code != 200:
             return f"Error: {_extract_openrouter_error(response.status_code, body, response.text or '')}"
 
+        if on_partial is not None:
+            return "".join(stream_parts).strip() or "No response."
+
         choices = body.get("choices") or []
         if not choices:
             return "Error: No choices returned by OpenRouter."
@@ -1583,12 +1722,17 @@ async def _make_openrouter_request(
         if abort_check and await abort_check():
             return None
         return str(content).strip() or "No response."
-    except requests.exceptions.Timeout:
+    except llm_http.TransportTimeout:
         return "Error: Request timed out"
     except Exception as e:
         return f"Error: {str(e)}"
 
 
+def _is_cacheable_response(response: Optional[str]) -> bool:
+    text = (response or "").strip()
+    return bool(text) and not text.startswith(("⚠️", "Error", "❌"))
+
+
 async def _try_models_with_fallback(
     requested_model,
     messages,
@@ -1596,9 +1740,67 @@ async def _try_models_with_fallback(
     provider="local",
     request_options: Optional[Dict[str, Any]] = None,
     abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
+    on_partial: Optional[PartialCallback] = None,
+    cache_fn: Optional[str] = None,
+    route_key: Optional[str] = None,
+    priority: str = llm_scheduler.INTERACTIVE,
+):
+    """
+    Returns (model_used, response). cache_fn (e.g. "translate") opts a deterministic utility call
+    into llm_cache, keyed by provider, model, messages and options; streamed calls are never cached.
+    route_key (e.g. a DM channel) keeps local requests on the same Ollama host (see ollama_router).
+    Local calls wait for an llm_scheduler slot of class `priority`; shed background calls return "".
+    """
+    cache_key = None
+    if cache_fn and on_partial is None and llm_cache.enabled():
+        cache_key = llm_cache.make_key(
+            cache_fn,
+            (provider or "local").strip().lower(),
+            requested_model,
+            bool(images),
+            messages,
+            request_options or {},
+        )
+        hit = llm_cache.lookup(cache_fn, cache_key)
+        if hit is not None:
+            return hit
+    is_cloud = (provider or "local").strip().lower() == "cloud"
+    try:
+        async with nullcontext() if is_cloud else llm_scheduler.slot(priority):
+            model_used, response = await _try_models_uncached(
+                requested_model,
+                messages,
+                images=images,
+                provider=provider,
+                request_options=request_options,
+                abort_check=abort_check,
+                on_partial=on_partial,
+                route_key=route_key,
+            )
+    except llm_scheduler.Busy as e:
+        home_log.log_sync(f"⏭️ {e}")
+        return requested_model, ""
+    if cache_key and _is_cacheable_response(response):
+        llm_cache.store(cache_fn, cache_key, model_used, response)
+    return model_used, response
+
+
+async def _try_models_uncached(
+    requested_model,
+    messages,
+    images=False,
+    provider="local",
+    request_options: Optional[Dict[str, Any]] = None,
+    abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
+    on_partial: Optional[PartialCallback] = None,
+    route_key: Optional[str] = None,
 ):
     provider = (provider or "local").strip().lower()
     if provider == "cloud":
+        if images and model_registry.is_vision(requested_model, "cloud") is False:
+            return requested_model, (
+                f"⚠️ Cloud model `{requested_model}` does not accept images. Pick a vision model in **/llm-settings**."
+            )
         max_tokens = None
         if isinstance(request_options, dict) and request_options.get("num_predict") is not None:
             try:
@@ -1608,7 +1810,7 @@ async def _try_models_with_fallback(
         if abort_check and await abort_check():
             return requested_model, ""
         response = await _make_openrouter_request(
-            requested_model, messages, max_tokens=max_tokens, abort_check=abort_check
+            requested_model, messages, max_tokens=max_tokens, abort_check=abort_check, on_partial=on_partial
         )
         if response is None:
             return requested_model, ""
@@ -1617,11 +1819,12 @@ async def _try_models_with_fallback(
         return requested_model, f"⚠️ Cloud model unavailable: {response}"
 
     if images:
-        vision_model = await _resolve_vision_model(requested_model, messages)
-        if vision_model:
-            models_to_try = [vision_model]
+        vision_models = await _vision_candidates(requested_model)
+        if vision_models:
+            models_to_try = vision_models
         else:
-            available = model_manager.list_all_models(refresh_local=True)
+            await model_manager.refresh_local_models_async()
+            available = model_manager.list_all_models()
             if available:
                 models_to_try = [requested_model] + [m for m in available if m != requested_model]
             else:
@@ -1630,11 +1833,19 @@ async def _try_models_with_fallback(
         models_to_try = [requested_model] + _get_fallback_chain()
 
     models_to_try = list(dict.fromkeys(models_to_try))
+    # Skip models that recently returned 404 everywhere (keep at least one candidate).
+    available_models = [m for m in models_to_try if not endpoint_health.is_model_missing(m)]
+    models_to_try = available_models or models_to_try[:1]
     for model_name in models_to_try:
         if abort_check and await abort_check():
             return requested_model, ""
         response = await _make_ollama_request(
-            model_name, messages, request_options=request_options, abort_check=abort_check
+            model_name,
+            messages,
+            request_options=request_options,
+            abort_check=abort_check,
+            on_partial=on_partial,
+            route_key=route_key,
         )
         if response is None:
             return requested_model, ""
@@ -1643,6 +1854,7 @@ async def _try_models_with_fallback(
             return model_name, response
 
         if "404" in response or "not found" in response.lower():
+            endpoint_health.mark_model_missing(model_name)
             continue
 
         home_log.log_sync(f"Error with model {model_name}: {response}")
@@ -1656,13 +1868,16 @@ async def _make_ollama_request(
     messages,
     request_options: Optional[Dict[str, Any]] = None,
     abort_check: Optional[Callable[[], Awaitable[bool]]] = None,
+    on_partial: Optional[PartialCallback] = None,
+    route_key: Optional[str] = None,
 ) -> Optional[str]:
-    """Make request to Ollama API. Returns None when aborted (coalesced DM)."""
-    endpoints = [
-        OLLAMA_URL,
-        "http://localhost:11434",
-        "http://127.0.0.1:11434",
-    ]
+    """Make request to Ollama API. Returns None when aborted (coalesced DM).
+
+    With on_partial, the reply is streamed (NDJSON) and on_partial receives the accumulated text.
+    Hosts come from ollama_router (model inventory, loaded models, load, stickiness, breaker state);
+    endpoints with an open circuit breaker are skipped without a connect attempt.
+    """
+    endpoints = ollama_router.route(model_name, route_key)
 
     def _is_transient_status(code: int) -> bool:
         return code in {408, 425, 429, 500, 502, 503, 504}
@@ -1672,11 +1887,14 @@ async def _make_ollama_request(
         formatted_messages = []
         for msg in messages:
             if msg.get("role") == "user" and msg.get("images"):
+                images = await asyncio.to_thread(
+                    lambda imgs=msg["images"]: [image_prep.for_model(b, model_name) for b in imgs]
+                )
                 formatted_messages.append(
                     {
                         "role": "user",
                         "content": msg["content"],
-                        "images": msg["images"],
+                        "images": images,
                     }
                 )
             else:
@@ -1686,7 +1904,7 @@ async def _make_ollama_request(
                         "content": msg.get("content", ""),
                     }
                 )
-        data = {"model": model_name, "messages": formatted_messages, "stream": False}
+        data = {"model": model_name, "messages": formatted_messages, "stream": False, "options": {}}
     else:
         options = {"temperature": 0.7, "num_predict": 1024}
         if isinstance(request_options, dict):
@@ -1700,26 +1918,139 @@ async def _make_ollama_request(
             "options": options,
         }
 
-    for base_url in endpoints:
+    if on_partial is not None:
+        data["stream"] = True
+    # Same num_ctx on every request for a model; a different value makes Ollama reload it.
+    data["options"]["num_ctx"] = context_budget.num_ctx_for(model_name)
+    keep_alive = model_warmth.keep_alive_for(model_name)
+    if keep_alive:
+        data["keep_alive"] = keep_alive
+
+    saw_404 = False
+    for ep_index, base_url in enumerate(endpoints):
+        probe = endpoint_health.claim(base_url)
+        if probe is None:
+            continue
         url = f"{base_url}/api/chat"
+        is_last_endpoint = ep_index == len(endpoints) - 1
 
-        for attempt in range(3):
-            try:
-                if abort_check and await abort_check():
-                    return None
-                # Run blocking I/O in a thread so Discord event loop stays responsive.
-                response = await asyncio.to_thread(requests.post, url, json=data, timeout=75)
-                if abort_check and await abort_check():
-                    return None
-
-                if response.status_code == 404:
-                    break
+        try:
+            for attempt in range(3):
+                try:
+                    if abort_check and await abort_check():
+                        return None
+                    started = time.monotonic()
+                    # Pooled keep-alive connection; cancelled in-flight when abort_check fires.
+                    if on_partial is not None:
+                        stream_parts: List[str] = []
+                        stream_error: List[str] = []
+                        stream_load_ns: List[int] = []
+
+                        async def _on_ndjson_line(line: str) -> None:
+                            try:
+                                chunk = json.loads(line)
+                            except ValueError:
+                                return
+                            if not isinstance(chunk, dict):
+                                return
+                            if chunk.get("error"):
+                                stream_error.append(str(chunk.get("error")))
+                                return
+                            if chunk.get("done") and chunk.get("load_duration") is not None:
+                                stream_load_ns.append(int(chunk["load_duration"]))
+                            piece = (chunk.get("message") or {}).get("content") or ""
+                            if piece:
+                                stream_parts.append(piece)
+                                await on_partial("".join(stream_parts))
+
+                        response = await llm_http.post_stream(
+                            url, _on_ndjson_line, json_body=data, timeout=75, abort_check=abort_check
+                        )
+                        if response is None:
+                            return None
+                        if response.status_code == 200:
+                            endpoint_health.record_success(base_url, time.monotonic() - started)
+                            if stream_error and not stream_parts:
+                                error_count = reliability_telemetry.increment("llm_errors")
+                                home_log.log_sync(
+                                    f"🔴 LLM stream error for model `{model_name}` (error #{error_count}): "
+                                    f"{stream_error[0][:200]}"
+                                )
+                                return f"Error: {stream_error[0][:200]}"
+                            model_warmth.record_request(
+                                model_name, stream_load_ns[0] if stream_load_ns else None, warm=bool(keep_alive)
+                            )
+                            ollama_router.record_success(base_url, model_name, route_key)
+                            return "".join(stream_parts) or "No response."
+                    else:
+                        response = await llm_http.post(url, json_body=data, timeout=75, abort_check=abort_check)
+                        if response is None:
+                            return None
 
-                if response.status_code != 200:
-                    if _is_transient_status(response.status_code) and attempt < 2:
+                    if response.status_code == 404:
+                        # Host is up but does not have this model.
+                        endpoint_health.record_success(base_url, time.monotonic() - started)
+                        ollama_router.record_missing(base_url, model_name)
+                        saw_404 = True
+                        break
+
+                    if response.status_code >= 500:
+                        endpoint_health.record_failure(base_url)
+                    else:
+                        endpoint_health.record_success(base_url, time.monotonic() - started)
+
+                    if response.status_code != 200:
+                        if _is_transient_status(response.status_code) and attempt < 2:
+                            reliability_telemetry.increment("llm_retries")
+                            home_log.log_sync(
+                                f"⚠️ LLM transient HTTP {response.status_code} for model `{model_name}` "
+                                f"(attempt {attempt + 1}/3). "
+                                f"{reliability_telemetry.format_snapshot('Counters')}"
+                            )
+                            await asyncio.sleep(1 + attempt)
+                            if abort_check and await abort_check():
+                                return None
+                            continue
+                        error_text = (response.text or "")[:140]
+                        error_count = reliability_telemetry.increment("llm_errors")
+                        home_log.log_sync(
+                            f"🔴 LLM HTTP error {response.status_code} for model `{model_name}` "
+                            f"(error #{error_count}): {error_text}"
+                        )
+                        return f"Error {response.status_code}: {error_text}"
+
+                    try:
+                        result = response.json()
+                    except ValueError:
+                        if attempt < 2:
+                            reliability_telemetry.increment("llm_retries")
+                            home_log.log_sync(
+                                f"⚠️ LLM returned non-JSON response for model `{model_name}` "
+                                f"(attempt {attempt + 1}/3)."
+                            )
+                            await asyncio.sleep(1 + attempt)
+                            if abort_check and await abort_check():
+                                return None
+                            continue
+                        error_count = reliability_telemetry.increment("llm_errors")
+                        home_log.log_sync(
+                            f"🔴 LLM returned invalid JSON for model `{model_name}` "
+                            f"(error #{error_count})."
+                        )
+                        return "Error: Invalid JSON response from Ollama."
+                    model_warmth.record_request(model_name, result.get("load_duration"), warm=bool(keep_alive))
+                    ollama_router.record_success(base_url, model_name, route_key)
+                    if abort_check and await abort_check():
+                        return None
+                    return result.get("message", {}).get("content", "No response.")
+
+                except llm_http.TransportTimeout:
+                    # Slow generation is not a dead host: affects ordering, not the breaker.
+                    endpoint_health.record_failure(base_url, trip=False)
+                    if attempt < 2:
                         reliability_telemetry.increment("llm_retries")
                         home_log.log_sync(
-                            f"⚠️ LLM transient HTTP {response.status_code} for model `{model_name}` "
+                            f"⚠️ LLM timeout for model `{model_name}` "
                             f"(attempt {attempt + 1}/3). "
                             f"{reliability_telemetry.format_snapshot('Counters')}"
                         )
@@ -1727,21 +2058,36 @@ async def _make_ollama_request(
                         if abort_check and await abort_check():
                             return None
                         continue
-                    error_text = (response.text or "")[:140]
-                    error_count = reliability_telemetry.increment("llm_errors")
+                    timeout_count = reliability_telemetry.increment("llm_timeouts")
                     home_log.log_sync(
-                        f"🔴 LLM HTTP error {response.status_code} for model `{model_name}` "
-                        f"(error #{error_count}): {error_text}"
+                        f"🔴 LLM timeout after retries for model `{model_name}` "
+                        f"(timeout #{timeout_count}). "
+                        f"{reliability_telemetry.format_snapshot('Counters')}"
                     )
-                    return f"Error {response.status_code}: {error_text}"
-
-                try:
-                    result = response.json()
-                except ValueError:
+                    return "Error: Request timed out"
+                except llm_http.TransportConnectionError:
+                    endpoint_health.record_failure(base_url)
+                    if not is_last_endpoint:
+                        # Move on to the next endpoint immediately instead of retrying a dead host.
+                        break
+                    if attempt < 2:
+                        reliability_telemetry.increment("llm_retries")
+                        home_log.log_sync(
+                            f"⚠️ LLM connection error for model `{model_name}` "
+                            f"(attempt {attempt + 1}/3). "
+                            f"{reliability_telemetry.format_snapshot('Counters')}"
+                        )
+                        await asyncio.sleep(1 + attempt)
+                        if abort_check and await abort_check():
+                            return None
+                        continue
+                    break
+                except Exception as e:
+                    endpoint_health.record_failure(base_url, trip=False)
                     if attempt < 2:
                         reliability_telemetry.increment("llm_retries")
                         home_log.log_sync(
-                            f"⚠️ LLM returned non-JSON response for model `{model_name}` "
+                            f"⚠️ LLM unexpected error for model `{model_name}`: {str(e)[:200]} "
                             f"(attempt {attempt + 1}/3)."
                         )
                         await asyncio.sleep(1 + attempt)
@@ -1750,63 +2096,16 @@ async def _make_ollama_request(
                         continue
                     error_count = reliability_telemetry.increment("llm_errors")
                     home_log.log_sync(
-                        f"🔴 LLM returned invalid JSON for model `{model_name}` "
-                        f"(error #{error_count})."
-                    )
-                    return "Error: Invalid JSON response from Ollama."
-                if abort_check and await abort_check():
-                    return None
-                return result.get("message", {}).get("content", "No response.")
-
-            except requests.exceptions.ConnectionError:
-                if attempt < 2:
-                    reliability_telemetry.increment("llm_retries")
-                    home_log.log_sync(
-                        f"⚠️ LLM connection error for model `{model_name}` "
-                        f"(attempt {attempt + 1}/3). "
-                        f"{reliability_telemetry.format_snapshot('Counters')}"
-                    )
-                    await asyncio.sleep(1 + attempt)
-                    if abort_check and await abort_check():
-                        return None
-                    continue
-                break
-            except requests.exceptions.Timeout:
-                if attempt < 2:
-                    reliability_telemetry.increment("llm_retries")
-                    home_log.log_sync(
-                        f"⚠️ LLM timeout for model `{model_name}` "
-                        f"(attempt {attempt + 1}/3). "
-                        f"{reliability_telemetry.format_snapshot('Counters')}"
+                        f"🔴 LLM fatal error for model `{model_name}` (error #{error_count}): {str(e)[:300]}"
                     )
-                    await asyncio.sleep(1 + attempt)
-                    if abort_check and await abort_check():
-                        return None
-                    continue
-                timeout_count = reliability_telemetry.increment("llm_timeouts")
-                home_log.log_sync(
-                    f"🔴 LLM timeout after retries for model `{model_name}` "
-                    f"(timeout #{timeout_count}). "
-                    f"{reliability_telemetry.format_snapshot('Counters')}"
-                )
-                return "Error: Request timed out"
-            except Exception as e:
-                if attempt < 2:
-                    reliability_telemetry.increment("llm_retries")
-                    home_log.log_sync(
-                        f"⚠️ LLM unexpected error for model `{model_name}`: {str(e)[:200]} "
-                        f"(attempt {attempt + 1}/3)."
-                    )
-                    await asyncio.sleep(1 + attempt)
-                    if abort_check and await abort_check():
-                        return None
-                    continue
-                error_count = reliability_telemetry.increment("llm_errors")
-                home_log.log_sync(
-                    f"🔴 LLM fatal error for model `{model_name}` (error #{error_count}): {str(e)[:300]}"
-                )
-                return f"Error: {str(e)}"
-
+                    return f"Error: {str(e)}"
+        finally:
+            # A cancelled or aborted probe never records an outcome; give its slot back.
+            if probe:
+                endpoint_health.release(base_url, probe)
+
+    if saw_404:
+        return f"Error: model '{model_name}' not found (404) on any reachable Ollama endpoint."
     error_count = reliability_telemetry.increment("llm_errors")
     home_log.log_sync(
         f"🔴 LLM connection failed for all Ollama endpoints (error #{error_count}) for model `{model_name}`. "
@@ -1823,7 +2122,8 @@ async def probe_model(provider: str, model_name: str) -> Tuple[bool, str]:
     if provider == "cloud":
         response = await _make_openrouter_request(model_name, test_messages)
     else:
-        response = await _make_ollama_request(model_name, test_messages)
+        async with llm_scheduler.slot(llm_scheduler.INTERACTIVE):
+            response = await _make_ollama_request(model_name, test_messages)
     if response is None:
         return False, f"Cannot use model '{model_name}' (aborted)."
     if response and not response.startswith("Error:"):
@@ -1949,9 +2249,8 @@ async def commentary_for_generated_image(
     requested_model = eff.get("model", "qwen2.5:7b")
     provider = eff.get("provider", "local")
     try:
-        import base64 as _b64
-
-        b64 = _b64.b64encode(image_bytes).decode("ascii")
+        prepared, _ = await asyncio.to_thread(image_prep.prepare, image_bytes)
+        b64 = base64.b64encode(prepared).decode("ascii")
     except Exception:
         return ""
     sys = (
@@ -1985,6 +2284,23 @@ async def commentary_for_generated_image(
         return ""
     return text.strip()
 
+def _chunk_llm_call(model_name: str, provider: str, system_prompt: str) -> chunked_analysis.LLMCall:
+    """Per-chunk call for map-reduce file analysis (same model/fallbacks; cached per chunk)."""
+
+    async def call(system: str, user: str) -> str:
+        messages = [
+            {"role": "system", "content": f"{system_prompt}\n\n{system}"},
+            {"role": "user", "content": user},
+        ]
+        _, reply = await _try_models_with_fallback(model_name, messages, provider=provider, cache_fn="file_analysis")
+        reply = _clean_response(reply or "")
+        if not reply or reply.startswith("Error:") or reply.startswith("⚠️"):
+            raise RuntimeError(reply or "empty reply")
+        return reply
+
+    return call
+
+
 async def analyze_file(
     user_id: int,
     channel_id: int,
@@ -1996,8 +2312,10 @@ async def analyze_file(
     return_only_text: bool = False,
     *,
     record_in_conversation: bool = True,
+    progress: Optional[PartialCallback] = None,
 ) -> str:
-    """vision_mode: concise (short), examine (detailed), interrogate (very short). return_only_text: if True, return only extracted/response text (no header)."""
+    """vision_mode: concise (short), examine (detailed), interrogate (very short). return_only_text: if True, return only extracted/response text (no header).
+    Text over FILE_ANALYSIS_CHUNK_TOKENS is read in parts (map-reduce); progress receives status lines meanwhile."""
     if is_adaptive_context_export_filename(filename):
         return (
             "That file is reserved for **`/adaptive-status`** replies in DMs. "
@@ -2015,11 +2333,21 @@ async def analyze_file(
     
     # Determine file type
     file_type = FileProcessor.get_file_type(filename)
+    document_text = None
+    if file_type == "document":
+        # PDF/Office parsing (and OCR of scanned pages) runs in a worker process.
+        try:
+            document_text = await document_extract.extract_text(file_data, filename)
+        except Exception as e:
+            document_text = f"[Could not extract document text: {e}]"
     
     # If user prompt is about OCR or text extraction, adjust prompt
     user_prompt_lower = user_prompt.lower()
     is_ocr_request = any(keyword in user_prompt_lower for keyword in 
                         ["ocr", "extract text", "read text", "what does it say", "what's written", "transcribe"])
+    if is_ocr_request and return_only_text and document_text is not None and chunked_analysis.needs_chunking(document_text):
+        # Transcribing a large document through the model would only condense it; the extracted text is the answer.
+        return document_text
     
     # Generate appropriate prompt
     if user_prompt:
@@ -2032,12 +2360,47 @@ async def analyze_file(
                 analysis_prompt = "Describe this image in detail. Be objective and factual. Describe what you actually see, not assumptions. Include: objects, people, animals, text, colors, setting, actions if any. If it's a screenshot or contains text, also extract and transcribe the text."
         else:
             analysis_prompt = FileProcessor.analyze_file_content(filename, file_data, file_type)
+
+    def _finish(response: Optional[str]) -> str:
+        response = _clean_response(response or "")
+        if record_in_conversation:
+            conversation_manager.add_message(
+                channel_id,
+                "user",
+                f"{username} says: [File Upload: {filename}] {user_prompt or 'Analyze this file'}",
+            )
+            conversation_manager.add_message(channel_id, "assistant", response)
+            conversation_manager.save()
+        if return_only_text:
+            return response
+        final_response = f"📄 **File Analysis: {filename}**\n"
+        final_response += f"*Type: {file_type.upper()} | Size: {len(file_data):,} bytes*\n\n"
+        final_response += response
+        return final_response
+
+    cache_key = None
+    if file_type != "image":
+        # Whole-file result, checked before any chunking. The system prompt embeds the clock
+        # time, so key on file bytes + prompts + date instead of the final messages.
+        cache_key = llm_cache.make_key(
+            "file_analysis",
+            provider,
+            model_name,
+            hashlib.sha256(file_data).hexdigest(),
+            filename,
+            analysis_prompt,
+            system_prompt,
+            date,
+        )
+        hit = llm_cache.lookup("file_analysis", cache_key) if llm_cache.enabled() else None
+        if hit is not None:
+            return _finish(hit[1])
     
     # Prepare image if needed
     images_data = []
     if file_type == "image":
         try:
-            img_data = FileProcessor.prepare_image_for_llm(file_data, filename)
+            img_data = await asyncio.to_thread(FileProcessor.prepare_image_for_llm, file_data, filename)
             images_data.append(img_data)
         except Exception as e:
             return f"⚠️ Failed to process image: {str(e)}"
@@ -2066,11 +2429,22 @@ async def analyze_file(
         # For non-image files, include content
         if file_type in ["text", "code", "document"]:
             try:
-                text_content = FileProcessor.read_text_file(file_data)
-                # Limit content length to avoid token limits
-                if len(text_content) > 8000:
-                    text_content = text_content[:8000] + "\n\n...[Content truncated due to length]..."
-                full_prompt = f"{analysis_prompt}\n\nFile Content:\n{text_content}"
+                if document_text is not None:
+                    text_content = document_text
+                else:
+                    text_content = FileProcessor.read_text_file(file_data)
+                if chunked_analysis.needs_chunking(text_content):
+                    notes = await chunked_analysis.map_notes(
+                        text_content,
+                        filename,
+                        file_type,
+                        analysis_prompt,
+                        _chunk_llm_call(model_name, provider, system_prompt),
+                        progress=progress,
+                    )
+                    full_prompt = f"{analysis_prompt}\n\nThe file was too large for one pass; notes from reading all of it in order:\n{notes}"
+                else:
+                    full_prompt = f"{analysis_prompt}\n\nFile Content:\n{text_content}"
                 messages.append({"role": "user", "content": full_prompt})
             except Exception as e:
                 messages.append({"role": "user", "content": f"{analysis_prompt}\n\nError reading file: {str(e)}"})
@@ -2079,7 +2453,9 @@ async def analyze_file(
     
     # Get response - use same vision fallback as ask_llm (user's model + fallbacks)
     if file_type == "image":
-        model_used, response = await _try_models_with_fallback(model_name, messages, images=True, provider=provider)
+        model_used, response = await _try_models_with_fallback(
+            model_name, messages, images=True, provider=provider, cache_fn="file_analysis"
+        )
         if response and response.startswith("⚠️"):
             pass  # keep warning message
         else:
@@ -2088,28 +2464,14 @@ async def analyze_file(
         if provider == "cloud":
             response = await _make_openrouter_request(model_name, messages)
         else:
-            response = await _make_ollama_request(model_name, messages)
+            async with llm_scheduler.slot(llm_scheduler.INTERACTIVE):
+                response = await _make_ollama_request(model_name, messages)
         if response is None:
             response = ""
-    
-    # Clean and format response
-    response = _clean_response(response or "")
-    
-    if record_in_conversation:
-        conversation_manager.add_message(
-            channel_id,
-            "user",
-            f"{username} says: [File Upload: {filename}] {user_prompt or 'Analyze this file'}",
-        )
-        conversation_manager.add_message(channel_id, "assistant", response)
-        conversation_manager.save()
+        elif _is_cacheable_response(response):
+            llm_cache.store("file_analysis", cache_key, model_name, response)
 
-    if return_only_text:
-        return response
-    final_response = f"📄 **File Analysis: {filename}**\n"
-    final_response += f"*Type: {file_type.upper()} | Size: {len(file_data):,} bytes*\n\n"
-    final_response += response
-    return final_response
+    return _finish(response)
 
 async def compare_files(
     user_id: int,
@@ -2119,8 +2481,9 @@ async def compare_files(
     username: str = "",
     *,
     record_in_conversation: bool = True,
+    progress: Optional[PartialCallback] = None,
 ) -> str:
-    """Compare multiple text files"""
+    """Compare multiple text files (large ones are condensed by map-reduce first)"""
     # Get system info
     date, time = update_system_time_date()
     
@@ -2130,49 +2493,74 @@ async def compare_files(
     model_name = eff.get("model", "llama3.2:3b")
     provider = eff.get("provider", "local")
     
-    # Extract text from all files
-    file_contents = []
-    for file_info in files:
-        try:
-            text_content = FileProcessor.read_text_file(file_info['data'])
-            # Limit content length
-            if len(text_content) > 4000:
-                text_content = text_content[:4000] + "\n...[Content truncated]"
-            file_contents.append({
-                'filename': file_info['filename'],
-                'content': text_content,
-                'type': FileProcessor.get_file_type(file_info['filename'])
-            })
-        except Exception as e:
-            file_contents.append({
-                'filename': file_info['filename'],
-                'content': f"Error reading file: {str(e)}",
-                'type': 'error'
-            })
-    
     # Prepare comparison prompt
     if user_prompt:
         analysis_prompt = user_prompt
     else:
         analysis_prompt = "Compare these files. Identify similarities, differences, and provide an overall analysis."
     
-    # Build file content for prompt
-    file_content_str = ""
-    for i, file_info in enumerate(file_contents, 1):
-        file_content_str += f"\n\n--- File {i}: {file_info['filename']} ---\n"
-        file_content_str += file_info['content']
-    
-    enhanced_system_prompt = f"{system_prompt}\n\n{get_enhanced_prompt('compare_files', date=date, time=time)}"
-    
-    messages = [
-        {"role": "system", "content": enhanced_system_prompt},
-        {"role": "user", "content": f"{analysis_prompt}\n\nFiles to compare:{file_content_str}"}
-    ]
-    
-    if provider == "cloud":
-        response = await _make_openrouter_request(model_name, messages)
+    # Whole-comparison result, checked before any file is read or condensed.
+    cache_key = llm_cache.make_key(
+        "compare_files",
+        provider,
+        model_name,
+        [(f["filename"], hashlib.sha256(f["data"]).hexdigest()) for f in files],
+        analysis_prompt,
+        system_prompt,
+        date,
+    )
+    hit = llm_cache.lookup("compare_files", cache_key) if llm_cache.enabled() else None
+
+    # Extract text from all files; each file gets an equal share of one chunk budget
+    per_file_tokens = max(500, chunked_analysis.FILE_ANALYSIS_CHUNK_TOKENS * 2 // max(1, len(files)))
+    chunk_call = _chunk_llm_call(model_name, provider, system_prompt)
+
+    async def _read(file_info: Dict) -> Dict:
+        file_type = FileProcessor.get_file_type(file_info['filename'])
+        try:
+            if file_type == "document":
+                text_content = await document_extract.extract_text(file_info['data'], file_info['filename'])
+            else:
+                text_content = FileProcessor.read_text_file(file_info['data'])
+            if chunked_analysis.needs_chunking(text_content, per_file_tokens):
+                notes = await chunked_analysis.map_notes(
+                    text_content,
+                    file_info['filename'],
+                    file_type,
+                    f"Another file will be compared with this one. {analysis_prompt}",
+                    chunk_call,
+                    progress=progress,
+                )
+                text_content = f"[Large file; notes from reading all of it in order]\n{notes}"
+            return {'filename': file_info['filename'], 'content': text_content, 'type': file_type}
+        except Exception as e:
+            return {'filename': file_info['filename'], 'content': f"Error reading file: {str(e)}", 'type': 'error'}
+
+    if hit is not None:
+        response = hit[1]
     else:
-        response = await _make_ollama_request(model_name, messages)
+        file_contents = await asyncio.gather(*(_read(f) for f in files))
+
+        # Build file content for prompt
+        file_content_str = ""
+        for i, file_info in enumerate(file_contents, 1):
+            file_content_str += f"\n\n--- File {i}: {file_info['filename']} ---\n"
+            file_content_str += file_info['content']
+
+        enhanced_system_prompt = f"{system_prompt}\n\n{get_enhanced_prompt('compare_files', date=date, time=time)}"
+
+        messages = [
+            {"role": "system", "content": enhanced_system_prompt},
+            {"role": "user", "content": f"{analysis_prompt}\n\nFiles to compare:{file_content_str}"}
+        ]
+
+        if provider == "cloud":
+            response = await _make_openrouter_request(model_name, messages)
+        else:
+            async with llm_scheduler.slot(llm_scheduler.INTERACTIVE):
+                response = await _make_ollama_request(model_name, messages)
+        if _is_cacheable_response(response):
+            llm_cache.store("compare_files", cache_key, model_name, response)
     response = _clean_response(response or "")
     
     # Format response
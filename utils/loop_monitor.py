@@ -0,0 +1,153 @@
+"""Event-loop lag monitor.
+
+A heartbeat task sleeps HEARTBEAT_SECONDS and records how late it woke up; that delay is time
+the loop spent running something else without yielding. Percentiles of recent lag are shown in
+/reliability, and every stall over LOOP_LAG_THRESHOLD_MS is counted (`loop_stalls`).
+
+With LOOP_MONITOR_DEBUG=1 a watchdog thread also notices a heartbeat that is overdue by the
+threshold *while* the loop is still blocked, and logs the loop thread's current stack, which
+points at the blocking call. Strict mode (LOOP_MONITOR_STRICT=1, or start(strict=True)
+in tests) keeps those stacks, and raise_if_blocked() fails with them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from integrations import LOOP_LAG_THRESHOLD_MS, LOOP_MONITOR_DEBUG, LOOP_MONITOR_STRICT
+from utils import home_log
+from utils import reliability_telemetry
+
+HEARTBEAT_SECONDS = 0.25
+SAMPLES = 2400  # ~10 minutes of heartbeats
+STACK_LIMIT = 25
+MAX_VIOLATIONS = 50
+
+
+class LoopBlocked(AssertionError):
+    """Strict mode: the event loop was blocked longer than the threshold."""
+
+
+_lock = threading.Lock()
+_samples: Deque[float] = deque(maxlen=SAMPLES)  # lag per heartbeat, seconds
+_violations: List[str] = []
+_stalls = 0
+_max_lag = 0.0
+_last_beat = 0.0
+_last_lag = 0.0
+_beat_seq = 0
+_threshold = LOOP_LAG_THRESHOLD_MS / 1000.0
+_strict = False
+_task: Optional[asyncio.Task] = None
+_watchdog: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _record_stall(lag: float, stack: Optional[str]) -> None:
+    global _stalls
+    with _lock:
+        _stalls += 1
+        if _strict and stack is not None and len(_violations) < MAX_VIOLATIONS:
+            _violations.append(f"blocked {lag * 1000:.0f} ms at:\n{stack}")
+    reliability_telemetry.increment("loop_stalls")
+
+
+async def _heartbeat() -> None:
+    global _last_beat, _last_lag, _beat_seq, _max_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        _last_beat = loop.time()
+        _beat_seq += 1
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        lag = max(0.0, loop.time() - _last_beat - HEARTBEAT_SECONDS)
+        _last_lag = lag
+        with _lock:
+            _samples.append(lag)
+            _max_lag = max(_max_lag, lag)
+        if lag >= _threshold and _watchdog is None:
+            _record_stall(lag, None)  # watchdog off: no stack, count only
+
+
+def _watch(loop_thread_id: int, loop: asyncio.AbstractEventLoop) -> None:
+    """Watchdog thread: dump the loop thread's stack once per stall while it is still blocked."""
+    reported_seq = -1
+    while not _stop.wait(min(0.05, _threshold / 4)):
+        seq = _beat_seq
+        overdue = loop.time() - _last_beat - HEARTBEAT_SECONDS
+        if overdue < _threshold or seq == reported_seq or _last_beat == 0.0:
+            continue
+        reported_seq = seq
+        frame = sys._current_frames().get(loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else "(no frame)"
+        # Let the stall finish to report its full length.
+        while not _stop.is_set() and _beat_seq == seq and loop.time() - _last_beat < 600:
+            time.sleep(0.01)
+        lag = max(overdue, _last_lag)
+        _record_stall(lag, stack)
+        home_log.log_sync(f"🐢 Event loop blocked ~{lag * 1000:.0f} ms; stack when detected:\n{stack}")
+
+
+def start(*, threshold_ms: Optional[int] = None, debug: Optional[bool] = None, strict: Optional[bool] = None) -> None:
+    """Start measuring lag on the running loop (idempotent); debug adds the stack-dumping watchdog."""
+    global _task, _watchdog, _threshold, _strict
+    if _task is not None and not _task.done():
+        return
+    loop = asyncio.get_running_loop()
+    _threshold = (threshold_ms if threshold_ms is not None else LOOP_LAG_THRESHOLD_MS) / 1000.0
+    _strict = LOOP_MONITOR_STRICT if strict is None else strict
+    _task = loop.create_task(_heartbeat())
+    if (LOOP_MONITOR_DEBUG if debug is None else debug) or _strict:
+        _stop.clear()
+        _watchdog = threading.Thread(
+            target=_watch, args=(threading.get_ident(), loop), name="loop-watchdog", daemon=True
+        )
+        _watchdog.start()
+
+
+def stop() -> None:
+    global _task, _watchdog
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    if _watchdog is not None:
+        _stop.set()
+        _watchdog.join(timeout=1)
+        _watchdog = None
+
+
+def raise_if_blocked() -> None:
+    """Strict mode: raise LoopBlocked with the recorded stacks (and clear them)."""
+    with _lock:
+        found = list(_violations)
+        _violations.clear()
+    if found:
+        raise LoopBlocked(f"event loop blocked {len(found)} time(s):\n\n" + "\n\n".join(found))
+
+
+def percentiles() -> Dict[str, float]:
+    """Lag in milliseconds over the recent window: p50, p95, p99, max (since start), stalls."""
+    with _lock:
+        data = sorted(_samples)
+        stalls = _stalls
+        max_lag = _max_lag
+    if not data:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "stalls": stalls}
+
+    def pct(p: float) -> float:
+        return data[min(len(data) - 1, int(p * len(data)))] * 1000
+
+    return {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": max_lag * 1000, "stalls": stalls}
+
+
+def format_snapshot() -> str:
+    p = percentiles()
+    return (
+        f"p50 {p['p50']:.0f} ms · p95 {p['p95']:.0f} ms · p99 {p['p99']:.0f} ms · max {p['max']:.0f} ms · "
+        f"{int(p['stalls'])} stalls ≥ {_threshold * 1000:.0f} ms"
+    )
@@ -0,0 +1,292 @@
+"""Model capability registry: what each local (Ollama) and cloud (OpenRouter) model can do.
+
+Local entries come from /api/tags on every Ollama host (name, digest, size) plus /api/show per new or changed digest
+(capabilities, families, projector, context length, parameter size, quantization). Cloud
+entries come from OpenRouter's public model list (input modalities, context length).
+The registry is persisted (data/model_registry.json, or state.db) and refreshed in the
+background, so image requests can go straight to a vision-capable model without probing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils import home_log
+from utils import llm_http
+from utils import ollama_router
+from utils import state_store
+
+REGISTRY_FILE = "data/model_registry.json"
+REFRESH_INTERVAL_SECONDS = 30 * 60
+CLOUD_REFRESH_INTERVAL_SECONDS = 6 * 3600
+OPENROUTER_MODELS_URL = "https://openrouter.ai/api/v1/models"
+# Ollama model families that carry an image encoder when /api/show has no "capabilities" list.
+_VISION_FAMILIES = {"clip", "mllama", "llava", "moondream", "minicpmv", "qwen2vl", "qwen25vl", "gemma3", "mistral3", "llama4"}
+_SHOW_CONCURRENCY = 4
+
+_lock = threading.Lock()
+_entries: Dict[str, Dict[str, Any]] = {}  # "local:<name>" / "cloud:<id>" -> info
+_loaded = False
+_last_local_refresh = 0.0
+_last_cloud_refresh = 0.0
+_refresh_task: Optional[asyncio.Task] = None
+_loop_task: Optional[asyncio.Task] = None
+
+
+def _key(provider: str, name: str) -> str:
+    return f"{'cloud' if provider == 'cloud' else 'local'}:{name}"
+
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if state_store.using_sqlite():
+        data = state_store.load_document(REGISTRY_FILE, {})
+    else:
+        try:
+            with open(REGISTRY_FILE) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            data = {}
+    if isinstance(data, dict):
+        _entries.update({k: v for k, v in data.items() if isinstance(v, dict)})
+
+
+def _save() -> None:
+    with _lock:
+        snapshot = dict(_entries)
+    try:
+        if state_store.using_sqlite():
+            state_store.save_document(REGISTRY_FILE, snapshot)
+            return
+        os.makedirs(os.path.dirname(REGISTRY_FILE), exist_ok=True)
+        tmp = REGISTRY_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp, REGISTRY_FILE)
+    except Exception as e:
+        home_log.log_sync(f"⚠️ Model registry save failed: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def get(name: str, provider: str = "local") -> Optional[Dict[str, Any]]:
+    with _lock:
+        _ensure_loaded()
+        entry = _entries.get(_key(provider, name))
+        return dict(entry) if entry else None
+
+
+def is_vision(name: str, provider: str = "local") -> Optional[bool]:
+    """True/False from model metadata; None when the model is not in the registry yet."""
+    entry = get(name, provider)
+    if entry is None or entry.get("vision") is None:
+        return None
+    return bool(entry["vision"])
+
+
+def context_length(name: str, provider: str = "local") -> Optional[int]:
+    entry = get(name, provider)
+    value = (entry or {}).get("context_length")
+    return int(value) if isinstance(value, (int, float)) and value > 0 else None
+
+
+def local_models(vision: Optional[bool] = None) -> List[str]:
+    """Installed Ollama models known to the registry (optionally only (non-)vision ones)."""
+    with _lock:
+        _ensure_loaded()
+        return sorted(
+            k.split(":", 1)[1]
+            for k, v in _entries.items()
+            if k.startswith("local:") and (vision is None or bool(v.get("vision")) == vision)
+        )
+
+
+def has_local_data() -> bool:
+    with _lock:
+        _ensure_loaded()
+        return any(k.startswith("local:") for k in _entries)
+
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+def _parse_show(name: str, digest: str, show: Dict[str, Any]) -> Dict[str, Any]:
+    details = show.get("details") or {}
+    families = [str(f).lower() for f in (details.get("families") or [details.get("family")]) if f]
+    capabilities = [str(c).lower() for c in (show.get("capabilities") or [])]
+    model_info = show.get("model_info") or {}
+    projector = bool(show.get("projector_info")) or any(".vision." in k for k in model_info)
+    if capabilities:
+        vision = "vision" in capabilities
+    else:
+        vision = projector or bool(_VISION_FAMILIES.intersection(families))
+    ctx = None
+    for k, v in model_info.items():
+        if k.endswith(".context_length") and isinstance(v, (int, float)):
+            ctx = int(v)
+            break
+    return {
+        "vision": vision,
+        "capabilities": capabilities,
+        "families": families,
+        "projector": projector,
+        "context_length": ctx,
+        "parameter_size": details.get("parameter_size"),
+        "quantization": details.get("quantization_level"),
+        "digest": digest,
+        "checked": time.time(),
+    }
+
+
+async def refresh_local() -> bool:
+    """Sync local entries with /api/tags on every Ollama host; /api/show only for new or re-pulled models."""
+    global _last_local_refresh
+    by_host = await ollama_router.refresh()
+    if not by_host:
+        return False
+    installed: Dict[str, str] = {}
+    sizes: Dict[str, Any] = {}
+    source: Dict[str, str] = {}  # model -> a host that has it
+    for host, tags in by_host.items():
+        for m in tags:
+            name = str(m.get("name") or "")
+            if name and name not in installed:
+                installed[name] = str(m.get("digest") or "")
+                sizes[name] = m.get("size")
+                source[name] = host
+    with _lock:
+        _ensure_loaded()
+        stale = [
+            name
+            for name, digest in installed.items()
+            if (_entries.get(_key("local", name)) or {}).get("digest") != digest
+        ]
+    sem = asyncio.Semaphore(_SHOW_CONCURRENCY)
+
+    async def show(name: str) -> None:
+        async with sem:
+            try:
+                r = await llm_http.post(f"{source[name]}/api/show", json_body={"model": name}, timeout=20)
+                if r is None or r.status_code != 200:
+                    return
+                info = _parse_show(name, installed[name], r.json())
+            except (llm_http.TransportTimeout, llm_http.TransportConnectionError, ValueError):
+                return
+        with _lock:
+            _entries[_key("local", name)] = info
+
+    await asyncio.gather(*(show(n) for n in stale))
+    with _lock:
+        changed = bool(stale)
+        for name, size in sizes.items():
+            entry = _entries.get(_key("local", name))
+            if entry is not None and entry.get("size") != size:
+                entry["size"] = size
+                changed = True
+        for k in [k for k in _entries if k.startswith("local:") and k.split(":", 1)[1] not in installed]:
+            del _entries[k]
+            changed = True
+    _last_local_refresh = time.time()
+    if changed:
+        await asyncio.to_thread(_save)
+        home_log.log_sync(f"✅ Model registry: {len(installed)} local models ({len(stale)} inspected)")
+    return True
+
+
+async def refresh_cloud() -> bool:
+    """Vision/context info for OpenRouter models (public list, no key needed)."""
+    global _last_cloud_refresh
+    try:
+        resp = await llm_http.get(OPENROUTER_MODELS_URL, timeout=20)
+        if resp is None or resp.status_code != 200:
+            return False
+        models = resp.json().get("data", [])
+    except (llm_http.TransportTimeout, llm_http.TransportConnectionError, ValueError):
+        return False
+    now = time.time()
+    fresh: Dict[str, Dict[str, Any]] = {}
+    for m in models:
+        model_id = str(m.get("id") or "")
+        if not model_id:
+            continue
+        arch = m.get("architecture") or {}
+        modalities = [str(x).lower() for x in (arch.get("input_modalities") or [])]
+        if not modalities and arch.get("modality"):
+            modalities = str(arch["modality"]).split("->", 1)[0].split("+")
+        fresh[_key("cloud", model_id)] = {
+            "vision": "image" in modalities,
+            "input_modalities": modalities,
+            "context_length": m.get("context_length"),
+            "checked": now,
+        }
+    with _lock:
+        _ensure_loaded()
+        for k in [k for k in _entries if k.startswith("cloud:")]:
+            del _entries[k]
+        _entries.update(fresh)
+    _last_cloud_refresh = now
+    await asyncio.to_thread(_save)
+    return True
+
+
+async def refresh(force_cloud: bool = False) -> None:
+    await refresh_local()
+    if force_cloud or time.time() - _last_cloud_refresh >= CLOUD_REFRESH_INTERVAL_SECONDS:
+        await refresh_cloud()
+
+
+def schedule_refresh() -> None:
+    """Refresh soon in the background (e.g. after /pull-model); no-op without a running loop."""
+    global _refresh_task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _refresh_task is not None and not _refresh_task.done():
+        return
+    _refresh_task = loop.create_task(refresh_local())
+
+
+async def ensure_local(max_wait: float = 5.0) -> None:
+    """Before the first image request: make sure local entries exist (bounded wait)."""
+    if has_local_data() and time.time() - _last_local_refresh < REFRESH_INTERVAL_SECONDS * 4:
+        return
+    try:
+        await asyncio.wait_for(refresh_local(), timeout=max_wait)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _refresh_loop() -> None:
+    while True:
+        try:
+            await refresh()
+        except Exception as e:
+            home_log.log_sync(f"⚠️ Model registry refresh failed: {e}")
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+
+
+def start() -> None:
+    """Start the periodic background refresh (idempotent)."""
+    global _loop_task
+    if _loop_task is not None and not _loop_task.done():
+        return
+    _loop_task = asyncio.get_running_loop().create_task(_refresh_loop())
+
+
+def stop() -> None:
+    global _loop_task
+    if _loop_task is not None:
+        _loop_task.cancel()
+        _loop_task = None
@@ -0,0 +1,186 @@
+"""Keep frequently used Ollama models loaded.
+
+Every local request is recorded with Ollama's `load_duration`, which tells cold loads
+(model had to be read into memory) from warm hits; the split is counted in
+reliability_telemetry for /reliability. Per-model request rates decay with a half-life, and
+a background tick keeps the hottest models loaded within OLLAMA_WARM_BUDGET_MB. Those models get
+a longer `keep_alive` on normal requests and an empty /api/generate ping (load only, no
+tokens) before they would expire. prewarm() lets callers such as the news service load a model
+shortly before a scheduled burst.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+from integrations import OLLAMA_WARM_BUDGET_MB, OLLAMA_WARM_KEEP_ALIVE_MINUTES
+from utils import context_budget
+from utils import home_log
+from utils import llm_http
+from utils import model_registry
+from utils import ollama_router
+from utils import reliability_telemetry
+
+# A request whose load_duration exceeds this was a cold load.
+COLD_LOAD_SECONDS = 1.0
+RATE_HALF_LIFE_SECONDS = 30 * 60
+TICK_SECONDS = 60
+# Models need at least this decayed request count to be worth holding in memory.
+MIN_HOT_SCORE = 0.5
+# Size assumed for models the registry has no size for (≈ 7B q4).
+DEFAULT_MODEL_BYTES = 5 * 1024**3
+
+_lock = threading.Lock()
+_scores: Dict[str, float] = {}
+_score_at: Dict[str, float] = {}
+_last_ping: Dict[str, float] = {}
+_hot: List[str] = []
+_task: Optional[asyncio.Task] = None
+
+
+def _decayed(model: str, now: float) -> float:
+    score = _scores.get(model, 0.0)
+    if not score:
+        return 0.0
+    age = now - _score_at.get(model, now)
+    return score * math.pow(0.5, age / RATE_HALF_LIFE_SECONDS)
+
+
+def record_request(model: str, load_duration_ns: Optional[int] = None, warm: bool = False) -> None:
+    """
+    Count one completed local request; `load_duration_ns` comes from Ollama's final response.
+    `warm` is True when the request carried keep_alive_for()'s longer keep_alive, which then
+    counts as a ping; requests with Ollama's default keep_alive do not postpone the next one.
+    """
+    if not model:
+        return
+    now = time.time()
+    with _lock:
+        _scores[model] = _decayed(model, now) + 1.0
+        _score_at[model] = now
+        if warm:
+            _last_ping[model] = now
+    if load_duration_ns is None:
+        return
+    if load_duration_ns / 1e9 >= COLD_LOAD_SECONDS:
+        reliability_telemetry.increment("ollama_cold_loads")
+    else:
+        reliability_telemetry.increment("ollama_warm_requests")
+
+
+def keep_alive_for(model: str) -> Optional[str]:
+    """Longer keep_alive for models the scheduler holds warm; None = Ollama default."""
+    with _lock:
+        if model in _hot:
+            return f"{OLLAMA_WARM_KEEP_ALIVE_MINUTES}m"
+    return None
+
+
+def hot_models() -> List[str]:
+    with _lock:
+        return list(_hot)
+
+
+def _model_bytes(model: str) -> int:
+    entry = model_registry.get(model) or {}
+    size = entry.get("size")
+    return int(size) if isinstance(size, (int, float)) and size > 0 else DEFAULT_MODEL_BYTES
+
+
+def _select_hot(now: float) -> List[str]:
+    """Hottest models first, greedily, while they fit the RAM budget."""
+    budget = OLLAMA_WARM_BUDGET_MB * 1024 * 1024
+    installed = set(model_registry.local_models())
+    with _lock:
+        ranked = sorted(((m, _decayed(m, now)) for m in _scores), key=lambda x: -x[1])
+    chosen: List[str] = []
+    used = 0
+    for model, score in ranked:
+        if score < MIN_HOT_SCORE:
+            break
+        if installed and model not in installed:
+            continue
+        size = _model_bytes(model)
+        if used + size > budget:
+            continue
+        chosen.append(model)
+        used += size
+    return chosen
+
+
+async def prewarm(model: str, base_url: Optional[str] = None, keep_alive: Optional[str] = None) -> bool:
+    """Load `model` without generating (empty /api/generate). Returns True when Ollama accepted it."""
+    if not model:
+        return False
+    base = (base_url or ollama_router.route(model)[0]).rstrip("/")
+    body = {
+        "model": model,
+        "keep_alive": keep_alive or f"{OLLAMA_WARM_KEEP_ALIVE_MINUTES}m",
+        # Load with the num_ctx real requests use, or the first one reloads the model.
+        "options": {"num_ctx": context_budget.num_ctx_for(model)},
+    }
+    started = time.monotonic()
+    try:
+        resp = await llm_http.post(f"{base}/api/generate", json_body=body, timeout=120)
+    except (llm_http.TransportTimeout, llm_http.TransportConnectionError) as e:
+        home_log.log_sync(f"⚠️ Prewarm of `{model}` failed: {e}")
+        return False
+    if resp is None or resp.status_code != 200:
+        return False
+    ollama_router.record_success(base, model)
+    with _lock:
+        _last_ping[model] = time.time()
+    took = time.monotonic() - started
+    if took >= COLD_LOAD_SECONDS:
+        home_log.log_sync(f"🔥 Prewarmed `{model}` in {took:.1f}s")
+    return True
+
+
+async def tick() -> None:
+    global _hot
+    now = time.time()
+    hot = _select_hot(now)
+    with _lock:
+        _hot = hot
+        due = [m for m in hot if now - _last_ping.get(m, 0.0) >= OLLAMA_WARM_KEEP_ALIVE_MINUTES * 60 / 2]
+    for model in due:
+        await prewarm(model)
+
+
+async def _loop() -> None:
+    while True:
+        await asyncio.sleep(TICK_SECONDS)
+        try:
+            await tick()
+        except Exception as e:
+            home_log.log_sync(f"⚠️ Model warm-keeping tick failed: {e}")
+
+
+def start() -> None:
+    """Start the warm-keeping scheduler (no-op when OLLAMA_WARM_BUDGET_MB is 0)."""
+    global _task
+    if OLLAMA_WARM_BUDGET_MB <= 0 or (_task is not None and not _task.done()):
+        return
+    _task = asyncio.get_running_loop().create_task(_loop())
+
+
+def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def format_ratio() -> str:
+    data = reliability_telemetry.snapshot()
+    cold = data.get("ollama_cold_loads", 0)
+    warm = data.get("ollama_warm_requests", 0)
+    total = cold + warm
+    pct = f" ({100 * warm / total:.0f}% warm)" if total else ""
+    hot = hot_models()
+    held = f" · holding: {', '.join(f'`{m}`' for m in hot)}" if hot else ""
+    return f"{warm} warm / {cold} cold{pct}{held}"
@@ -0,0 +1,202 @@
+"""Route Ollama requests across the configured host pool (OLLAMA_HOSTS).
+
+Per host it keeps the installed models (/api/tags) and the models currently in memory
+(/api/ps, plus every successful request). route() orders hosts for one request: healthy
+before tripped breakers, hosts that have the model before unknown ones before hosts
+without it, loaded before not loaded, then fewest outstanding requests (llm_http). A
+route key (DM channel) sticks to the host that last served it, so Ollama can reuse that
+conversation's KV cache, unless that host is clearly busier than the best alternative.
+The rest of the list is the failover order.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from integrations import OLLAMA_HOSTS
+from utils import endpoint_health
+from utils import home_log
+from utils import llm_http
+
+# With a single configured host, keep the historical localhost fallbacks.
+LOCAL_FALLBACKS = ("http://localhost:11434", "http://127.0.0.1:11434")
+REFRESH_SECONDS = 60
+# A sticky host is kept while it has at most this many more outstanding requests than the best host.
+STICKY_SLACK = 2
+STICKY_TTL_SECONDS = 30 * 60
+STICKY_MAX_KEYS = 2048
+
+_lock = threading.Lock()
+_inventory: Dict[str, Set[str]] = {}
+_loaded: Dict[str, Set[str]] = {}
+_sticky: "OrderedDict[str, tuple]" = OrderedDict()  # route_key -> (host, last_used)
+_task: Optional[asyncio.Task] = None
+
+_STATE_RANK = {endpoint_health.STATE_CLOSED: 0, endpoint_health.STATE_HALF_OPEN: 1, endpoint_health.STATE_OPEN: 2}
+
+
+def hosts() -> List[str]:
+    return list(OLLAMA_HOSTS)
+
+
+def primary() -> str:
+    return OLLAMA_HOSTS[0]
+
+
+def update_inventory(host: str, models: List[str]) -> None:
+    with _lock:
+        _inventory[host.rstrip("/")] = set(models)
+
+
+def all_models() -> List[str]:
+    """Union of installed models over every host that has reported an inventory."""
+    with _lock:
+        return sorted(set().union(*_inventory.values())) if _inventory else []
+
+
+def hosts_with(model: str) -> List[str]:
+    with _lock:
+        return [h for h in OLLAMA_HOSTS if model in _inventory.get(h, ())]
+
+
+def _sticky_host(route_key: Optional[str]) -> Optional[str]:
+    if not route_key:
+        return None
+    with _lock:
+        entry = _sticky.get(route_key)
+        if entry is None:
+            return None
+        host, used = entry
+        if time.time() - used > STICKY_TTL_SECONDS:
+            _sticky.pop(route_key, None)
+            return None
+        return host
+
+
+def route(model: str, route_key: Optional[str] = None) -> List[str]:
+    """Hosts to try for `model`, best first; later entries are failover targets."""
+    pool = hosts()
+    with _lock:
+        inventory = {h: _inventory.get(h) for h in pool}
+        loaded = {h: model in _loaded.get(h, ()) for h in pool}
+
+    def has_rank(h: str) -> int:
+        inv = inventory[h]
+        if inv is None:
+            return 1  # not inventoried yet: might have it
+        return 0 if model in inv else 2
+
+    outstanding = {h: llm_http.in_flight(h) for h in pool}
+    ranked = sorted(
+        pool,
+        key=lambda h: (
+            _STATE_RANK.get(endpoint_health.state(h), 2),
+            has_rank(h),
+            # A loaded model only wins while its host still has free request slots.
+            0 if loaded[h] and outstanding[h] < llm_http.host_limit(h) else 1,
+            outstanding[h],
+            pool.index(h),
+        ),
+    )
+    sticky = _sticky_host(route_key)
+    if sticky in ranked and sticky != ranked[0]:
+        best = ranked[0]
+        if (
+            endpoint_health.state(sticky) == endpoint_health.STATE_CLOSED
+            and has_rank(sticky) <= has_rank(best)
+            and outstanding[sticky] <= outstanding[best] + STICKY_SLACK
+        ):
+            ranked.remove(sticky)
+            ranked.insert(0, sticky)
+    if len(pool) == 1:
+        ranked += [h for h in LOCAL_FALLBACKS if h not in ranked]
+    return ranked
+
+
+def record_success(host: str, model: str, route_key: Optional[str] = None) -> None:
+    """The host served `model`: it is installed and now loaded there; stick the route key to it."""
+    host = host.rstrip("/")
+    with _lock:
+        if host in _inventory:
+            _inventory[host].add(model)
+        _loaded.setdefault(host, set()).add(model)
+        if route_key:
+            _sticky[route_key] = (host, time.time())
+            _sticky.move_to_end(route_key)
+            while len(_sticky) > STICKY_MAX_KEYS:
+                _sticky.popitem(last=False)
+
+
+def record_missing(host: str, model: str) -> None:
+    """The host answered 404 for `model`."""
+    host = host.rstrip("/")
+    with _lock:
+        if host in _inventory:
+            _inventory[host].discard(model)
+        if host in _loaded:
+            _loaded[host].discard(model)
+
+
+async def _fetch_host(host: str) -> Optional[List[Dict]]:
+    try:
+        tags = await llm_http.get(f"{host}/api/tags", timeout=10)
+        if tags is None or tags.status_code != 200:
+            return None
+        models = tags.json().get("models", [])
+        ps = await llm_http.get(f"{host}/api/ps", timeout=10)
+        running = ps.json().get("models", []) if ps is not None and ps.status_code == 200 else []
+    except (llm_http.TransportTimeout, llm_http.TransportConnectionError, ValueError):
+        return None
+    with _lock:
+        _inventory[host] = {str(m.get("name")) for m in models if m.get("name")}
+        _loaded[host] = {str(m.get("name")) for m in running if m.get("name")}
+    return models
+
+
+async def refresh() -> Dict[str, List[Dict]]:
+    """Re-read /api/tags and /api/ps on every host; returns host -> raw tag entries for reachable hosts."""
+    pool = hosts()
+    results = await asyncio.gather(*(_fetch_host(h) for h in pool))
+    return {h: r for h, r in zip(pool, results) if r is not None}
+
+
+async def _loop() -> None:
+    while True:
+        try:
+            await refresh()
+        except Exception as e:
+            home_log.log_sync(f"⚠️ Ollama host refresh failed: {e}")
+        await asyncio.sleep(REFRESH_SECONDS)
+
+
+def start() -> None:
+    """Keep inventories fresh in the background (only useful with more than one host)."""
+    global _task
+    if len(OLLAMA_HOSTS) < 2 or (_task is not None and not _task.done()):
+        return
+    _task = asyncio.get_running_loop().create_task(_loop())
+
+
+def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def format_snapshot() -> str:
+    with _lock:
+        lines = []
+        for h in OLLAMA_HOSTS:
+            inv = _inventory.get(h)
+            loaded = sorted(_loaded.get(h, ()))
+            count = "?" if inv is None else str(len(inv))
+            lines.append(
+                f"`{h}` · {count} models · {llm_http.in_flight(h)} in flight"
+                + (f" · loaded: {', '.join(loaded[:4])}" if loaded else "")
+            )
+    return "\n".join(lines)
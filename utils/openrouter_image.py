@@ -2,16 +2,14 @@
 
 from __future__ import annotations
 
-import asyncio
 import base64
 import json
 import re
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-
 from integrations import OPENROUTER_API_KEY
 from utils import home_log
+from utils import llm_http
 
 # System instructions for the image model (natural-language + contextual prompts).
 OPENROUTER_IMAGE_GEN_SYSTEM_PROMPT = (
@@ -65,7 +63,7 @@ def _collect_image_urls_from_obj(obj: Any, out: List[str], depth: int = 0) -> No
             _collect_image_urls_from_obj(v, out, depth + 1)
 
 
-def _bytes_from_image_url_string(url: str) -> Optional[Tuple[bytes, str]]:
+async def _bytes_from_image_url_string(url: str) -> Optional[Tuple[bytes, str]]:
     u = (url or "").strip()
     if not u:
         return None
@@ -74,7 +72,7 @@ def _bytes_from_image_url_string(url: str) -> Optional[Tuple[bytes, str]]:
         return parsed
     if u.startswith("http://") or u.startswith("https://"):
         try:
-            r = requests.get(u, timeout=60)
+            r = await llm_http.get_bytes(u, timeout=60)
             if r.status_code != 200 or not r.content:
                 return None
             ct = (r.headers.get("Content-Type") or "image/png").split(";")[0].strip().lower()
@@ -249,12 +247,9 @@ async def generate_openrouter_image(
         "Content-Type": "application/json",
     }
 
-    def _post() -> requests.Response:
-        return requests.post(url, json=payload, headers=headers, timeout=timeout)
-
     try:
-        response = await asyncio.to_thread(_post)
-    except requests.exceptions.Timeout:
+        response = await llm_http.post(url, json_body=payload, headers=headers, timeout=timeout)
+    except llm_http.TransportTimeout:
         return None, "image/png", "", "Error: Image request timed out."
     except Exception as e:
         return None, "image/png", "", f"Error: {str(e)[:200]}"
@@ -299,12 +294,12 @@ async def generate_openrouter_image(
         extra_urls: List[str] = []
         _collect_image_urls_from_obj(msg, extra_urls)
         for u in extra_urls:
-            got = await asyncio.to_thread(_bytes_from_image_url_string, u)
+            got = await _bytes_from_image_url_string(u)
             if got:
                 blobs.append(got)
                 break
     if not blobs and text_out:
-        got = await asyncio.to_thread(_bytes_from_image_url_string, text_out.strip())
+        got = await _bytes_from_image_url_string(text_out.strip())
         if got:
             blobs.append(got)
             text_out = ""
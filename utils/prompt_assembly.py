@@ -0,0 +1,75 @@
+"""Chat prompt assembly ordered for Ollama's prompt (KV) cache.
+
+Ollama only re-evaluates the part of a prompt after the first token that differs from the
+previous request on the same model, so chat requests are built from most stable to most
+volatile:
+
+1. system prefix: persona, chat template with the command list, DM instructions, then the
+   adaptive profile. It is memoized per (persona, prompt key, profile, ...), so an unchanged
+   prefix is reused as-is instead of being re-rendered every turn;
+2. older-DM topic notes (rewritten only when history is compacted, which changes history anyway);
+3. conversation history;
+4. a per-turn runtime note: date/time/location, command suggestions, brief LLM profile, fast-reply hint;
+5. the new user message.
+
+Templates that still contain per-turn placeholders ({date}, {time}, ...) keep working; they are
+rendered every turn and skip the memo.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Template fields that change between turns; they belong in the runtime note, not the prefix.
+VOLATILE_FIELDS = ("date", "time", "location", "city", "country", "command_suggestions")
+PREFIX_CACHE_MAX = 256
+
+_lock = threading.Lock()
+_prefixes: "OrderedDict[Hashable, str]" = OrderedDict()
+
+
+def render(template: str, **fields: Any) -> str:
+    for k, v in fields.items():
+        template = template.replace("{" + k + "}", str(v))
+    return template
+
+
+def is_stable_template(template: str) -> bool:
+    return not any("{" + f + "}" in template for f in VOLATILE_FIELDS)
+
+
+def stable_prefix(key: Hashable, build: Callable[[], str]) -> str:
+    """Rendered system prefix for `key`, built once and reused while the key is unchanged."""
+    with _lock:
+        hit = _prefixes.get(key)
+        if hit is not None:
+            _prefixes.move_to_end(key)
+            return hit
+    text = build()
+    with _lock:
+        _prefixes[key] = text
+        while len(_prefixes) > PREFIX_CACHE_MAX:
+            _prefixes.popitem(last=False)
+    return text
+
+
+def assemble(
+    system_prefix: str,
+    history: List[Dict[str, Any]],
+    user_message: Dict[str, Any],
+    *,
+    notes: Optional[str] = None,
+    runtime_parts: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Messages in cache-friendly order: prefix, notes, history, runtime note, new user message."""
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": system_prefix}]
+    if notes:
+        messages.append({"role": "system", "content": notes})
+    messages.extend(history)
+    runtime = "\n\n".join(p.strip() for p in (runtime_parts or []) if p and p.strip())
+    if runtime:
+        messages.append({"role": "system", "content": runtime})
+    messages.append(user_message)
+    return messages
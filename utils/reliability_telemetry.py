@@ -12,6 +12,13 @@ _COUNTERS: Dict[str, int] = {
     "discord_send_retries": 0,
     "discord_send_errors": 0,
     "message_handler_errors": 0,
+    "llm_cache_hits": 0,
+    "llm_cache_misses": 0,
+    "ollama_cold_loads": 0,
+    "ollama_warm_requests": 0,
+    "llm_shed": 0,
+    "news_shed": 0,
+    "loop_stalls": 0,
 }
 
 
@@ -47,5 +54,12 @@ def format_snapshot(prefix: str = "Reliability counters") -> str:
         f"discord_send_retries={data.get('discord_send_retries', 0)}",
         f"discord_send_errors={data.get('discord_send_errors', 0)}",
         f"message_handler_errors={data.get('message_handler_errors', 0)}",
+        f"llm_cache_hits={data.get('llm_cache_hits', 0)}",
+        f"llm_cache_misses={data.get('llm_cache_misses', 0)}",
+        f"ollama_cold_loads={data.get('ollama_cold_loads', 0)}",
+        f"ollama_warm_requests={data.get('ollama_warm_requests', 0)}",
+        f"llm_shed={data.get('llm_shed', 0)}",
+        f"news_shed={data.get('news_shed', 0)}",
+        f"loop_stalls={data.get('loop_stalls', 0)}",
     ]
     return f"{prefix}: " + ", ".join(ordered)
@@ -0,0 +1,115 @@
+"""In-memory snapshots of small JSON settings files (config.json, whitelist.json, personas.json).
+
+A JsonSnapshot parses its file once into a read-only value and hands that same object to
+every reader, so hot paths (permission checks, wake word, awake flag) do no file I/O.
+save() writes through a temp file plus atomic replace and swaps the in-memory value in one
+assignment. Edits made outside the bot are picked up by comparing the file's mtime/size/inode,
+at most once per CHECK_INTERVAL_SECONDS; an edit that does not parse (e.g. an editor caught
+mid-write) keeps the previous snapshot and is logged.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from utils import home_log
+
+CHECK_INTERVAL_SECONDS = 1.0
+
+
+def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def write_json_atomic(path: str, data: Any, indent: int = 4) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp, path)
+
+
+class JsonSnapshot:
+    """One JSON file held as an immutable parsed value, reloaded when the file changes on disk.
+
+    parse(raw) builds the read-only value from the decoded JSON. default() is written when the
+    file is missing; with rewrite_invalid it also replaces a file that is not valid JSON on first
+    load (otherwise the JSON error is raised, as before). Errors raised by parse() on first load
+    always propagate: a readable file with bad content is never overwritten.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        parse: Callable[[Any], Any],
+        default: Callable[[], Any],
+        *,
+        indent: int = 4,
+        rewrite_invalid: bool = False,
+    ):
+        self.path = path
+        self._parse = parse
+        self._default = default
+        self._indent = indent
+        self._rewrite_invalid = rewrite_invalid
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self._sig: Optional[Tuple[int, int, int]] = None
+        self._checked = 0.0
+        self.version = 0  # bumped on every swap
+
+    def _swap(self, value: Any) -> None:
+        self._value = value
+        self._sig = _signature(self.path)
+        self._checked = time.monotonic()
+        self.version += 1
+
+    def _load(self) -> None:
+        first = self.version == 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+            value = self._parse(raw)
+        except FileNotFoundError:
+            self._write(self._default())
+            return
+        except (ValueError, TypeError, AttributeError) as e:
+            if not first:
+                self._sig = _signature(self.path)  # don't retry the same broken edit every second
+                home_log.log_sync(f"⚠️ {self.path} changed but could not be parsed; keeping previous settings: {e}")
+                return
+            if not (self._rewrite_invalid and isinstance(e, json.JSONDecodeError)):
+                raise
+            self._write(self._default())
+            return
+        self._swap(value)
+
+    def _write(self, raw: Any) -> None:
+        value = self._parse(raw)
+        write_json_atomic(self.path, raw, self._indent)
+        self._swap(value)
+
+    def get(self) -> Any:
+        """Current snapshot; re-reads the file only if it changed since the last check."""
+        if self.version and time.monotonic() - self._checked < CHECK_INTERVAL_SECONDS:
+            return self._value
+        with self._lock:
+            if not self.version:
+                self._load()
+            elif time.monotonic() - self._checked >= CHECK_INTERVAL_SECONDS:
+                self._checked = time.monotonic()
+                if _signature(self.path) != self._sig:
+                    self._load()
+            return self._value
+
+    def save(self, raw: Any) -> None:
+        """Persist `raw` (atomic replace) and make it the current snapshot."""
+        with self._lock:
+            self._write(raw)
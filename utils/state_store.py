@@ -0,0 +1,361 @@
+"""Pluggable persistence for bot state: SQLite (WAL, row-level upserts) or the legacy JSON files.
+
+State is modelled as `{field: {key: value}}` (key = channel / user / reminder id). Stores share
+one interface — `load()`, `submit(changes)`, `sync(state)`, `rewrite(state)`, `flush()`,
+`close()` — so managers do not care which backend is active:
+
+- `KeyedTable`: rows in data/state.db, indexed by (namespace, field, key). The first load
+  imports the legacy file once (recorded in the `meta` table; the JSON file is left in place).
+- `JsonDocumentFile`: legacy whole-file JSON document (used when STATE_BACKEND=json).
+- `utils.journal_store.JournalStore`: conversation journal + snapshot (json backend for chats).
+
+News helpers use `load_document` / `save_document`, which store one row per top-level key.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from integrations import STATE_BACKEND
+from utils import home_log
+from utils.journal_store import JournalStore
+
+DB_PATH = "data/state.db"
+DELETE = JournalStore.DELETE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    ns TEXT NOT NULL,
+    field TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (ns, field, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def using_sqlite() -> bool:
+    return STATE_BACKEND == "sqlite"
+
+
+class SqliteStateDb:
+    """Single shared connection (WAL, synchronous=NORMAL) guarded by a lock; safe across threads."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def load(self, ns: str) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT field, key, value FROM records WHERE ns = ?", (ns,)).fetchall()
+        for field, key, value in rows:
+            try:
+                out.setdefault(field, {})[key] = json.loads(value)
+            except json.JSONDecodeError:
+                continue
+        return out
+
+    def get(self, ns: str, field: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM records WHERE ns = ? AND field = ? AND key = ?", (ns, field, key)
+            ).fetchone()
+        if not row:
+            return None
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            return None
+
+    def apply(self, ns: str, changes: List[Tuple[str, str, Optional[str]]], *, replace: bool = False) -> None:
+        """Apply serialized (field, key, value|None) changes in one transaction; None deletes."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                if replace:
+                    cur.execute("DELETE FROM records WHERE ns = ?", (ns,))
+                for field, key, value in changes:
+                    if value is None:
+                        cur.execute("DELETE FROM records WHERE ns = ? AND field = ? AND key = ?", (ns, field, key))
+                    else:
+                        cur.execute(
+                            "INSERT INTO records (ns, field, key, value, updated) VALUES (?, ?, ?, ?, ?) "
+                            "ON CONFLICT(ns, field, key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+                            (ns, field, key, value, now),
+                        )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def meta_get(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def meta_set(self, name: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, value),
+            )
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass
+
+
+_db: Optional[SqliteStateDb] = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> SqliteStateDb:
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = SqliteStateDb()
+        return _db
+
+
+class KeyedTable:
+    """SQLite-backed store for one namespace; keeps a serialized mirror so sync() writes only diffs."""
+
+    def __init__(self, namespace: str, fields: Iterable[str], legacy_loader: Optional[Callable[[], Dict]] = None):
+        self.namespace = namespace
+        self.fields = tuple(fields)
+        self._legacy_loader = legacy_loader
+        self._mirror: Dict[str, Dict[str, str]] = {f: {} for f in self.fields}
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        db = get_db()
+        marker = f"migrated:{self.namespace}"
+        if self._legacy_loader is not None and db.meta_get(marker) is None:
+            try:
+                legacy = self._legacy_loader() or {}
+            except Exception as e:
+                home_log.log_sync(f"⚠️ Could not read legacy state for {self.namespace}: {e}")
+                legacy = {}
+            changes = [
+                (field, str(k), _dumps(v))
+                for field in self.fields
+                for k, v in (legacy.get(field) or {}).items()
+            ]
+            if changes:
+                db.apply(self.namespace, changes, replace=True)
+            db.meta_set(marker, str(int(time.time())))
+        state = db.load(self.namespace)
+        out = {f: dict(state.get(f, {})) for f in self.fields}
+        with self._lock:
+            self._mirror = {f: {k: _dumps(v) for k, v in block.items()} for f, block in out.items()}
+        return out
+
+    def submit(self, changes: List[Tuple[str, str, Any]]) -> None:
+        encoded: List[Tuple[str, str, Optional[str]]] = []
+        with self._lock:
+            for field, key, value in changes or []:
+                if field not in self._mirror:
+                    continue
+                key = str(key)
+                if value is DELETE:
+                    if self._mirror[field].pop(key, None) is not None:
+                        encoded.append((field, key, None))
+                    continue
+                blob = _dumps(value)
+                if self._mirror[field].get(key) != blob:
+                    self._mirror[field][key] = blob
+                    encoded.append((field, key, blob))
+        if encoded:
+            get_db().apply(self.namespace, encoded)
+
+    def sync(self, state: Dict[str, Dict[str, Any]]) -> None:
+        """Persist full in-memory state by writing only rows whose value changed."""
+        changes: List[Tuple[str, str, Any]] = []
+        with self._lock:
+            for field in self.fields:
+                block = state.get(field) or {}
+                for key in list(self._mirror[field].keys()):
+                    if key not in block:
+                        changes.append((field, key, DELETE))
+        for field in self.fields:
+            for key, value in (state.get(field) or {}).items():
+                changes.append((field, str(key), value))
+        self.submit(changes)
+
+    def rewrite(self, state: Dict[str, Dict[str, Any]]) -> None:
+        encoded = [
+            (field, str(k), _dumps(v)) for field in self.fields for k, v in (state.get(field) or {}).items()
+        ]
+        get_db().apply(self.namespace, encoded, replace=True)
+        with self._lock:
+            self._mirror = {f: {} for f in self.fields}
+            for field, key, blob in encoded:
+                self._mirror[field][key] = blob
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        return None
+
+    def close(self) -> None:
+        get_db().checkpoint()
+
+
+class JsonDocumentFile:
+    """
+    Legacy backend: the whole state is one JSON document rewritten on every change.
+    `list_fields` maps fields stored on disk as lists of dicts to the id attribute used as key.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fields: Iterable[str],
+        *,
+        list_fields: Optional[Dict[str, str]] = None,
+        indent: Optional[int] = 2,
+    ):
+        self.path = path
+        self.fields = tuple(fields)
+        self.list_fields = dict(list_fields or {})
+        self.indent = indent
+        self._state: Dict[str, Dict[str, Any]] = {f: {} for f in self.fields}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        out: Dict[str, Dict[str, Any]] = {}
+        for field in self.fields:
+            raw = data.get(field) if isinstance(data, dict) else None
+            id_attr = self.list_fields.get(field)
+            if id_attr and isinstance(raw, list):
+                out[field] = {str(item.get(id_attr)): item for item in raw if isinstance(item, dict)}
+            elif isinstance(raw, dict):
+                out[field] = dict(raw)
+            else:
+                out[field] = {}
+        self._state = {f: dict(v) for f, v in out.items()}
+        return out
+
+    def _write(self) -> None:
+        doc: Dict[str, Any] = {}
+        for field in self.fields:
+            block = self._state.get(field, {})
+            doc[field] = list(block.values()) if field in self.list_fields else dict(block)
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(doc, f, indent=self.indent)
+
+    def submit(self, changes: List[Tuple[str, str, Any]]) -> None:
+        for field, key, value in changes or []:
+            if field not in self._state:
+                continue
+            if value is DELETE:
+                self._state[field].pop(str(key), None)
+            else:
+                self._state[field][str(key)] = value
+        self._write()
+
+    def sync(self, state: Dict[str, Dict[str, Any]]) -> None:
+        self.rewrite(state)
+
+    def rewrite(self, state: Dict[str, Dict[str, Any]]) -> None:
+        self._state = {f: dict(state.get(f) or {}) for f in self.fields}
+        self._write()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+def open_store(namespace: str, fields: Iterable[str], legacy):
+    """Return the active backend for a namespace; `legacy` is the JSON store (also the migration source)."""
+    if not using_sqlite():
+        return legacy
+    return KeyedTable(namespace, fields, legacy_loader=legacy.load)
+
+
+# ---------------------------------------------------------------------------
+# Free-form JSON documents (news_service data files): one row per top-level key
+# ---------------------------------------------------------------------------
+
+_DOC_FIELD = "doc"
+_doc_tables: Dict[str, KeyedTable] = {}
+_doc_lock = threading.Lock()
+
+
+def _doc_namespace(path: str) -> str:
+    return "doc:" + os.path.normpath(path).replace(os.sep, "/")
+
+
+def _legacy_document_loader(path: str) -> Callable[[], Dict]:
+    def _load() -> Dict:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {_DOC_FIELD: data if isinstance(data, dict) else {}}
+
+    return _load
+
+
+def _doc_table(path: str) -> KeyedTable:
+    """Table for a document path (legacy file imported on first use)."""
+    with _doc_lock:
+        table = _doc_tables.get(path)
+        if table is None:
+            table = KeyedTable(_doc_namespace(path), (_DOC_FIELD,), legacy_loader=_legacy_document_loader(path))
+            table.load()
+            _doc_tables[path] = table
+    return table
+
+
+def load_document(path: str, default: Any = None) -> Any:
+    """Read a dict document from SQLite; `default` when it has no rows."""
+    table = _doc_table(path)
+    rows = get_db().load(table.namespace).get(_DOC_FIELD, {})
+    if not rows:
+        return default if default is not None else {}
+    return rows
+
+
+def save_document(path: str, data: Any) -> None:
+    """Write only the top-level keys of `data` whose value changed (and drop removed keys)."""
+    if not isinstance(data, dict):
+        raise TypeError("save_document expects a dict")
+    table = _doc_table(path)
+    table.sync({_DOC_FIELD: data})
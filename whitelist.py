@@ -1,45 +1,71 @@
-"""Permission hierarchy: admin (all commands) > himas (himas + user) > user (user only)."""
-import json
+"""Permission hierarchy: admin (all commands) > himas (himas + user) > user (user only).
+
+whitelist.json is held as an in-memory snapshot (utils.settings_store) with a precomputed
+user id -> role map, so get_user_permission() is a dict lookup rather than a file parse.
+"""
+import copy
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
 from integrations import WHITELIST_FILE, PERMANENT_ADMIN
+from utils import home_log
+from utils import settings_store
+
+ROLES = ("admin", "himas", "user")
+
+
+class _WhitelistSnapshot(NamedTuple):
+    data: Dict[str, Any]  # normalized file contents (ids as ints); copied out by load_whitelist()
+    roles: Mapping[int, str]  # user id -> highest role
+
+
+def _parse_whitelist(raw: Any) -> _WhitelistSnapshot:
+    if not isinstance(raw, dict):
+        raise TypeError("whitelist.json must contain a JSON object")
+    data = copy.deepcopy(raw)
+    for key in ROLES:
+        if key in data and isinstance(data[key], list):
+            ids = []
+            for x in data[key]:
+                try:
+                    ids.append(int(x))
+                except (TypeError, ValueError):
+                    home_log.log_sync(f"⚠️ Ignoring invalid user id {x!r} in {WHITELIST_FILE} ({key})")
+            data[key] = ids
+    roles: Dict[int, str] = {}
+    for key in reversed(ROLES):  # higher roles win for ids listed twice
+        for uid in data.get(key, []) or []:
+            roles[uid] = key
+    return _WhitelistSnapshot(data, MappingProxyType(roles))
+
+
+_store = settings_store.JsonSnapshot(
+    WHITELIST_FILE,
+    _parse_whitelist,
+    lambda: {key: [] for key in ROLES},
+    rewrite_invalid=True,
+)
 
 
 def load_whitelist():
-    try:
-        with open(WHITELIST_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        for key in ("admin", "himas", "user"):
-            if key in data and isinstance(data[key], list):
-                data[key] = [int(x) for x in data[key]]
-        return data
-    except (FileNotFoundError, json.JSONDecodeError):
-        default = {"admin": [], "himas": [], "user": []}
-        save_whitelist(default)
-        return default
+    return copy.deepcopy(_store.get().data)
 
 
 def save_whitelist(data):
     out = {}
-    for key in ("admin", "himas", "user"):
+    for key in ROLES:
         lst = data.get(key, [])
         out[key] = [str(int(x)) for x in lst]
-    with open(WHITELIST_FILE, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=4)
+    _store.save(out)
 
-def get_user_permission(user_id):
-    whitelist = load_whitelist()
+
+def get_user_permission(user_id) -> Optional[str]:
     user_id = int(user_id)
 
     # Check permanent admin first
     if user_id == PERMANENT_ADMIN:
         return "admin"
-
-    if user_id in whitelist.get("admin", []):
-        return "admin"
-    elif user_id in whitelist.get("himas", []):
-        return "himas"
-    elif user_id in whitelist.get("user", []):
-        return "user"
-    return None
+    return _store.get().roles.get(user_id)
 
 def is_admin(user_id):
     return get_user_permission(user_id) == "admin"